@@ -1,147 +1,216 @@
 import streamlit as st
 import yaml
-from core.mission_profile import simulate_mission
-from core.hydrogen_system import evaluate_hydrogen_system
-from core.energy_flow import calculate_energy_flow
-from core.cost_model import estimate_costs
-from core.emissions import calculate_emissions
+from core.pipeline import run_pipeline
+from core.stage_cache import StageCache
 import plotly.graph_objects as go
 import pandas as pd
-from math import radians, cos, sin, asin, sqrt
-import geopandas as gpd
 import json
-from shapely.geometry import Point
+import math
+import numpy as np
+from geo.lanes import load_lane_index, choose_lod, nan_separated, simplify_coords
+from geo.routing import load_lane_graph
+from geo.ports import ports, port_coords, region_mapping, region_fuel_prices
+from geo.port_matrix import get_port_matrix
+from core.fleet import load_vessel_types
+from utils.instrument import metrics
 
 st.set_page_config(page_title="HydroSim", layout="wide")
 st.title("Hydrogen Marine Propulsion Simulator")
 
-# Port data and coordinates (only routes available in the sea lane dataset)
-ports = [
-    "Singapore", "Port Klang", "Jakarta", "Rotterdam", "Hamburg", "Antwerp",
-    "Los Angeles", "New York", "Houston", "Dubai", "Jeddah", "Doha"
-]
-port_coords = {
-    'Singapore': (1.3521, 103.8198),
-    'Port Klang': (3.0014, 101.4000),
-    'Jakarta': (-6.2088, 106.8456),
-    'Rotterdam': (51.9244, 4.4777),
-    'Hamburg': (53.5511, 9.9937),
-    'Antwerp': (51.2194, 4.4025),
-    'Los Angeles': (33.7405, -118.2760),
-    'New York': (40.7128, -74.0060),
-    'Houston': (29.7604, -95.3698),
-    'Dubai': (25.276987, 55.296249),
-    'Jeddah': (21.4858, 39.1925),
-    'Doha': (25.276987, 51.5200)
-}
+# Dependencies between reruns:
+#   lane index / graph / port matrix   -> once per process (cache_resource)
+#   route distances                    -> port pair only
+#   globe figure                       -> port pair and map view
+#   simulation results                 -> simulation inputs only
+# so a sidebar change such as the carbon price never touches geometry.
+
+# Sea lanes from the memory-mapped lane cache, loaded and indexed once per process
+@st.cache_resource
+def get_lane_index():
+    return load_lane_index("Shipping_Lanes_v1.geojson")
+
+@st.cache_resource
+def get_lane_graph():
+    return load_lane_graph("Shipping_Lanes_v1.geojson")
+
+@st.cache_resource
+def get_distance_matrix():
+    return get_port_matrix()
+
+# Stage results memoized per process, keyed on each stage's own inputs
+@st.cache_resource
+def get_stage_cache():
+    return StageCache()
+
+@st.cache_resource
+def get_vessel_types():
+    return load_vessel_types()
+
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def route_distances(departure_port, arrival_port):
+    # (sea-lane km or None, great-circle km) straight from the port matrix
+    matrix = get_distance_matrix()
+    i, j = matrix.index[departure_port], matrix.index[arrival_port]
+    sea_km = float(matrix.routed_km[i, j])
+    return (sea_km if math.isfinite(sea_km) else None), float(matrix.great_circle_km[i, j])
+
+
+MAP_VIEWS = ["Globe", "Route"]
+MAX_MAP_ZOOM = 20
+ROUTE_MARGIN = 1.2  # route view shows this multiple of the route extent
+
+
+def route_bounds(lon, lat):
+    # (lon min, lon max, lat min, lat max) of the ports and stored route
+    lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+    return np.nanmin(lon), np.nanmax(lon), np.nanmin(lat), np.nanmax(lat)
+
+
+@st.cache_resource(max_entries=128)
+def route_figure(departure_port, arrival_port, view="Globe"):
+    # Built once per port pair and view; callers must not mutate the returned figure
+    lat1, lon1 = port_coords[departure_port]
+    lat2, lon2 = port_coords[arrival_port]
+    fig = go.Figure()
+
+    # Stored shortest path over the sea-lane network (None if the lanes are not connected)
+    with metrics.span("app.sea_route"):
+        sea_route = get_distance_matrix().route(departure_port, arrival_port, get_lane_graph())
+
+    # The globe is centred on the route; the route view also zooms in to fit
+    # the route's bounds. Geometry is drawn at the coarsest level of detail
+    # that is still sub-pixel at that zoom and extent.
+    lons, lats = [lon1, lon2], [lat1, lat2]
+    if sea_route is not None:
+        lons, lats = np.concatenate([lons, sea_route.lon]), np.concatenate([lats, sea_route.lat])
+    lon_min, lon_max, lat_min, lat_max = route_bounds(lons, lats)
+    extent_deg = max(lon_max - lon_min, lat_max - lat_min)
+    center = dict(lon=(lon_min + lon_max) / 2, lat=(lat_min + lat_max) / 2)
+    if view == "Route":
+        zoom = min(max(180 / (ROUTE_MARGIN * max(extent_deg, 1e-3)), 1.0), MAX_MAP_ZOOM)
+        lod = choose_lod(zoom, ROUTE_MARGIN * extent_deg)
+    else:
+        zoom = 1.0
+        lod = choose_lod(zoom)
+
+    # Try to match route using port proximity
+    threshold_deg = 1.0  # ~50–100 km proximity threshold
+    with metrics.span("app.lane_match"):
+        filtered_lanes = get_lane_index().match_lanes((lon1, lat1), (lon2, lat2), threshold_deg, lod)
+
+    if filtered_lanes:
+        lon, lat = nan_separated(filtered_lanes)
+        fig.add_trace(go.Scattergeo(
+            lon=lon,
+            lat=lat,
+            mode='lines',
+            line=dict(width=2, color='blue'),
+            opacity=0.6,
+            name="Matched Sea Lane"
+        ))
+
+    if sea_route is not None:
+        lon, lat = simplify_coords(sea_route.lon, sea_route.lat, lod)
+        fig.add_trace(go.Scattergeo(
+            lon=lon,
+            lat=lat,
+            mode='lines',
+            line=dict(width=3, color='yellow'),
+            name="Sea-Lane Route"
+        ))
+        fig.add_trace(go.Scattergeo(
+            lon=[lon1, lon2],
+            lat=[lat1, lat2],
+            mode='markers+text',
+            marker=dict(size=6, color='red'),
+            text=[departure_port, arrival_port],
+            textposition="top center",
+            name="Ports"
+        ))
+    elif not filtered_lanes:
+        fig.add_trace(go.Scattergeo(
+            lon=[lon1, lon2],
+            lat=[lat1, lat2],
+            mode='lines+markers+text',
+            line=dict(width=2, color='red'),
+            marker=dict(size=6, color='red'),
+            text=[departure_port, arrival_port],
+            textposition="top center",
+            name="Direct Route"
+        ))
+
+    fig.update_layout(
+        title='Shipping Route Visualization (With Real Sea Lanes)',
+        height=550,
+        margin=dict(l=0, r=0, t=40, b=0),  # 🔥 Remove all margins
+        paper_bgcolor="#0e1117",         # 🔥 Dark background
+        geo=dict(
+            projection_type='orthographic',
+            projection_rotation=center,
+            projection_scale=zoom,
+            center=center,
+            showland=True,
+            showocean=True,
+            showcountries=True,
+            landcolor='rgb(0, 128, 0)',             # 🔥 Dark land
+            oceancolor='rgb(20, 30, 60)',          # 🔥 Dark ocean
+            bgcolor='rgba(0,0,0,0)',               # 🔥 Transparent globe bg
+            countrycolor='rgb(90, 90, 90)',        # 🔥 Softer borders
+        )
+    )
+    return fig
 
-# Region mapping to assign fuel prices
-region_mapping = {
-    'Singapore': 'Southeast Asia', 'Port Klang': 'Southeast Asia', 'Jakarta': 'Southeast Asia',
-    'Rotterdam': 'EU', 'Hamburg': 'EU', 'Antwerp': 'EU',
-    'Los Angeles': 'USA', 'New York': 'USA', 'Houston': 'USA',
-    'Dubai': 'Middle East', 'Jeddah': 'Middle East', 'Doha': 'Middle East'
-}
 
-def haversine(lon1, lat1, lon2, lat2):
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    r = 6371
-    return c * r
+@st.cache_data(max_entries=1024, show_spinner=False)
+def simulate(config, baseline_emission_factor):
+    with metrics.span("app.simulate"):
+        stages = run_pipeline(config, get_stage_cache())
+    mission, hydro, energy = stages["mission"], stages["hydrogen"], stages["energy"]
+    cost, emissions = stages["cost"], stages["emissions"]
+    distance = config["route_km"]
+    baseline_emissions_total = baseline_emission_factor * distance
+    carbon_savings = baseline_emissions_total - emissions["total_emissions_kg_co2e"]
+    return {
+        "mission": mission,
+        "hydrogen": hydro,
+        "energy": energy,
+        "cost": cost,
+        "emissions": emissions,
+        "baseline_emissions_total": baseline_emissions_total,
+        "carbon_savings": carbon_savings
+    }
+
 
 # Route selection
 departure_port = st.selectbox("Select Departure Port", ports)
 arrival_port = st.selectbox("Select Arrival Port", [p for p in ports if p != departure_port])
 
-lat1, lon1 = port_coords[departure_port]
-lat2, lon2 = port_coords[arrival_port]
-
 st.markdown("## Route Overview", unsafe_allow_html=True)
 
-# Plot with shipping lanes from GeoJSON
-shipping_lanes = gpd.read_file("Shipping_Lanes_v1.geojson")
-fig = go.Figure()
-
-# Try to match route using port proximity
-start_point = Point(lon1, lat1)
-end_point = Point(lon2, lat2)
-threshold_deg = 1.0  # ~50–100 km proximity threshold
-
-filtered_lanes = []
-for _, row in shipping_lanes.iterrows():
-    geom = row.geometry
-    if geom.type == 'LineString':
-        if start_point.distance(geom) < threshold_deg and end_point.distance(geom) < threshold_deg:
-            filtered_lanes.append(geom)
-    elif geom.type == 'MultiLineString':
-        for line in geom.geoms:
-            if start_point.distance(line) < threshold_deg and end_point.distance(line) < threshold_deg:
-                filtered_lanes.append(line)
-
-for geom in filtered_lanes:
-    lon, lat = list(geom.xy[0]), list(geom.xy[1])
-    fig.add_trace(go.Scattergeo(
-        lon=lon,
-        lat=lat,
-        mode='lines',
-        line=dict(width=2, color='blue'),
-        opacity=0.6,
-        name="Matched Sea Lane"
-    ))
-
-if not filtered_lanes:
-    fig.add_trace(go.Scattergeo(
-        lon=[lon1, lon2],
-        lat=[lat1, lat2],
-        mode='lines+markers+text',
-        line=dict(width=2, color='red'),
-        marker=dict(size=6, color='red'),
-        text=[departure_port, arrival_port],
-        textposition="top center",
-        name="Direct Route"
-    ))
-
-fig.update_layout(
-    title='Shipping Route Visualization (With Real Sea Lanes)',
-    height=550,
-    margin=dict(l=0, r=0, t=40, b=0),  # 🔥 Remove all margins
-    paper_bgcolor="#0e1117",         # 🔥 Dark background
-    geo=dict(
-        projection_type='orthographic',
-        showland=True,
-        showocean=True,
-        showcountries=True,
-        landcolor='rgb(0, 128, 0)',             # 🔥 Dark land
-        oceancolor='rgb(20, 30, 60)',          # 🔥 Dark ocean
-        bgcolor='rgba(0,0,0,0)',               # 🔥 Transparent globe bg
-        countrycolor='rgb(90, 90, 90)',        # 🔥 Softer borders
-    )
-)
-
-st.plotly_chart(fig, use_container_width=True)
+with metrics.span("app.map"):
+    map_view = st.radio("Map View", MAP_VIEWS, horizontal=True)
+    st.plotly_chart(route_figure(departure_port, arrival_port, map_view), use_container_width=True)
 
 # Get region automatically from departure port
 region = region_mapping.get(departure_port, "Custom")
 
-# [Simulation settings and remaining app logic continues unchanged below]
-
-
-# [Simulation settings and remaining app logic continues unchanged below]
-# Continue the rest in sidebar
+# Simulation settings in the sidebar
 with st.sidebar:
     st.header("Simulation Settings")
 
     engine_type = st.selectbox("Engine Type", ["PEMFC", "H2-ICE"])
     compare_to_diesel = st.checkbox("Compare with Diesel baseline")
 
-    distance_km = haversine(lon1, lat1, lon2, lat2)
+    sea_lane_km, great_circle_km = route_distances(departure_port, arrival_port)
+    distance_km = sea_lane_km if sea_lane_km is not None else great_circle_km
     use_port_distance = st.checkbox("Use Port-Based Distance")
     if use_port_distance:
         route_km = distance_km
-        st.info(f"Auto-filled distance: {distance_km:.2f} km")
+        if sea_lane_km is not None:
+            st.info(f"Auto-filled sea-lane distance: {distance_km:.2f} km (great-circle {great_circle_km:.2f} km)")
+        else:
+            st.info(f"Auto-filled distance: {distance_km:.2f} km")
     else:
         route_km = st.slider("Route Distance (km)", 100, 3000, 400, 100)
 
@@ -153,14 +222,10 @@ with st.sidebar:
     else:
         enable_orc = False  # Force-disable for PEMFC
 
-    if region == "Southeast Asia":
-        hydrogen_cost_pemfc, hydrogen_cost_h2ice, diesel_price_per_liter = 6.0, 5.0, 0.85
-    elif region == "EU":
-        hydrogen_cost_pemfc, hydrogen_cost_h2ice, diesel_price_per_liter = 9.0, 7.5, 1.5
-    elif region == "USA":
-        hydrogen_cost_pemfc, hydrogen_cost_h2ice, diesel_price_per_liter = 7.0, 6.0, 1.0
-    elif region == "Middle East":
-        hydrogen_cost_pemfc, hydrogen_cost_h2ice, diesel_price_per_liter = 5.0, 4.0, 0.6
+    if region in region_fuel_prices:
+        prices = region_fuel_prices[region]
+        hydrogen_cost_pemfc, hydrogen_cost_h2ice = prices["PEMFC"], prices["H2-ICE"]
+        diesel_price_per_liter = prices["diesel_per_liter"]
     else:
         hydrogen_cost_pemfc = st.number_input("Hydrogen Cost for PEMFC (USD/kg)", 1.0, 15.0, 6.0)
         hydrogen_cost_h2ice = st.number_input("Hydrogen Cost for H₂-ICE (USD/kg)", 1.0, 15.0, 5.0)
@@ -171,9 +236,10 @@ with st.sidebar:
     if manual_price_override:
         hydrogen_cost_pemfc = st.number_input("Hydrogen Cost for PEMFC (USD/kg)", 1.0, 15.0, hydrogen_cost_pemfc)
         hydrogen_cost_h2ice = st.number_input("Hydrogen Cost for H₂-ICE (USD/kg)", 1.0, 15.0, hydrogen_cost_h2ice)
-    vessel_type = st.selectbox("Vessel Type", ["RoRo", "Tanker", "Ferry", "Bulk Carrier"])
-    default_mass = {"RoRo": 3000, "Tanker": 7000, "Ferry": 1000, "Bulk Carrier": 10000}[vessel_type]
-    default_load = {"RoRo": 0.8, "Tanker": 0.85, "Ferry": 0.6, "Bulk Carrier": 0.9}[vessel_type]
+    vessel_types = get_vessel_types()
+    vessel_type = st.selectbox("Vessel Type", list(vessel_types))
+    default_mass = vessel_types[vessel_type]["cargo_mass_tons"]
+    default_load = vessel_types[vessel_type]["load_factor"]
 
     cargo_mass = st.number_input("Cargo Mass (tons)", 100, 10000, default_mass, 100)
     load_factor = st.slider("Load Factor", 0.1, 1.0, default_load, 0.05)
@@ -199,34 +265,13 @@ config = {
     "vessel_type": vessel_type
 }
 
-
-
-def simulate(config):
-    mission = simulate_mission(config)
-    hydro = evaluate_hydrogen_system(config, mission)
-    energy = calculate_energy_flow(config, hydro)
-    cost = estimate_costs(config, energy)
-    emissions = calculate_emissions(config, energy)
-    distance = config["route_km"]
-    baseline_emissions_total = baseline_emission_factor * distance
-    carbon_savings = baseline_emissions_total - emissions["total_emissions_kg_co2e"]
-    return {
-        "mission": mission,
-        "hydrogen": hydro,
-        "energy": energy,
-        "cost": cost,
-        "emissions": emissions,
-        "baseline_emissions_total": baseline_emissions_total,
-        "carbon_savings": carbon_savings
-    }
-
 if compare_mode:
     results = {}
     for etype in ["PEMFC", "H2-ICE"]:
         cfg = config.copy()
         cfg["engine_type"] = etype
         cfg["fuel_cost_usd_per_kg"] = hydrogen_cost_pemfc if etype == "PEMFC" else hydrogen_cost_h2ice
-        results[etype] = simulate(cfg)
+        results[etype] = simulate(cfg, baseline_emission_factor)
 
     st.subheader("PEMFC vs H2-ICE Comparison")
     col1, col2 = st.columns(2)
@@ -261,7 +306,7 @@ if compare_mode:
 
 
 else:
-    results = simulate(config)
+    results = simulate(config, baseline_emission_factor)
     cost = results["cost"]
     emissions = results["emissions"]
     hydro = results["hydrogen"]
@@ -335,3 +380,11 @@ else:
         file_name="hydrosim_results.csv",
         mime="text/csv"
     )
+
+with st.sidebar.expander("Stage cache"):
+    st.json(get_stage_cache().stats())
+
+# Per-stage timings across reruns (run with HYDROSIM_PROFILE=1)
+if metrics.enabled:
+    with st.sidebar.expander("Profiling"):
+        st.json(metrics.snapshot())
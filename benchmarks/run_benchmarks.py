@@ -0,0 +1,342 @@
+# benchmarks/run_benchmarks.py
+#
+# Times the simulation pipeline and the app hot paths at several scales and
+# writes latency percentiles, throughput and peak memory as JSON.
+#
+#   python -m benchmarks.run_benchmarks                       # run, write JSON
+#   python -m benchmarks.run_benchmarks --save-baseline benchmarks/baseline.json
+#   python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json
+#
+# Comparison mode exits non-zero when any benchmark's p50 latency or peak
+# memory exceeds the baseline by more than --threshold.
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import yaml
+
+BASE_CONFIG = "config/sample_scenarios/high_carbon_price.yaml"
+DEFAULT_SCALES = [1, 1_000, 100_000, 1_000_000]
+SCALAR_MAX_SCALE = 100_000   # per-dict paths are too slow beyond this
+OUTPUT_DIR = "outputs/benchmarks"
+
+
+def _base_config():
+    with open(BASE_CONFIG, "r") as f:
+        return {**yaml.safe_load(f), "engine_type": "PEMFC"}
+
+
+def _columns(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        **_base_config(),
+        "engine_type": rng.choice(["PEMFC", "H2-ICE"], n),
+        "route_km": rng.integers(100, 3000, n),
+        "load_factor": rng.uniform(0.1, 1.0, n),
+        "fuel_cost_usd_per_kg": rng.uniform(3, 10, n),
+        "carbon_price_usd_per_ton": rng.uniform(0, 300, n),
+        "emission_factor_kg_co2e_per_kg_h2": rng.uniform(0, 10, n),
+    }
+
+
+def _port_pairs(n):
+    from geo.ports import ports
+
+    pairs = list(itertools.permutations(ports, 2))
+    return [pairs[i % len(pairs)] for i in range(n)]
+
+
+# Each benchmark takes a scale n and returns a zero-argument callable that
+# performs n operations; setup work stays outside the timed callable.
+
+def bench_run_simulation(n):
+    from main import run_simulation
+
+    base = _base_config()
+    configs = [dict(base, route_km=200 + (i % 10) * 200) for i in range(n)]
+    return lambda: [run_simulation(c) for c in configs]
+
+
+def bench_run_simulation_cached(n):
+    from core.pipeline import run_pipeline
+    from core.stage_cache import StageCache
+
+    base = _base_config()
+    configs = [dict(base, carbon_price_usd_per_ton=i % 50) for i in range(n)]
+
+    def run():
+        cache = StageCache()
+        return [run_pipeline(c, cache) for c in configs]
+    return run
+
+
+def bench_distance_scaling_loop(n):
+    # The original main.py loop: config copy + full pipeline per point
+    from core.pipeline import run_pipeline
+
+    base = _base_config()
+    distances = list(range(200, 2200, 200))
+
+    def run():
+        out = []
+        for i in range(n):
+            config = base.copy()
+            config["engine_type"] = "PEMFC" if i % 2 else "H2-ICE"
+            config["route_km"] = distances[i % len(distances)]
+            out.append(run_pipeline(config)["cost"]["cost_per_km_usd"])
+        return out
+    return run
+
+
+def bench_run_batch(n):
+    from core.batch import run_batch
+
+    columns = _columns(n)
+    return lambda: run_batch(columns)
+
+
+def bench_sweep(n):
+    from core.sweep import run_sweep
+
+    spec = {
+        "base": BASE_CONFIG,
+        "mode": "sample",
+        "samples": n,
+        "seed": 0,
+        "parameters": {
+            "engine_type": ["PEMFC", "H2-ICE"],
+            "route_km": {"low": 100, "high": 3000},
+            "carbon_price_usd_per_ton": {"low": 0, "high": 300},
+        },
+    }
+    return lambda: run_sweep(spec, workers=1)
+
+
+def bench_lane_load_cold(n):
+    # GeoJSON parse + cache build + index, as on a first deploy
+    from geo.lanes import load_lane_index
+
+    def run():
+        cache_dir = tempfile.mkdtemp()
+        try:
+            for _ in range(n):
+                load_lane_index(cache_dir=cache_dir)
+                shutil.rmtree(cache_dir)
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    return run
+
+
+def bench_lane_load_warm(n):
+    from geo.lanes import load_lane_index
+
+    load_lane_index()
+    return lambda: [load_lane_index() for _ in range(n)]
+
+
+def bench_lane_match(n):
+    from geo.lanes import load_lane_index
+    from geo.ports import port_coords
+
+    index = load_lane_index()
+    pairs = [((port_coords[a][1], port_coords[a][0]), (port_coords[b][1], port_coords[b][0]))
+             for a, b in _port_pairs(n)]
+    return lambda: [index.match(s, e, 1.0) for s, e in pairs]
+
+
+def bench_route_astar(n):
+    from geo.ports import port_coords
+    from geo.routing import load_lane_graph
+
+    graph = load_lane_graph()
+    pairs = [((port_coords[a][1], port_coords[a][0]), (port_coords[b][1], port_coords[b][0]))
+             for a, b in _port_pairs(n)]
+    return lambda: [graph.route(s, e) for s, e in pairs]
+
+
+def bench_port_matrix_lookup(n):
+    from geo.port_matrix import get_port_matrix
+
+    matrix = get_port_matrix()
+    pairs = np.array(_port_pairs(n))
+    return lambda: matrix.lookup_km(pairs[:, 0], pairs[:, 1])
+
+
+def bench_worker_startup(n):
+    # Fresh interpreters importing what a sweep worker needs (spawn start
+    # method); catches heavy imports creeping into the core path
+    command = [sys.executable, "-c", "import core.sweep"]
+    return lambda: [subprocess.run(command, check=True) for _ in range(n)]
+
+
+def bench_cli_startup(n):
+    command = [sys.executable, "main.py", "--help"]
+    return lambda: [subprocess.run(command, check=True, stdout=subprocess.DEVNULL) for _ in range(n)]
+
+
+def bench_report_charts(n):
+    # n scenario charts rendered on one worker's reused figure
+    from utils.report import ScenarioChart
+
+    x = np.arange(12, 32, 2.0)
+    series = [{"PEMFC": (x, [x * i, x + i]), "H2-ICE": (x, [x * i * 1.2, x + 2 * i])} for i in range(1, n + 1)]
+
+    def run():
+        out_dir = tempfile.mkdtemp()
+        try:
+            chart = ScenarioChart(["cost_total_cost_usd", "emissions_total_emissions_kg_co2e"],
+                                  ["H2-ICE", "PEMFC"], "mission_duration_hours")
+            for i, s in enumerate(series):
+                chart.render(os.path.join(out_dir, f"{i}.png"), f"Scenario {i}", s)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+    return run
+
+
+# name -> (factory, max scale or None, fixed scales or None)
+BENCHMARKS = {
+    "run_simulation": (bench_run_simulation, SCALAR_MAX_SCALE, None),
+    "run_simulation_cached": (bench_run_simulation_cached, SCALAR_MAX_SCALE, None),
+    "distance_scaling_loop": (bench_distance_scaling_loop, SCALAR_MAX_SCALE, None),
+    "run_batch": (bench_run_batch, None, None),
+    "sweep": (bench_sweep, None, None),
+    "lane_load_cold": (bench_lane_load_cold, None, [1]),
+    "lane_load_warm": (bench_lane_load_warm, None, [1]),
+    "lane_match": (bench_lane_match, 10_000, None),
+    "route_astar": (bench_route_astar, 100, None),
+    "port_matrix_lookup": (bench_port_matrix_lookup, None, None),
+    "worker_startup": (bench_worker_startup, None, [1]),
+    "cli_startup": (bench_cli_startup, None, [1]),
+    "report_charts": (bench_report_charts, None, [100]),
+}
+
+
+def _repeats(n, requested):
+    # Fewer repeats for the big scales keeps a full run to a few minutes
+    if requested:
+        return requested
+    return 20 if n <= 1_000 else 5 if n <= 100_000 else 3
+
+
+def measure(name, n, repeats=None):
+    factory = BENCHMARKS[name][0]
+    fn = factory(n)
+    fn()  # warm-up: imports, lazily built caches
+
+    latencies = []
+    for _ in range(_repeats(n, repeats)):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    # Peak memory from a separate traced run, so tracing cost is not timed
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    lat = np.array(latencies)
+    p50 = float(np.percentile(lat, 50))
+    return {
+        "name": name,
+        "scale": n,
+        "repeats": len(latencies),
+        "latency_s": {
+            "p50": p50,
+            "p90": float(np.percentile(lat, 90)),
+            "p99": float(np.percentile(lat, 99)),
+            "min": float(lat.min()),
+            "max": float(lat.max()),
+            "mean": float(lat.mean()),
+        },
+        "per_item_us": p50 / n * 1e6,
+        "throughput_per_s": n / p50 if p50 > 0 else float("inf"),
+        "peak_mem_mb": peak / 2**20,
+    }
+
+
+def run_all(names, scales, repeats=None):
+    results = []
+    for name in names:
+        _, max_scale, fixed = BENCHMARKS[name]
+        for n in fixed or scales:
+            if max_scale is not None and n > max_scale:
+                continue
+            r = measure(name, n, repeats)
+            print(f"{name:<24}{n:>10,}  p50 {r['latency_s']['p50'] * 1e3:>10.3f} ms  "
+                  f"{r['throughput_per_s']:>14,.0f}/s  peak {r['peak_mem_mb']:>8.1f} MB")
+            results.append(r)
+    return results
+
+
+def environment():
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(current, baseline, threshold):
+    # Returns (name, scale, metric, baseline, current) for every regression
+    base = {(r["name"], r["scale"]): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        b = base.get((r["name"], r["scale"]))
+        if b is None:
+            continue
+        if r["latency_s"]["p50"] > b["latency_s"]["p50"] * (1 + threshold):
+            regressions.append((r["name"], r["scale"], "p50_s", b["latency_s"]["p50"], r["latency_s"]["p50"]))
+        # Small allocations are noisy; only flag memory growth above 1 MB
+        if r["peak_mem_mb"] > max(b["peak_mem_mb"] * (1 + threshold), b["peak_mem_mb"] + 1):
+            regressions.append((r["name"], r["scale"], "peak_mem_mb", b["peak_mem_mb"], r["peak_mem_mb"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HydroSim benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--scales", nargs="+", type=int, default=DEFAULT_SCALES)
+    parser.add_argument("--repeats", type=int, default=None)
+    parser.add_argument("--output", help="Result JSON path (default: outputs/benchmarks/bench_<timestamp>.json)")
+    parser.add_argument("--save-baseline", help="Also write the results to this baseline path")
+    parser.add_argument("--compare", help="Baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    report = {"environment": environment(), "results": run_all(args.only or list(BENCHMARKS), args.scales, args.repeats)}
+
+    output = args.output or os.path.join(OUTPUT_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    for path in filter(None, [output, args.save_baseline]):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"⏱️ Benchmark results saved: {path}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, scale, metric, before, after in regressions:
+            print(f"❗ Regression {name} @ {scale:,}: {metric} {before:.4g} -> {after:.4g} ({after / before - 1:+.0%})")
+        if regressions:
+            return 1
+        print(f"✅ No regressions against {args.compare} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+# core/batch.py
+#
+# Columnar counterpart of the scalar pipeline used by main.run_simulation.
+# Every stage works on whole NumPy arrays (one element per scenario) and
+# mirrors the arithmetic of the matching core/ function operation for
+# operation, so results are identical to the per-dict path.
+
+import numpy as np
+
+from core.mission_profile import AVG_SPEED_KMH
+from core.hydrogen_system import (
+    BASE_POWER_KW, DESIGN_SPEED_KMH, ENGINE_EFFICIENCY, H2_LHV_KWH_PER_KG, ORC_EFFICIENCY_GAIN
+)
+from utils.instrument import metrics
+
+SECTIONS = ["mission", "hydrogen", "energy", "cost", "emissions"]
+
+# Output keys of each stage, in the same order as the scalar dicts
+RESULT_KEYS = {
+    "mission": ["distance_km", "load_factor", "duration_hours"],
+    "hydrogen": ["engine_type", "adjusted_power_kw", "energy_required_kwh", "efficiency", "hydrogen_needed_kg"],
+    "energy": ["energy_delivered_kwh", "hydrogen_used_kg"],
+    "cost": [
+        "fuel_cost_usd", "carbon_price_usd_per_ton", "carbon_cost_usd", "total_cost_usd",
+        "hydrogen_price_usd_per_kg", "total_hydrogen_used_kg", "cost_per_km_usd", "cost_per_ton_km_usd"
+    ],
+    "emissions": [
+        "emission_factor_kg_co2e_per_kg_h2", "total_emissions_kg_co2e",
+        "emissions_per_km_kg_co2e", "emissions_per_ton_km_kg_co2e"
+    ],
+}
+
+RESULT_COLUMNS = ["engine"] + [f"{section}_{k}" for section in SECTIONS for k in RESULT_KEYS[section]]
+
+
+def as_columns(inputs):
+    # Accepts a DataFrame or a mapping of key -> array/scalar
+    if hasattr(inputs, "columns") and hasattr(inputs, "to_numpy"):
+        return {str(c): inputs[c].to_numpy() for c in inputs.columns}
+    return {k: np.asarray(v) for k, v in inputs.items()}
+
+
+def batch_size(columns):
+    sizes = {v.shape[0] for v in columns.values() if np.ndim(v) > 0}
+    if len(sizes) > 1:
+        raise ValueError(f"Batch columns have mismatched lengths: {sorted(sizes)}")
+    return sizes.pop() if sizes else 1
+
+
+def engine_efficiency(engine_type):
+    # Array version of the engine-type lookup in evaluate_hydrogen_system
+    engine_type = np.asarray(engine_type)
+    if engine_type.ndim == 0:
+        key = str(engine_type)
+        if key not in ENGINE_EFFICIENCY:
+            raise ValueError("Unsupported engine type")
+        return np.float64(ENGINE_EFFICIENCY[key])
+
+    names, codes = np.unique(engine_type.astype(str), return_inverse=True)
+    unknown = [n for n in names if n not in ENGINE_EFFICIENCY]
+    if unknown:
+        raise ValueError(f"Unsupported engine type: {', '.join(unknown)}")
+    lookup = np.array([ENGINE_EFFICIENCY[n] for n in names], dtype=np.float64)
+    return lookup[codes.reshape(engine_type.shape)]
+
+
+def simulate_mission_batch(columns):
+    if "mission_mode" in columns and np.any(columns["mission_mode"] == "timeseries"):
+        raise ValueError("Time-series missions are simulated per scenario; use simulate_mission")
+    route_km = columns["route_km"]
+    return {
+        "distance_km": route_km,
+        "load_factor": columns["load_factor"],
+        "duration_hours": route_km / columns.get("transit_speed_kmh", AVG_SPEED_KMH)
+    }
+
+
+def evaluate_hydrogen_system_batch(columns, mission):
+    engine_type = columns["engine_type"]
+    # Cube written out so the batch and scalar paths round identically
+    speed_ratio = columns.get("transit_speed_kmh", DESIGN_SPEED_KMH) / DESIGN_SPEED_KMH
+    speed_factor = speed_ratio * speed_ratio * speed_ratio
+    adjusted_power_kw = (columns.get("base_power_kw", BASE_POWER_KW) * mission["load_factor"] * speed_factor
+                         * columns.get("forcing_power_factor", 1.0))
+    energy_needed_kwh = adjusted_power_kw * mission["duration_hours"]
+    efficiency = engine_efficiency(engine_type)
+    if "enable_orc" in columns:
+        orc = np.asarray(columns["enable_orc"]).astype(bool) & (np.asarray(engine_type) == "H2-ICE")
+        efficiency = np.where(orc, efficiency * (1 + ORC_EFFICIENCY_GAIN), efficiency)
+    hydrogen_needed = energy_needed_kwh / (H2_LHV_KWH_PER_KG * efficiency)
+
+    return {
+        "engine_type": engine_type,
+        "adjusted_power_kw": adjusted_power_kw,
+        "energy_required_kwh": energy_needed_kwh,
+        "efficiency": efficiency,
+        "hydrogen_needed_kg": hydrogen_needed
+    }
+
+
+def calculate_energy_flow_batch(columns, hydrogen_data):
+    return {
+        "energy_delivered_kwh": hydrogen_data["energy_required_kwh"],
+        "hydrogen_used_kg": hydrogen_data["hydrogen_needed_kg"]
+    }
+
+
+def estimate_costs_batch(columns, energy_data):
+    fuel_cost = columns.get("fuel_cost_usd_per_kg", np.float64(5.0))
+    hydrogen_used = energy_data["hydrogen_used_kg"]
+    total_fuel_cost = fuel_cost * hydrogen_used
+
+    carbon_price = columns.get("carbon_price_usd_per_ton", np.int64(0))
+    emission_factor = columns.get("emission_factor_kg_co2e_per_kg_h2", np.int64(0))
+    emissions_ton = hydrogen_used * emission_factor / 1000
+    carbon_cost = emissions_ton * carbon_price
+    total_cost = total_fuel_cost + carbon_cost
+
+    distance_km = columns.get("route_km", np.int64(1))
+    cargo_mass = columns.get("cargo_mass_tons", np.int64(1))
+
+    return {
+        "fuel_cost_usd": total_fuel_cost,
+        "carbon_price_usd_per_ton": carbon_price,
+        "carbon_cost_usd": carbon_cost,
+        "total_cost_usd": total_cost,
+        "hydrogen_price_usd_per_kg": fuel_cost,
+        "total_hydrogen_used_kg": hydrogen_used,
+        "cost_per_km_usd": total_cost / distance_km,
+        "cost_per_ton_km_usd": total_cost / (distance_km * cargo_mass)
+    }
+
+
+def calculate_emissions_batch(columns, energy_data):
+    emission_factor = columns.get("emission_factor_kg_co2e_per_kg_h2", np.float64(10.0))
+    hydrogen_used = energy_data["hydrogen_used_kg"]
+    emissions_kg = hydrogen_used * emission_factor
+    distance_km = columns.get("route_km", np.int64(1))
+    cargo_mass = columns.get("cargo_mass_tons", np.int64(1))
+
+    return {
+        "emission_factor_kg_co2e_per_kg_h2": emission_factor,
+        "total_emissions_kg_co2e": emissions_kg,
+        "emissions_per_km_kg_co2e": emissions_kg / distance_km,
+        "emissions_per_ton_km_kg_co2e": emissions_kg / (distance_km * cargo_mass)
+    }
+
+
+def flatten_sections(sections, n):
+    # Builds the flat "<section>_<key>" layout written by main.py,
+    # broadcasting scalar inputs out to the batch length
+    out = {"engine": np.broadcast_to(sections["hydrogen"]["engine_type"], (n,))}
+    for section in SECTIONS:
+        for k in RESULT_KEYS[section]:
+            out[f"{section}_{k}"] = np.broadcast_to(sections[section][k], (n,))
+    return out
+
+
+# (section, batch function, upstream section), in run order
+BATCH_STAGES = [
+    ("mission", simulate_mission_batch, None),
+    ("hydrogen", evaluate_hydrogen_system_batch, "mission"),
+    ("energy", calculate_energy_flow_batch, "hydrogen"),
+    ("cost", estimate_costs_batch, "energy"),
+    ("emissions", calculate_emissions_batch, "energy"),
+]
+
+
+def run_batch(inputs):
+    # With profiling on, each stage is timed as "batch.<stage>" and
+    # "batch.rows" counts scenarios
+    columns = as_columns(inputs)
+    n = batch_size(columns)
+    metrics.count("batch.rows", n)
+
+    sections = {}
+    for name, fn, upstream in BATCH_STAGES:
+        with metrics.span(f"batch.{name}"):
+            sections[name] = fn(columns) if upstream is None else fn(columns, sections[upstream])
+    with metrics.span("batch.flatten"):
+        return flatten_sections(sections, n)
@@ -0,0 +1,214 @@
+# core/bunkering.py
+#
+# Event-driven simulation of hydrogen bunkering at ports. Each port has a
+# storage tank refilled at a constant production / delivery rate, a number
+# of bunkering berths and a FIFO queue of arriving vessels. A vessel starts
+# bunkering once a berth is free and the tank holds its whole demand; the
+# demand is drawn from storage at the start of bunkering. A demand larger
+# than the whole tank can never be served: it counts as a stockout (and as
+# oversized), with the excess over capacity as its shortfall.
+#
+# Events live in a single heapq ordered by (time, sequence). Storage levels
+# are advanced lazily between events, so there are no per-hour ticks and a
+# year of arrivals over dozens of ports runs in seconds.
+
+import heapq
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from utils.instrument import metrics
+from utils.logger import log
+
+DEFAULT_PORT_STORAGE = "config/fleet/port_storage.yaml"
+
+ARRIVAL, BUNKER_DONE, STOCK_READY = 0, 1, 2
+
+
+def load_port_storage(path=DEFAULT_PORT_STORAGE):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def port_parameters(port_names, storage):
+    default = storage.get("default", {})
+    overrides = storage.get("ports") or {}
+    return {name: {**default, **overrides.get(name, {})} for name in port_names}
+
+
+def arrivals_from_fleet(results):
+    # Voyages bunker at their origin port at departure (see core.fleet)
+    return pd.DataFrame({
+        "vessel": results["vessel"].to_numpy(),
+        "port": results["origin_port"].to_numpy(),
+        "time": results["departure"].to_numpy(),
+        "hydrogen_kg": results["hydrogen_kg"].to_numpy(dtype=np.float64),
+    })
+
+
+class PortState:
+    def __init__(self, params):
+        self.capacity = float(params["capacity_kg"])
+        self.rate = float(params["production_kg_per_h"])
+        self.bunker_rate = float(params["bunker_rate_kg_per_h"])
+        self.berths = int(params["berths"])
+        self.level = self.capacity * float(params.get("initial_fill", 1.0))
+        self.min_level = self.level
+        self.last_t = 0.0
+        self.level_area = 0.0       # integral of level over time (kg h)
+        self.busy_area = 0.0        # integral of busy berths over time (berth h)
+        self.busy = 0
+        self.queue = []             # arrival indices, FIFO (head at queue_head)
+        self.queue_head = 0
+        self.ready_pending = False
+
+    def advance(self, t):
+        # Production fills the tank linearly until it is full
+        dt = t - self.last_t
+        if dt <= 0:
+            return
+        self.busy_area += self.busy * dt
+        t_full = (self.capacity - self.level) / self.rate if self.rate > 0 else np.inf
+        if t_full >= dt:
+            self.level_area += self.level * dt + 0.5 * self.rate * dt * dt
+            self.level += self.rate * dt
+        else:
+            self.level_area += self.level * t_full + 0.5 * self.rate * t_full * t_full + self.capacity * (dt - t_full)
+            self.level = self.capacity
+        self.last_t = t
+
+
+def simulate_bunkering(arrivals, storage=None, start=None, horizon_h=None):
+    # arrivals: DataFrame with port, time (datetime), hydrogen_kg [, vessel].
+    # Returns (per-port summary DataFrame, per-arrival DataFrame with
+    # start / wait / stockout columns).
+    storage = storage if storage is not None else load_port_storage()
+    arrivals = arrivals.sort_values("time", ignore_index=True)
+    start = pd.Timestamp(start) if start is not None else arrivals["time"].min()
+    t_arrive = ((arrivals["time"] - start) / pd.Timedelta(hours=1)).to_numpy(dtype=np.float64)
+    demand = arrivals["hydrogen_kg"].to_numpy(dtype=np.float64)
+    port_names = arrivals["port"].to_numpy(str)
+    names = list(dict.fromkeys(port_names))
+    params = port_parameters(names, storage)
+    states = {name: PortState(params[name]) for name in names}
+
+    n = len(arrivals)
+    t_start = np.full(n, np.nan)
+    short = np.zeros(n)             # kg missing from storage when the vessel was first blocked
+    stockout = np.zeros(n, dtype=bool)
+    oversized = demand > np.array([states[p].capacity for p in port_names]) if n else np.zeros(0, dtype=bool)
+
+    events = [(t_arrive[i], i, ARRIVAL, port_names[i], i) for i in range(n)]
+    heapq.heapify(events)
+    seq = n
+
+    def try_start(port, state, t):
+        nonlocal seq
+        while state.busy < state.berths and state.queue_head < len(state.queue):
+            i = state.queue[state.queue_head]
+            if oversized[i]:
+                # More than the tank holds: never served, skip past it
+                stockout[i] = True
+                short[i] = demand[i] - state.capacity
+                state.queue_head += 1
+                continue
+            if state.level < demand[i] * (1 - 1e-9):
+                if not stockout[i]:
+                    stockout[i] = True
+                    short[i] = demand[i] - state.level
+                if state.rate > 0 and not state.ready_pending:
+                    state.ready_pending = True
+                    seq += 1
+                    heapq.heappush(events, (t + (demand[i] - state.level) / state.rate, seq, STOCK_READY, port, i))
+                return
+            state.queue_head += 1
+            state.level = max(state.level - demand[i], 0.0)
+            state.min_level = min(state.min_level, state.level)
+            state.busy += 1
+            t_start[i] = t
+            seq += 1
+            heapq.heappush(events, (t + demand[i] / state.bunker_rate, seq, BUNKER_DONE, port, i))
+
+    end_t = 0.0
+    with metrics.span("bunkering"):
+        while events:
+            t, _, kind, port, i = heapq.heappop(events)
+            if horizon_h is not None and t > horizon_h:
+                break
+            state = states[port]
+            state.advance(t)
+            end_t = t
+            if kind == ARRIVAL:
+                state.queue.append(i)
+            elif kind == BUNKER_DONE:
+                state.busy -= 1
+            else:
+                state.ready_pending = False
+            try_start(port, state, t)
+
+    end_t = horizon_h if horizon_h is not None else end_t
+    wait = t_start - t_arrive
+    per_arrival = arrivals.assign(
+        arrival_h=t_arrive, start_h=t_start, wait_h=wait,
+        stockout=stockout, oversized=oversized, shortfall_kg=short, served=~np.isnan(t_start),
+    )
+
+    rows = []
+    for name in names:
+        state = states[name]
+        state.advance(end_t)
+        mask = port_names == name
+        served = mask & ~np.isnan(t_start)
+        waits = wait[served]
+        span = end_t if end_t > 0 else np.nan
+        rows.append({
+            "port": name,
+            "arrivals": int(mask.sum()),
+            "served": int(served.sum()),
+            "unserved": int(mask.sum() - served.sum()),
+            "stockouts": int(stockout[mask].sum()),
+            "oversized": int(oversized[mask].sum()),
+            "demand_kg": float(demand[mask].sum()),
+            "supplied_kg": float(demand[served].sum()),
+            "mean_wait_h": float(waits.mean()) if waits.size else np.nan,
+            "p95_wait_h": float(np.percentile(waits, 95)) if waits.size else np.nan,
+            "max_wait_h": float(waits.max()) if waits.size else np.nan,
+            "storage_utilisation": state.level_area / (state.capacity * span),
+            "min_level_kg": state.min_level,
+            "berth_utilisation": state.busy_area / (state.berths * span),
+        })
+    summary = pd.DataFrame(rows)
+    log(f"Bunkering: {n:,} arrivals at {len(names)} ports, "
+        f"{int(stockout.sum()):,} stockouts ({int(oversized.sum()):,} over tank capacity), "
+        f"{int(n - per_arrival['served'].sum()):,} unserved")
+    return summary, per_arrival
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    from datetime import datetime
+
+    from core.fleet import load_schedule, run_fleet, synthetic_schedule
+
+    parser = argparse.ArgumentParser(description="Simulate port hydrogen bunkering for a fleet schedule")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--schedule", help="Voyage schedule CSV (see core.fleet)")
+    source.add_argument("--synthetic", type=int, help="Generate a random schedule with this many voyages")
+    parser.add_argument("--storage", default=DEFAULT_PORT_STORAGE, help="Port storage YAML")
+    parser.add_argument("--base", default="config/sample_scenarios/high_carbon_price.yaml")
+    parser.add_argument("--output-dir", default="outputs/results")
+    args = parser.parse_args()
+
+    with open(args.base, "r") as f:
+        base = yaml.safe_load(f)
+    schedule = load_schedule(args.schedule) if args.schedule else synthetic_schedule(args.synthetic)
+    results = run_fleet(schedule, base=base)
+    summary, per_arrival = simulate_bunkering(arrivals_from_fleet(results), load_port_storage(args.storage))
+    print(summary.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    out_file = f"{args.output_dir}/bunkering_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    summary.to_csv(out_file, index=False)
+    print(f"📄 Bunkering summary saved: {out_file}")
@@ -1,3 +1,10 @@
+# Config keys read by estimate_costs
+COST_INPUT_KEYS = [
+    "fuel_cost_usd_per_kg", "carbon_price_usd_per_ton", "emission_factor_kg_co2e_per_kg_h2",
+    "route_km", "cargo_mass_tons"
+]
+
+
 def estimate_costs(config, energy_data):
     fuel_cost = config.get("fuel_cost_usd_per_kg", 5.0)
     hydrogen_used = energy_data["hydrogen_used_kg"]
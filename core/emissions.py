@@ -1,5 +1,9 @@
 # core/emissions.py
 
+# Config keys read by calculate_emissions
+EMISSIONS_INPUT_KEYS = ["emission_factor_kg_co2e_per_kg_h2", "route_km", "cargo_mass_tons"]
+
+
 def calculate_emissions(config, energy_data):
     emission_factor = config.get("emission_factor_kg_co2e_per_kg_h2", 10.0)
     hydrogen_used = energy_data["hydrogen_used_kg"]
@@ -1,5 +1,9 @@
 # core/energy_flow.py
 
+# Config keys read by calculate_energy_flow
+ENERGY_INPUT_KEYS = []
+
+
 def calculate_energy_flow(config, hydrogen_data):
     # Just return hydrogen energy data for now (acts as pass-through)
     return {
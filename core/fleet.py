@@ -0,0 +1,208 @@
+# core/fleet.py
+#
+# Fleet mode: a voyage schedule (one row per voyage) evaluated in array
+# batches, one batch per vessel type, then aggregated per port, region and
+# period. Vessel types set power, engine and cargo defaults; any of those
+# can be overridden per voyage by a schedule column of the same name.
+#
+# Schedule columns: vessel, vessel_type, origin_port, destination_port,
+# departure, and optionally load_factor, cargo_mass_tons, engine_type,
+# fuel_cost_usd_per_kg. Hydrogen is bunkered, priced and its emissions
+# attributed at the origin port. With a core.forcing.ForcingGrid, each
+# voyage's power is scaled by the weather and currents met at its departure
+# time (forcing_power_factor).
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from core.batch import run_batch
+from core.mission_profile import AVG_SPEED_KMH
+from geo.ports import ports, region_mapping, region_fuel_prices
+from utils.instrument import metrics
+from utils.logger import log
+
+DEFAULT_VESSEL_TYPES = "config/fleet/vessel_types.yaml"
+
+# Per-voyage inputs a schedule column may set, falling back to the vessel type
+VOYAGE_KEYS = ["load_factor", "cargo_mass_tons", "engine_type", "base_power_kw", "fuel_cost_usd_per_kg"]
+
+# run_batch column -> fleet result column
+FLEET_COLUMNS = {
+    "mission_distance_km": "distance_km",
+    "hydrogen_engine_type": "engine_type",
+    "energy_hydrogen_used_kg": "hydrogen_kg",
+    "cost_fuel_cost_usd": "fuel_cost_usd",
+    "cost_carbon_cost_usd": "carbon_cost_usd",
+    "cost_total_cost_usd": "total_cost_usd",
+    "emissions_total_emissions_kg_co2e": "emissions_kg_co2e",
+}
+SUM_COLUMNS = [
+    "distance_km", "ton_km", "hydrogen_kg", "fuel_cost_usd", "carbon_cost_usd", "total_cost_usd", "emissions_kg_co2e"
+]
+
+
+def load_vessel_types(path=DEFAULT_VESSEL_TYPES):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def load_schedule(path):
+    return pd.read_csv(path, parse_dates=["departure"])
+
+
+def regional_fuel_price(origin_ports, engine_types, default):
+    # Hydrogen price at the origin port's region, per engine type
+    regions = pd.Series(origin_ports).map(region_mapping)
+    prices = np.full(len(regions), float(default))
+    for region, table in region_fuel_prices.items():
+        for engine, price in table.items():
+            prices[(regions == region).to_numpy() & (np.asarray(engine_types) == engine)] = price
+    return prices
+
+
+def voyage_columns(schedule, type_params, base, routing="sea_lane", forcing=None):
+    # Columnar run_batch inputs for the voyages of one vessel type
+    from geo.port_matrix import get_port_matrix
+
+    n = len(schedule)
+    columns = {**base, **type_params}
+    for key in VOYAGE_KEYS:
+        if key not in schedule:
+            continue
+        fallback = columns.get(key)
+        values = schedule[key]
+        if fallback is not None and values.isna().any():
+            values = values.fillna(fallback)
+        columns[key] = values.to_numpy()
+
+    origins = schedule["origin_port"].to_numpy(str)
+    destinations = schedule["destination_port"].to_numpy(str)
+    columns["route_km"] = get_port_matrix().lookup_km(origins, destinations, routed=routing != "great_circle")
+
+    if "fuel_cost_usd_per_kg" not in schedule and "fuel_cost_usd_per_kg" not in type_params:
+        engines = np.broadcast_to(np.asarray(columns["engine_type"], dtype=str), (n,))
+        columns["fuel_cost_usd_per_kg"] = regional_fuel_price(origins, engines, base.get("fuel_cost_usd_per_kg", 5.0))
+
+    if forcing is not None:
+        from core.forcing import port_power_factors
+
+        columns["forcing_power_factor"] = port_power_factors(
+            forcing, origins, destinations, schedule["departure"].to_numpy("datetime64[s]"), columns["route_km"],
+            columns.get("transit_speed_kmh", AVG_SPEED_KMH), routing=routing)
+    return columns
+
+
+def run_fleet(schedule, vessel_types=None, base=None, routing="sea_lane", forcing=None):
+    # Returns the schedule with per-voyage results (see FLEET_COLUMNS) and
+    # the origin region; forcing is an optional core.forcing.ForcingGrid
+    vessel_types = vessel_types if vessel_types is not None else load_vessel_types()
+    base = base or {}
+    unknown = set(schedule["vessel_type"]) - set(vessel_types)
+    if unknown:
+        raise ValueError(f"Unknown vessel type(s): {', '.join(sorted(unknown))}")
+    unknown = (set(schedule["origin_port"]) | set(schedule["destination_port"])) - set(ports)
+    if unknown:
+        raise ValueError(f"Unknown port(s): {', '.join(sorted(unknown))}")
+
+    out = schedule.reset_index(drop=True).copy()
+    extra = ["cargo_mass_tons"] + (["forcing_power_factor"] if forcing is not None else [])
+    results = {col: np.empty(len(out), dtype=object if col == "engine_type" else np.float64)
+               for col in [*FLEET_COLUMNS.values(), *extra]}
+
+    with metrics.span("fleet"):
+        for vessel_type, idx in out.groupby("vessel_type").indices.items():
+            columns = voyage_columns(out.iloc[idx], vessel_types[vessel_type], base, routing, forcing)
+            batch = run_batch(columns)
+            for src, dst in FLEET_COLUMNS.items():
+                results[dst][idx] = batch[src]
+            for col in extra:
+                results[col][idx] = columns[col]
+
+    for col, values in results.items():
+        out[col] = values
+    out["ton_km"] = out["distance_km"] * out["cargo_mass_tons"]
+    out["origin_region"] = out["origin_port"].map(region_mapping)
+    log(f"Fleet: {len(out):,} voyages, {out['vessel'].nunique():,} vessels, "
+        f"{out['hydrogen_kg'].sum() / 1000:,.1f} t H2")
+    return out
+
+
+def aggregate_fleet(results, by="origin_port", freq="M"):
+    # Totals per origin_port, origin_region, vessel / vessel_type, or
+    # "period" (departure binned by a pandas period frequency, e.g. M, Q, Y)
+    keys = [by] if isinstance(by, str) else list(by)
+    frame = results
+    if "period" in keys:
+        frame = results.assign(period=results["departure"].dt.to_period(freq))
+    grouped = frame.groupby(keys, observed=True)
+    totals = grouped[SUM_COLUMNS].sum()
+    totals.insert(0, "voyages", grouped.size())
+    totals["cost_per_ton_km_usd"] = totals["total_cost_usd"] / totals["ton_km"]
+    totals["emissions_per_ton_km_kg_co2e"] = totals["emissions_kg_co2e"] / totals["ton_km"]
+    return totals.reset_index()
+
+
+def synthetic_schedule(n_voyages, vessel_types=None, n_vessels=200, year=2025, seed=0):
+    # Random schedule for load testing: vessels keep their type and sail
+    # between random distinct ports through the year
+    vessel_types = vessel_types if vessel_types is not None else load_vessel_types()
+    rng = np.random.default_rng(seed)
+    types = np.array(list(vessel_types))
+    vessel_type = types[rng.integers(0, len(types), n_vessels)]
+    vessel = rng.integers(0, n_vessels, n_voyages)
+
+    names = np.array(ports)
+    origin = rng.integers(0, len(names), n_voyages)
+    destination = (origin + rng.integers(1, len(names), n_voyages)) % len(names)
+    start = pd.Timestamp(f"{year}-01-01")
+    departure = start + pd.to_timedelta(rng.uniform(0, 365, n_voyages), unit="D")
+
+    return pd.DataFrame({
+        "vessel": np.char.add("V", vessel.astype(str)),
+        "vessel_type": vessel_type[vessel],
+        "origin_port": names[origin],
+        "destination_port": names[destination],
+        "departure": departure.floor("h"),
+        "load_factor": rng.uniform(0.5, 1.0, n_voyages).round(2),
+    }).sort_values("departure", ignore_index=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(description="Run a HydroSim fleet simulation")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--schedule", help="Voyage schedule CSV")
+    source.add_argument("--synthetic", type=int, help="Generate a random schedule with this many voyages")
+    parser.add_argument("--vessel-types", default=DEFAULT_VESSEL_TYPES)
+    parser.add_argument("--base", default="config/sample_scenarios/high_carbon_price.yaml",
+                        help="Base config for prices and emission factor")
+    parser.add_argument("--routing", choices=["sea_lane", "great_circle"], default="sea_lane")
+    parser.add_argument("--freq", default="M", help="Period frequency for the per-period totals")
+    parser.add_argument("--forcing", default=None, help="Forcing grid directory (see core.forcing)")
+    parser.add_argument("--output-dir", default="outputs/results")
+    args = parser.parse_args()
+
+    vessel_types = load_vessel_types(args.vessel_types)
+    with open(args.base, "r") as f:
+        base = yaml.safe_load(f)
+    schedule = load_schedule(args.schedule) if args.schedule else synthetic_schedule(args.synthetic, vessel_types)
+
+    forcing = None
+    if args.forcing:
+        from core.forcing import ForcingGrid
+        forcing = ForcingGrid(args.forcing)
+    results = run_fleet(schedule, vessel_types, base, args.routing, forcing)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    results.to_csv(f"{args.output_dir}/fleet_voyages_{timestamp}.csv", index=False)
+    for by in ["origin_port", "origin_region", "period"]:
+        totals = aggregate_fleet(results, by, args.freq)
+        totals.to_csv(f"{args.output_dir}/fleet_by_{by}_{timestamp}.csv", index=False)
+        print(f"\nTotals by {by}")
+        print(totals[[by, "voyages", "hydrogen_kg", "total_cost_usd", "emissions_kg_co2e"]].to_string(index=False))
+    print(f"\n📄 Fleet results saved: {args.output_dir}/fleet_*_{timestamp}.csv")
@@ -0,0 +1,341 @@
+# core/forcing.py
+#
+# Weather and ocean-current forcing. A forcing grid is a directory holding
+# meta.json plus one float32 .npy array per variable, shaped (time, lat, lon):
+#
+#   u_wind, v_wind         10 m wind, m/s (eastward, northward)
+#   u_current, v_current   surface current, m/s
+#   wave_height            significant wave height, m
+#
+# Arrays are opened with mmap_mode="r", so a year of global fields is never
+# loaded into RAM; sampling only touches the pages around the requested
+# points. Fields are interpolated bilinearly in space and linearly in time.
+# Points outside the grid's time range (or outside a regional grid) take the
+# edge fields, and sample() logs a warning saying how many did.
+#
+# Port-to-port voyages follow their routed sea lane from the port matrix,
+# falling back to the great circle for pairs without a lane route (or with
+# routing="great_circle"); voyages given as coordinates follow the great
+# circle. Tracks are sampled at the midpoints of n_points equal-distance
+# segments (the distance used for costing is still route_km). At each sample the ship holds its scheduled speed over
+# ground, and the power needed relative to calm water is
+#
+#   (v_water / v)^3 * (1 + wind + waves)
+#   v_water = v - current along track
+#   wind    = WIND_RESISTANCE_FRACTION * (v_air |v_air| - v^2) / v^2, v_air = v + headwind
+#   waves   = WAVE_RESISTANCE_PER_M2 * wave_height^2
+#
+# The voyage mean of that multiplier is the forcing_power_factor config key
+# read by evaluate_hydrogen_system.
+
+import json
+import os
+
+import numpy as np
+
+from core.mission_profile import AVG_SPEED_KMH
+from geo.distance import haversine_km
+from utils.instrument import metrics
+from utils.logger import log
+
+VARIABLES = ["u_wind", "v_wind", "u_current", "v_current", "wave_height"]
+DEFAULT_TRACK_POINTS = 64
+VOYAGE_CHUNK = 16_384
+
+# Air drag on hull and superstructure at still air, as a fraction of calm-water resistance
+WIND_RESISTANCE_FRACTION = 0.03
+# Added resistance in waves per m^2 of significant wave height (head and beam seas averaged)
+WAVE_RESISTANCE_PER_M2 = 0.012
+
+
+class ForcingGrid:
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+        self.path = path
+        self.meta = meta
+        self.lon0, self.dlon = float(meta["lon0"]), float(meta["dlon"])
+        self.lat0, self.dlat = float(meta["lat0"]), float(meta["dlat"])
+        self.dt_h = float(meta["dt_h"])
+        self.start = np.datetime64(meta["start"], "s")
+        self.fields = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                       for name in meta.get("variables", VARIABLES)}
+        self.nt, self.nlat, self.nlon = next(iter(self.fields.values())).shape
+        # Global grids wrap in longitude; regional ones clamp at their edges
+        self.periodic = self.nlon * self.dlon >= 360 - 1e-6
+
+    def hours(self, times):
+        # datetime64 (or anything np.datetime64 accepts) -> hours since start
+        return (np.asarray(times, dtype="datetime64[s]") - self.start) / np.timedelta64(3600, "s")
+
+    def _axis(self, x, x0, dx, n, periodic=False):
+        # Lower index and weight along one axis
+        pos = (np.asarray(x, dtype=np.float64) - x0) / dx
+        if periodic:
+            pos = np.mod(pos, n)
+            i0 = np.floor(pos).astype(np.int64)
+            return i0, (i0 + 1) % n, pos - i0
+        pos = np.clip(pos, 0, n - 1)
+        i0 = np.minimum(np.floor(pos).astype(np.int64), max(n - 2, 0))
+        return i0, np.minimum(i0 + 1, n - 1), pos - i0
+
+    def _warn_outside(self, lon, lat, t_h):
+        # Out-of-range points are clamped to the edge fields in _axis
+        t_end = (self.nt - 1) * self.dt_h
+        ranges = [("time", t_h, 0.0, t_end,
+                   f"{self.start} .. {self.start + np.timedelta64(int(t_end * 3600), 's')}"),
+                  ("latitude", lat, self.lat0, self.lat0 + (self.nlat - 1) * self.dlat, None)]
+        if not self.periodic:
+            ranges.append(("longitude", lon, self.lon0, self.lon0 + (self.nlon - 1) * self.dlon, None))
+        for axis, x, a, b, text in ranges:
+            lo, hi = min(a, b) - 1e-9, max(a, b) + 1e-9
+            outside = np.count_nonzero((x < lo) | (x > hi))
+            if outside:
+                log(f"Forcing grid {self.path}: {outside:,} of {x.size:,} samples outside its {axis} range "
+                    f"({text or f'{lo:g} .. {hi:g}'}); using the edge fields", level="warning",
+                    every_s=60, key=f"forcing.outside.{self.path}.{axis}")
+
+    def sample(self, lon, lat, t_h, variables=None):
+        # Interpolated fields at points (any matching shapes); t_h in hours
+        # since start. Returns {variable: float64 array}.
+        lon, lat, t_h = np.broadcast_arrays(lon, lat, t_h)
+        self._warn_outside(lon, lat, t_h)
+        x0, x1, wx = self._axis(lon, self.lon0, self.dlon, self.nlon, self.periodic)
+        y0, y1, wy = self._axis(lat, self.lat0, self.dlat, self.nlat)
+        t0, t1, wt = self._axis(t_h, 0.0, self.dt_h, self.nt)
+        # Flat offsets and weights of the 8 surrounding grid points, shared by all variables
+        corners = []
+        for ti, w_t in ((t0, 1 - wt), (t1, wt)):
+            for yi, w_y in ((y0, 1 - wy), (y1, wy)):
+                row = (ti * self.nlat + yi) * self.nlon
+                corners += [(row + x0, w_t * w_y * (1 - wx)), (row + x1, w_t * w_y * wx)]
+        out = {}
+        with metrics.span("forcing.sample"):
+            for name in variables or self.fields:
+                flat = self.fields[name].reshape(-1)
+                value = np.zeros(lon.shape)
+                for offset, weight in corners:
+                    value += flat[offset] * weight
+                out[name] = value
+        return out
+
+
+def great_circle_track(lon1, lat1, lon2, lat2, n_points=DEFAULT_TRACK_POINTS):
+    # Midpoints of n_points equal segments along each great circle.
+    # Inputs are (V,) degrees; returns lon, lat, heading (deg from north) and
+    # the fraction of the voyage at each sample, all (V, n_points).
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(a, dtype=np.float64))[:, None] for a in (lon1, lat1, lon2, lat2))
+    a = np.stack([np.cos(lat1) * np.cos(lon1), np.cos(lat1) * np.sin(lon1), np.sin(lat1)])
+    b = np.stack([np.cos(lat2) * np.cos(lon2), np.cos(lat2) * np.sin(lon2), np.sin(lat2)])
+    omega = np.arccos(np.clip(np.sum(a * b, axis=0), -1.0, 1.0))
+    frac = (np.arange(n_points) + 0.5) / n_points
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sin_omega = np.sin(omega)
+        wa = np.where(sin_omega > 1e-12, np.sin((1 - frac) * omega) / sin_omega, 1 - frac)
+        wb = np.where(sin_omega > 1e-12, np.sin(frac * omega) / sin_omega, frac)
+    p = a * wa + b * wb
+    lat = np.arctan2(p[2], np.hypot(p[0], p[1]))
+    lon = np.arctan2(p[1], p[0])
+    # Heading at each sample: initial bearing from the sample towards the destination
+    dlon = lon2 - lon
+    heading = np.arctan2(np.sin(dlon) * np.cos(lat2),
+                         np.cos(lat) * np.sin(lat2) - np.sin(lat) * np.cos(lat2) * np.cos(dlon))
+    return np.degrees(lon), np.degrees(lat), np.degrees(heading), np.broadcast_to(frac, lon.shape)
+
+
+def polyline_track(lon, lat, n_points=DEFAULT_TRACK_POINTS):
+    # Midpoints of n_points equal-distance segments along one lon/lat
+    # polyline (e.g. a routed sea lane). Positions are interpolated along
+    # each segment the way the lanes are drawn; heading is that segment's
+    # bearing. Returns lon, lat, heading and fraction, each (n_points,).
+    lon, lat = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+    step_lon = (np.diff(lon) + 180.0) % 360.0 - 180.0
+    seg_km = haversine_km(lon[:-1], lat[:-1], lon[1:], lat[1:])
+    cum_km = np.concatenate([[0.0], np.cumsum(seg_km)])
+    frac = (np.arange(n_points) + 0.5) / n_points
+    d = frac * cum_km[-1]
+    i = np.clip(np.searchsorted(cum_km, d, side="right") - 1, 0, len(seg_km) - 1)
+    w = np.where(seg_km[i] > 0, (d - cum_km[i]) / np.where(seg_km[i] > 0, seg_km[i], 1.0), 0.0)
+    out_lon = (lon[i] + w * step_lon[i] + 180.0) % 360.0 - 180.0
+    out_lat = lat[i] + w * (lat[i + 1] - lat[i])
+
+    lat1, lat2, dlon = np.radians(lat[i]), np.radians(lat[i + 1]), np.radians(step_lon[i])
+    heading = np.arctan2(np.sin(dlon) * np.cos(lat2),
+                         np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon))
+    return out_lon, out_lat, np.degrees(heading), frac
+
+
+def _port_lat_lon(names):
+    from geo.ports import port_coords
+
+    return np.array([port_coords[n] for n in np.atleast_1d(names)], dtype=np.float64).reshape(-1, 2)
+
+
+def port_tracks(origins, destinations, routing="sea_lane", n_points=DEFAULT_TRACK_POINTS):
+    # One track per unique port pair: the routed sea lane, or the great
+    # circle for pairs without one. Returns ((lon, lat, heading, frac), each
+    # (P, n_points)) and the pair index of every voyage.
+    pairs, inverse = np.unique(np.stack([origins, destinations], axis=1), axis=0, return_inverse=True)
+    a, b = _port_lat_lon(pairs[:, 0]), _port_lat_lon(pairs[:, 1])
+    lon, lat, heading, frac = great_circle_track(a[:, 1], a[:, 0], b[:, 1], b[:, 0], n_points)
+    if routing != "great_circle":
+        from geo.port_matrix import get_port_matrix
+        from geo.routing import load_lane_graph
+
+        matrix, graph = get_port_matrix(), load_lane_graph()
+        for p, (origin, destination) in enumerate(pairs.tolist()):
+            route = matrix.route(origin, destination, graph)
+            if route is not None:
+                lon[p], lat[p], heading[p], _ = polyline_track(route.lon, route.lat, n_points)
+    return (lon, lat, heading, frac), inverse.ravel()
+
+
+def power_multiplier(speed_kmh, heading_deg, fields):
+    # Power relative to calm water at each sample (see module header)
+    v = np.asarray(speed_kmh, dtype=np.float64) / 3.6
+    h = np.radians(heading_deg)
+    east, north = np.sin(h), np.cos(h)
+    current_along = fields["u_current"] * east + fields["v_current"] * north
+    headwind = -(fields["u_wind"] * east + fields["v_wind"] * north)
+    v_water = np.maximum(v - current_along, 0.0)
+    v_air = v + headwind
+    wind = WIND_RESISTANCE_FRACTION * (v_air * np.abs(v_air) - v * v) / (v * v)
+    waves = WAVE_RESISTANCE_PER_M2 * fields["wave_height"] ** 2
+    ratio = v_water / v
+    return np.maximum(ratio * ratio * ratio * (1 + wind + waves), 0.0)
+
+
+def voyage_power_factors(grid, lon1, lat1, lon2, lat2, departure, duration_h, speed_kmh=AVG_SPEED_KMH,
+                         n_points=DEFAULT_TRACK_POINTS):
+    # Voyage-mean power multiplier per voyage; all inputs broadcast to (V,).
+    # departure is datetime64 (or ISO strings). Voyages are processed
+    # VOYAGE_CHUNK at a time, so memory is bounded whatever V is.
+    lon1, lat1, lon2, lat2, start_h, duration_h, speed_kmh = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in (lon1, lat1, lon2, lat2)),
+        np.atleast_1d(grid.hours(departure)), np.atleast_1d(np.asarray(duration_h, dtype=np.float64)),
+        np.atleast_1d(np.asarray(speed_kmh, dtype=np.float64)))
+    return _mean_power_factors(grid, lambda s: great_circle_track(lon1[s], lat1[s], lon2[s], lat2[s], n_points),
+                               start_h, duration_h, speed_kmh)
+
+
+def _mean_power_factors(grid, track, start_h, duration_h, speed_kmh):
+    # track(s) -> lon, lat, heading, frac of the voyages in slice s
+    factors = np.empty(start_h.shape[0])
+    with metrics.span("forcing.voyages"):
+        for a in range(0, len(factors), VOYAGE_CHUNK):
+            s = slice(a, a + VOYAGE_CHUNK)
+            lon, lat, heading, frac = track(s)
+            t_h = start_h[s, None] + frac * duration_h[s, None]
+            fields = grid.sample(lon, lat, t_h)
+            factors[s] = power_multiplier(speed_kmh[s, None], heading, fields).mean(axis=1)
+    return factors
+
+
+def port_power_factors(grid, origins, destinations, departure, route_km, speed_kmh=AVG_SPEED_KMH,
+                       n_points=DEFAULT_TRACK_POINTS, routing="sea_lane"):
+    # Voyage-mean power multiplier for port-name pairs along their port
+    # tracks; duration is route_km / speed. All inputs broadcast to (V,).
+    origins, destinations, start_h, route_km, speed_kmh = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(origins, dtype=str)), np.atleast_1d(np.asarray(destinations, dtype=str)),
+        np.atleast_1d(grid.hours(departure)), np.atleast_1d(np.asarray(route_km, dtype=np.float64)),
+        np.atleast_1d(np.asarray(speed_kmh, dtype=np.float64)))
+    tracks, pair = port_tracks(origins, destinations, routing, n_points)
+    return _mean_power_factors(grid, lambda s: tuple(t[pair[s]] for t in tracks),
+                               start_h, route_km / speed_kmh, speed_kmh)
+
+
+def apply_forcing(config, grid, routing="sea_lane"):
+    # Scalar config with origin_port, destination_port and departure ->
+    # config with its forcing_power_factor set
+    speed = config.get("transit_speed_kmh", AVG_SPEED_KMH)
+    factor = port_power_factors(grid, config["origin_port"], config["destination_port"],
+                                config["departure"], config["route_km"], speed, routing=routing)[0]
+    return {**config, "forcing_power_factor": float(factor)}
+
+
+def generate_synthetic_forcing(path, start="2025-01-01", days=365, dt_h=3.0, resolution_deg=1.0,
+                               lon_range=(-180.0, 180.0), lat_range=(-90.0, 90.0), seed=0):
+    # Smooth, plausible fields for tests and benchmarks: zonal wind belts
+    # plus eastward-travelling weather systems, wind-driven currents and
+    # wind-sea plus swell. Written one time step at a time through
+    # open_memmap, so grids larger than RAM can be generated.
+    os.makedirs(path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    lon = np.arange(lon_range[0], lon_range[1], resolution_deg)
+    lat = np.arange(lat_range[0], lat_range[1] + resolution_deg / 2, resolution_deg)
+    nt = int(round(days * 24 / dt_h))
+    shape = (nt, len(lat), len(lon))
+    out = {name: np.lib.format.open_memmap(os.path.join(path, f"{name}.npy"), mode="w+", dtype=np.float32,
+                                           shape=shape) for name in VARIABLES}
+
+    lon_r, lat_r = np.meshgrid(np.radians(lon), np.radians(lat))
+    # Easterly trades, mid-latitude westerlies, polar easterlies
+    zonal = -5 * np.cos(3 * lat_r) * np.cos(lat_r)
+    systems = [(rng.uniform(2, 6), rng.uniform(0, 2 * np.pi), rng.uniform(5, 10), rng.uniform(-60, 60),
+                rng.uniform(15, 30)) for _ in range(8)]
+    swell = 0.8 + 1.0 * np.abs(np.sin(lat_r)) ** 2
+
+    for k in range(nt):
+        t_days = k * dt_h / 24
+        u, v = zonal.copy(), np.zeros_like(zonal)
+        for wavenumber, phase, amplitude, centre, width in systems:
+            # A storm track drifting east at ~10 degrees per day
+            envelope = np.exp(-((np.degrees(lat_r) - centre) / width) ** 2)
+            angle = wavenumber * (lon_r - np.radians(10 * t_days)) + phase
+            u += amplitude * envelope * np.sin(angle) * 0.5
+            v += amplitude * envelope * np.cos(angle)
+        speed = np.hypot(u, v)
+        out["u_wind"][k] = u
+        out["v_wind"][k] = v
+        # Surface drift of ~3% of the wind, turned 45 degrees (Ekman)
+        out["u_current"][k] = 0.03 * (u * np.cos(np.pi / 4) + v * np.sin(np.pi / 4) * np.sign(lat_r))
+        out["v_current"][k] = 0.03 * (v * np.cos(np.pi / 4) - u * np.sin(np.pi / 4) * np.sign(lat_r))
+        out["wave_height"][k] = np.minimum(0.015 * speed * speed, 10.0) + swell
+
+    for array in out.values():
+        array.flush()
+    meta = {
+        "start": str(np.datetime64(start, "s")), "dt_h": dt_h,
+        "lon0": float(lon[0]), "dlon": resolution_deg, "lat0": float(lat[0]), "dlat": resolution_deg,
+        "shape": list(shape), "variables": VARIABLES, "synthetic_seed": seed,
+    }
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return ForcingGrid(path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Weather / current forcing grids")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="Write a synthetic forcing grid")
+    generate.add_argument("path")
+    generate.add_argument("--start", default="2025-01-01")
+    generate.add_argument("--days", type=float, default=365)
+    generate.add_argument("--dt-h", type=float, default=3.0)
+    generate.add_argument("--resolution", type=float, default=1.0, help="Grid spacing in degrees")
+    generate.add_argument("--seed", type=int, default=0)
+    route = commands.add_parser("route", help="Power factor for one port pair across departure dates")
+    route.add_argument("path")
+    route.add_argument("origin_port")
+    route.add_argument("destination_port")
+    route.add_argument("--route-km", type=float, required=True)
+    route.add_argument("--speed", type=float, default=AVG_SPEED_KMH)
+    route.add_argument("--every-days", type=float, default=7)
+    route.add_argument("--routing", choices=["sea_lane", "great_circle"], default="sea_lane")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        grid = generate_synthetic_forcing(args.path, args.start, args.days, args.dt_h, args.resolution, seed=args.seed)
+        size = sum(f.nbytes for f in grid.fields.values())
+        print(f"🌊 Forcing grid saved: {args.path} {list(grid.fields.values())[0].shape} ({size / 2**20:,.0f} MB)")
+    else:
+        grid = ForcingGrid(args.path)
+        span_h = grid.nt * grid.dt_h - args.route_km / args.speed
+        departures = grid.start + (np.arange(0, span_h, args.every_days * 24) * 3600).astype("timedelta64[s]")
+        factors = port_power_factors(grid, args.origin_port, args.destination_port, departures, args.route_km,
+                                     args.speed, routing=args.routing)
+        for departure, factor in zip(departures, factors):
+            print(f"{str(departure)[:10]}  {factor:6.3f}")
+        print(f"mean {factors.mean():.3f}  min {factors.min():.3f}  max {factors.max():.3f}")
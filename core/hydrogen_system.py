@@ -1,25 +1,51 @@
+H2_LHV_KWH_PER_KG = 33.33
+BASE_POWER_KW = 1500  # base for RoRo vessel
+DESIGN_SPEED_KMH = 30  # speed at which BASE_POWER_KW applies (the mission default)
+
+# Efficiency by engine type
+ENGINE_EFFICIENCY = {
+    "PEMFC": 0.50,
+    "H2-ICE": 0.38,
+}
+
+# Organic Rankine Cycle waste-heat recovery (H2-ICE only): relative efficiency gain
+ORC_EFFICIENCY_GAIN = 0.09
+
+# Config keys read by evaluate_hydrogen_system. forcing_power_factor is the
+# voyage-mean weather / current multiplier from core.forcing (1 = calm water).
+HYDROGEN_INPUT_KEYS = ["engine_type", "base_power_kw", "transit_speed_kmh", "enable_orc", "forcing_power_factor"]
+
+
 def evaluate_hydrogen_system(config, mission):
     engine_type = config["engine_type"]
     distance = mission["distance_km"]
     load_factor = mission["load_factor"]
 
-    # Placeholder power requirement (kW)
-    base_power_kw = 1500  # base for RoRo vessel
-    adjusted_power_kw = base_power_kw * load_factor
+    forcing_factor = config.get("forcing_power_factor", 1.0)
+    if "energy_demand_kwh" in mission:
+        # Time-series missions integrate their own power demand
+        energy_needed_kwh = mission["energy_demand_kwh"] * forcing_factor
+        adjusted_power_kw = energy_needed_kwh / mission["duration_hours"]
+    else:
+        # Placeholder power requirement (kW); fleets set it per vessel type.
+        # Propulsion power scales with the cube of speed.
+        base_power_kw = config.get("base_power_kw", BASE_POWER_KW)
+        speed_ratio = config.get("transit_speed_kmh", DESIGN_SPEED_KMH) / DESIGN_SPEED_KMH
+        speed_factor = speed_ratio * speed_ratio * speed_ratio
+        adjusted_power_kw = base_power_kw * load_factor * speed_factor * forcing_factor
 
-    # Energy needed (kWh)
-    energy_needed_kwh = adjusted_power_kw * mission["duration_hours"]
+        # Energy needed (kWh)
+        energy_needed_kwh = adjusted_power_kw * mission["duration_hours"]
 
     # Efficiency based on engine type
-    if engine_type == "PEMFC":
-        efficiency = 0.50
-    elif engine_type == "H2-ICE":
-        efficiency = 0.38
-    else:
+    if engine_type not in ENGINE_EFFICIENCY:
         raise ValueError("Unsupported engine type")
+    efficiency = ENGINE_EFFICIENCY[engine_type]
+    if config.get("enable_orc") and engine_type == "H2-ICE":
+        efficiency = efficiency * (1 + ORC_EFFICIENCY_GAIN)
 
     # Hydrogen consumption (kg)
-    hydrogen_needed = energy_needed_kwh / (33.33 * efficiency)
+    hydrogen_needed = energy_needed_kwh / (H2_LHV_KWH_PER_KG * efficiency)
 
     return {
         "engine_type": engine_type,
@@ -1,7 +1,123 @@
+import numpy as np
+
+from core.hydrogen_system import BASE_POWER_KW
+
+AVG_SPEED_KMH = 30
+
+# Time-series missions (config["mission_mode"] == "timeseries")
+DEFAULT_TIMESTEP_S = 60
+DEFAULT_CHUNK_STEPS = 1_000_000
+PHASE_NAMES = ["manoeuvring", "transit", "berthing"]
+PHASE_DEFAULTS = {
+    "manoeuvring_hours": 1.0,
+    "manoeuvring_speed_kmh": 10.0,
+    "berthing_hours": 0.5,
+    "berthing_speed_kmh": 5.0,
+}
+
+# Config keys read by simulate_mission
+MISSION_INPUT_KEYS = [
+    "route_km", "load_factor", "mission_mode", "timestep_s", "transit_speed_kmh", "base_power_kw",
+    "manoeuvring_hours", "manoeuvring_speed_kmh", "berthing_hours", "berthing_speed_kmh"
+]
+
+
 def simulate_mission(config):
+    if config.get("mission_mode") == "timeseries":
+        return simulate_mission_timeseries(config)
+
     # For now just return dummy mission data
     return {
         "distance_km": config["route_km"],
         "load_factor": config["load_factor"],
-        "duration_hours": config["route_km"] / 30  # Assume avg 30 km/h
+        "duration_hours": config["route_km"] / config.get("transit_speed_kmh", AVG_SPEED_KMH)  # Default avg 30 km/h
+    }
+
+
+def mission_phases(config):
+    # (hours, speed km/h, engine load) per phase. Harbour phases run at their
+    # own speed; transit covers the remaining distance. Routes shorter than
+    # the harbour phases shorten those phases proportionally, so the phases
+    # always add up to route_km. Engine load follows the propeller law,
+    # load_factor * (v / AVG_SPEED_KMH)^3.
+    transit_speed = config.get("transit_speed_kmh", AVG_SPEED_KMH)
+    load_factor = config["load_factor"]
+    harbour = []
+    for phase in ("manoeuvring", "berthing"):
+        hours = config.get(f"{phase}_hours", PHASE_DEFAULTS[f"{phase}_hours"])
+        speed = config.get(f"{phase}_speed_kmh", PHASE_DEFAULTS[f"{phase}_speed_kmh"])
+        harbour.append((hours, speed))
+
+    harbour_km = sum(hours * speed for hours, speed in harbour)
+    if harbour_km > config["route_km"]:
+        scale = config["route_km"] / harbour_km
+        harbour = [(hours * scale, speed) for hours, speed in harbour]
+    transit_km = max(config["route_km"] - harbour_km, 0.0)
+    phases = [harbour[0], (transit_km / transit_speed, transit_speed), harbour[1]]
+    return [(hours, speed, load_factor * (speed / AVG_SPEED_KMH) ** 3) for hours, speed in phases]
+
+
+def iter_mission_profile(config, chunk_steps=DEFAULT_CHUNK_STEPS):
+    # Yields the mission as float32 arrays, chunk_steps samples at a time.
+    # The last step of each phase is shortened so phase durations are exact.
+    dt_h = config.get("timestep_s", DEFAULT_TIMESTEP_S) / 3600
+    phases = mission_phases(config)
+    hours = np.array([p[0] for p in phases])
+    speed = np.array([p[1] for p in phases], dtype=np.float32)
+    load = np.array([p[2] for p in phases], dtype=np.float32)
+    base_power_kw = config.get("base_power_kw", BASE_POWER_KW)
+
+    steps = np.ceil(hours / dt_h - 1e-9).astype(np.int64)
+    first = np.concatenate([[0], np.cumsum(steps)])
+    start_h = np.concatenate([[0.0], np.cumsum(hours)])
+    last_dt_h = hours - (steps - 1) * dt_h
+
+    for a in range(0, int(first[-1]), chunk_steps):
+        idx = np.arange(a, min(a + chunk_steps, first[-1]))
+        phase = np.searchsorted(first[1:], idx, side="right")
+        local = idx - first[phase]
+        dt = np.where(local == steps[phase] - 1, last_dt_h[phase], dt_h).astype(np.float32)
+        yield {
+            "time_h": (start_h[phase] + local * dt_h).astype(np.float32),
+            "dt_h": dt,
+            "phase": phase.astype(np.int8),
+            "speed_kmh": speed[phase],
+            "load": load[phase],
+            "power_kw": (base_power_kw * load[phase]).astype(np.float32),
+        }
+
+
+def mission_profile(config):
+    # Whole mission as arrays (for plotting / inspection)
+    chunks = list(iter_mission_profile(config))
+    return {k: np.concatenate([c[k] for c in chunks]) for k in chunks[0]}
+
+
+def integrate_mission(config, chunk_steps=DEFAULT_CHUNK_STEPS):
+    # Accumulates in float64 over float32 chunks, so memory is bounded by
+    # chunk_steps whatever the voyage length or timestep
+    duration_h = distance_km = energy_kwh = 0.0
+    peak_power_kw = 0.0
+    for chunk in iter_mission_profile(config, chunk_steps):
+        dt = chunk["dt_h"].astype(np.float64)
+        duration_h += float(dt.sum())
+        distance_km += float(np.dot(chunk["speed_kmh"], dt))
+        energy_kwh += float(np.dot(chunk["power_kw"], dt))
+        peak_power_kw = max(peak_power_kw, float(chunk["power_kw"].max()))
+    return {
+        "duration_hours": duration_h,
+        "distance_km": distance_km,
+        "energy_demand_kwh": energy_kwh,
+        "peak_power_kw": peak_power_kw,
+    }
+
+
+def simulate_mission_timeseries(config):
+    totals = integrate_mission(config)
+    return {
+        "distance_km": config["route_km"],
+        "load_factor": config["load_factor"],
+        "duration_hours": totals["duration_hours"],
+        "energy_demand_kwh": totals["energy_demand_kwh"],
+        "peak_power_kw": totals["peak_power_kw"],
     }
@@ -0,0 +1,169 @@
+# core/monte_carlo.py
+#
+# Monte Carlo uncertainty mode. Any config key can be given a distribution;
+# N draws are made as arrays with a seeded generator and pushed through
+# core.batch.run_batch in one vectorized pass. Results are reported as
+# percentile bands and histograms of cost and emissions.
+#
+# A spec (usually YAML) looks like a sweep spec:
+#
+#   base: config/sample_scenarios/high_carbon_price.yaml
+#   base_config: {engine_type: PEMFC}
+#   samples: 1000000
+#   seed: 42
+#   distributions:
+#     fuel_cost_usd_per_kg: {dist: triangular, low: 3, mode: 5, high: 10}
+#     carbon_price_usd_per_ton: {dist: normal, mean: 100, std: 40, min: 0}
+#     emission_factor_kg_co2e_per_kg_h2: {low: 0, high: 10}
+#   scenarios:                     # optional, evaluated in parallel
+#     - {engine_type: PEMFC}
+#     - {engine_type: H2-ICE}
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import yaml
+
+from core.batch import run_batch
+from core.sweep import base_config
+from utils.instrument import metrics
+from utils.logger import log
+
+DEFAULT_SAMPLES = 100_000
+DEFAULT_PERCENTILES = [5, 25, 50, 75, 95]
+DEFAULT_BINS = 50
+
+# Reported metric -> run_batch result column
+OUTPUT_METRICS = {
+    "total_cost_usd": "cost_total_cost_usd",
+    "cost_per_ton_km_usd": "cost_cost_per_ton_km_usd",
+    "total_emissions_kg_co2e": "emissions_total_emissions_kg_co2e",
+    "emissions_per_ton_km_kg_co2e": "emissions_emissions_per_ton_km_kg_co2e",
+}
+
+DISTRIBUTIONS = {
+    "uniform": lambda rng, p, n: rng.uniform(p["low"], p["high"], n),
+    "normal": lambda rng, p, n: rng.normal(p["mean"], p["std"], n),
+    "lognormal": lambda rng, p, n: rng.lognormal(p["mean"], p["sigma"], n),
+    "triangular": lambda rng, p, n: rng.triangular(p["low"], p["mode"], p["high"], n),
+    "choice": lambda rng, p, n: np.asarray(p["values"])[rng.choice(len(p["values"]), n, p=p.get("p"))],
+}
+
+
+def load_monte_carlo_spec(path):
+    with open(path, "r") as f:
+        spec = yaml.safe_load(f)
+    if "distributions" not in spec:
+        raise ValueError(f"Monte Carlo spec {path} has no 'distributions' section")
+    return spec
+
+
+def sample_distribution(rng, param, n):
+    # A list is an equally likely choice; a dict names its "dist" (uniform
+    # when omitted) and may clip the draws to [min, max]
+    if not isinstance(param, dict):
+        param = {"dist": "choice", "values": list(param)}
+    dist = param.get("dist", "uniform")
+    if dist not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {dist}")
+    values = DISTRIBUTIONS[dist](rng, param, n)
+    if "min" in param or "max" in param:
+        values = np.clip(values, param.get("min"), param.get("max"))
+    return values
+
+
+def draw_samples(distributions, n, seed=0):
+    # Keys are drawn in sorted order so a seed gives the same samples
+    # however the spec is written
+    rng = np.random.default_rng(seed)
+    return {key: sample_distribution(rng, distributions[key], n) for key in sorted(distributions)}
+
+
+def summarize(values, percentiles=DEFAULT_PERCENTILES, bins=DEFAULT_BINS):
+    values = np.asarray(values, dtype=np.float64)
+    counts, edges = np.histogram(values, bins=bins)
+    bands = np.percentile(values, percentiles)
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "percentiles": {f"p{p:g}": float(v) for p, v in zip(percentiles, bands)},
+        "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+    }
+
+
+def run_monte_carlo(config, distributions, samples=DEFAULT_SAMPLES, seed=0,
+                    percentiles=DEFAULT_PERCENTILES, bins=DEFAULT_BINS, return_samples=False):
+    with metrics.span("monte_carlo"):
+        columns = {**config, **draw_samples(distributions, int(samples), seed)}
+        results = run_batch(columns)
+        summary = {
+            "samples": int(samples),
+            "metrics": {name: summarize(results[col], percentiles, bins) for name, col in OUTPUT_METRICS.items()},
+        }
+    if return_samples:
+        summary["results"] = results
+    return summary
+
+
+def _run_scenario(task):
+    config, distributions, samples, seed, percentiles, bins = task
+    return run_monte_carlo(config, distributions, samples, seed, percentiles, bins)
+
+
+def run_monte_carlo_spec(spec, workers=None):
+    # Returns one summary per scenario (a single one without "scenarios").
+    # Each scenario gets an independent child seed of the spec seed.
+    base = base_config(spec)
+    overrides = spec.get("scenarios") or [{}]
+    seeds = np.random.SeedSequence(int(spec.get("seed", 0))).spawn(len(overrides))
+    tasks = [
+        ({**base, **o}, spec["distributions"], spec.get("samples", DEFAULT_SAMPLES), s,
+         spec.get("percentiles", DEFAULT_PERCENTILES), spec.get("bins", DEFAULT_BINS))
+        for o, s in zip(overrides, seeds)
+    ]
+
+    workers = min(workers or spec.get("workers") or os.cpu_count() or 1, len(tasks))
+    log(f"Monte Carlo: {len(tasks)} scenario(s) x {int(tasks[0][2]):,} samples on {workers} worker(s)")
+    if workers == 1:
+        summaries = [_run_scenario(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            summaries = list(pool.map(_run_scenario, tasks))
+
+    for override, summary in zip(overrides, summaries):
+        summary["scenario"] = override
+    return summaries
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(description="Run a HydroSim Monte Carlo uncertainty analysis")
+    parser.add_argument("spec", help="Monte Carlo spec YAML file")
+    parser.add_argument("--samples", type=int, default=None, help="Override the spec sample count")
+    parser.add_argument("--seed", type=int, default=None, help="Override the spec seed")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output-dir", default="outputs/results")
+    args = parser.parse_args()
+
+    spec = load_monte_carlo_spec(args.spec)
+    if args.samples is not None:
+        spec["samples"] = args.samples
+    if args.seed is not None:
+        spec["seed"] = args.seed
+
+    summaries = run_monte_carlo_spec(spec, args.workers)
+    for summary in summaries:
+        print(f"\nScenario {summary['scenario'] or '(base)'}")
+        for name, m in summary["metrics"].items():
+            bands = "  ".join(f"{p} {v:,.4g}" for p, v in m["percentiles"].items())
+            print(f"  {name:<32}{bands}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    out_file = f"{args.output_dir}/monte_carlo_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out_file, "w") as f:
+        json.dump({"spec": spec, "scenarios": summaries}, f, indent=2, default=str)
+    print(f"📄 Monte Carlo results saved: {out_file}")
@@ -0,0 +1,215 @@
+# core/optimizer.py
+#
+# Multi-objective search over engine type, ORC, transit speed and hydrogen
+# source, per route. Every route is evaluated on the full candidate design
+# (engines x speeds x sources) in one run_batch call per chunk of routes,
+# and the non-dominated candidates -- by default total cost, total emissions
+# and voyage duration -- are returned as that route's Pareto frontier.
+#
+# Duration has to be an objective for the speed search to mean anything:
+# propulsion power scales with v^3 and duration with 1/v, so energy, cost and
+# emissions all scale with v^2 and on cost/emissions alone the slowest speed
+# always dominates. Faster candidates only survive because they arrive sooner.
+#
+# Hydrogen is priced at the departure port's region (per engine type) times
+# the source's price multiplier. Chunk results are memoized in a StageCache
+# (optionally on disk) on the base config, the candidate design, the port
+# matrix the distances came from and the chunk's routes, so rerunning a
+# frontier for all port pairs only evaluates routes whose inputs changed.
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from core.batch import run_batch
+from core.fleet import regional_fuel_price
+from core.stage_cache import StageCache, config_hash
+from core.sweep import base_config, parameter_values
+from utils.instrument import metrics
+from utils.logger import log
+
+DEFAULT_SOURCES = "config/optimizer/h2_sources.yaml"
+DEFAULT_ENGINES = [
+    {"engine_type": "PEMFC", "enable_orc": False},
+    {"engine_type": "H2-ICE", "enable_orc": False},
+    {"engine_type": "H2-ICE", "enable_orc": True},
+]
+DEFAULT_SPEEDS = {"start": 12, "stop": 42, "step": 2}
+DEFAULT_OBJECTIVES = ["total_cost_usd", "total_emissions_kg_co2e", "duration_hours"]
+ROUTE_CHUNK_ROWS = 100_000
+
+# Objective / reported metric -> run_batch result column
+OUTPUT_COLUMNS = {
+    "total_cost_usd": "cost_total_cost_usd",
+    "total_emissions_kg_co2e": "emissions_total_emissions_kg_co2e",
+    "duration_hours": "mission_duration_hours",
+    "hydrogen_kg": "energy_hydrogen_used_kg",
+    "cost_per_ton_km_usd": "cost_cost_per_ton_km_usd",
+    "emissions_per_ton_km_kg_co2e": "emissions_emissions_per_ton_km_kg_co2e",
+}
+
+
+def load_optimizer_spec(path):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def load_sources(sources=DEFAULT_SOURCES):
+    if isinstance(sources, dict):
+        return sources
+    with open(sources, "r") as f:
+        return yaml.safe_load(f)
+
+
+def candidate_design(engines, speeds, sources):
+    # One row per (engine option, speed, source), as arrays of length m
+    rows = list(itertools.product(range(len(engines)), range(len(speeds)), list(sources)))
+    engine_idx, speed_idx, source = (np.array(c) for c in zip(*rows))
+    return {
+        "engine_type": np.array([e["engine_type"] for e in engines])[engine_idx],
+        "enable_orc": np.array([bool(e.get("enable_orc", False)) for e in engines])[engine_idx],
+        "transit_speed_kmh": np.asarray(speeds, dtype=np.float64)[speed_idx],
+        "h2_source": source,
+        "emission_factor_kg_co2e_per_kg_h2": np.array(
+            [sources[s]["emission_factor_kg_co2e_per_kg_h2"] for s in source], dtype=np.float64),
+        "price_multiplier": np.array([sources[s].get("price_multiplier", 1.0) for s in source], dtype=np.float64),
+    }
+
+
+def pareto_front(objectives):
+    # objectives: (..., m, k), all minimised. Returns the (..., m) mask of
+    # non-dominated candidates. Loops over the m challengers, so memory
+    # stays O(routes * m * k).
+    obj = np.asarray(objectives, dtype=np.float64)
+    dominated = np.zeros(obj.shape[:-1], dtype=bool)
+    for j in range(obj.shape[-2]):
+        challenger = obj[..., j:j + 1, :]
+        dominated |= np.all(challenger <= obj, axis=-1) & np.any(challenger < obj, axis=-1)
+    return ~dominated
+
+
+def evaluate_routes(task):
+    # Evaluates every candidate on every route of a chunk; returns (R, m)
+    # arrays of OUTPUT_COLUMNS
+    base, design, origins, destinations, routing = task
+    from geo.port_matrix import get_port_matrix
+
+    r, m = len(origins), len(design["engine_type"])
+    route_km = get_port_matrix().lookup_km(origins, destinations, routed=routing != "great_circle")
+    columns = {k: np.tile(v, r) for k, v in design.items() if k not in ("h2_source", "price_multiplier")}
+    columns["route_km"] = np.repeat(route_km, m)
+    engines = columns["engine_type"]
+    columns["fuel_cost_usd_per_kg"] = regional_fuel_price(
+        np.repeat(origins, m), engines, base.get("fuel_cost_usd_per_kg", 5.0)) * np.tile(design["price_multiplier"], r)
+
+    results = run_batch({**base, **columns})
+    out = {name: np.broadcast_to(results[col], (r * m,)).reshape(r, m) for name, col in OUTPUT_COLUMNS.items()}
+    out["route_km"] = route_km
+    return out
+
+
+def _route_chunks(pairs, m):
+    per_chunk = max(1, ROUTE_CHUNK_ROWS // m)
+    return [pairs[a:a + per_chunk] for a in range(0, len(pairs), per_chunk)]
+
+
+def port_matrix_key():
+    # Changes whenever lookup_km could: new lane data, matrix format or ports
+    from geo.port_matrix import get_port_matrix
+
+    matrix = get_port_matrix()
+    return config_hash({"lanes_sha256": str(matrix.graph_sha256), "format": int(matrix.format_version),
+                        "names": matrix.names.tolist(), "lon": matrix.lon.tolist(), "lat": matrix.lat.tolist()})
+
+
+def resolve_routes(routes):
+    from geo.port_matrix import get_port_matrix
+
+    if routes in (None, "all"):
+        names = get_port_matrix().names
+        return [(a, b) for a, b in itertools.permutations(names, 2)]
+    return [tuple(r) for r in routes]
+
+
+def optimize(spec, workers=None, cache=None):
+    # Returns a DataFrame with the Pareto-optimal candidates of every route
+    base = base_config(spec)
+    sources = load_sources(spec.get("sources", DEFAULT_SOURCES))
+    engines = spec.get("engines") or DEFAULT_ENGINES
+    speeds = parameter_values(spec.get("transit_speed_kmh", DEFAULT_SPEEDS))
+    objectives = spec.get("objectives") or DEFAULT_OBJECTIVES
+    routing = spec.get("routing", "sea_lane")
+    design = candidate_design(engines, speeds, sources)
+    m = len(design["engine_type"])
+
+    pairs = resolve_routes(spec.get("routes", "all"))
+    chunks = _route_chunks(pairs, m)
+    cache = cache if cache is not None else StageCache(disk_dir=spec.get("cache_dir"))
+    design_key = config_hash({k: v.tolist() for k, v in design.items()})
+    matrix_key = port_matrix_key()
+    keys = [config_hash(base, extra=[design_key, routing, matrix_key, chunk]) for chunk in chunks]
+
+    results = [cache.get("optimizer", key) for key in keys]
+    missing = [i for i, r in enumerate(results) if r is None]
+    tasks = [(base, design, np.array([p[0] for p in chunks[i]]), np.array([p[1] for p in chunks[i]]), routing)
+             for i in missing]
+
+    workers = min(workers or spec.get("workers") or 1, max(len(tasks), 1))
+    log(f"Optimizer: {len(pairs):,} routes x {m} candidates, {len(tasks)}/{len(chunks)} chunks to evaluate "
+        f"on {workers} worker(s)")
+    with metrics.span("optimizer.evaluate"):
+        if workers == 1:
+            evaluated = [evaluate_routes(t) for t in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                evaluated = list(pool.map(evaluate_routes, tasks))
+    for i, value in zip(missing, evaluated):
+        cache.put("optimizer", keys[i], value)
+        results[i] = value
+
+    frames = []
+    with metrics.span("optimizer.pareto"):
+        for chunk, res in zip(chunks, results):
+            front = pareto_front(np.stack([res[o] for o in objectives], axis=-1))
+            route_idx, cand_idx = np.nonzero(front)
+            frame = pd.DataFrame({
+                "origin_port": np.array([p[0] for p in chunk])[route_idx],
+                "destination_port": np.array([p[1] for p in chunk])[route_idx],
+                "route_km": res["route_km"][route_idx],
+                "engine_type": design["engine_type"][cand_idx],
+                "enable_orc": design["enable_orc"][cand_idx],
+                "transit_speed_kmh": design["transit_speed_kmh"][cand_idx],
+                "h2_source": design["h2_source"][cand_idx],
+            })
+            for name in OUTPUT_COLUMNS:
+                frame[name] = res[name][route_idx, cand_idx]
+            frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(description="Pareto frontier of cost, emissions and voyage time per route")
+    parser.add_argument("spec", help="Optimizer spec YAML file")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-dir", default=None, help="Disk cache for evaluated route chunks")
+    parser.add_argument("--output-dir", default="outputs/results")
+    args = parser.parse_args()
+
+    spec = load_optimizer_spec(args.spec)
+    if args.cache_dir:
+        spec["cache_dir"] = args.cache_dir
+    frontier = optimize(spec, args.workers)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    out_file = f"{args.output_dir}/pareto_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    frontier.to_csv(out_file, index=False)
+    per_route = frontier.groupby(["origin_port", "destination_port"]).size()
+    print(f"📄 Pareto frontier saved: {out_file} ({len(frontier):,} points, "
+          f"{per_route.mean():.1f} per route over {len(per_route):,} routes)")
@@ -0,0 +1,42 @@
+# core/pipeline.py
+#
+# The scalar core/ pipeline as a list of stages. Each stage declares the
+# config keys it reads and the stages whose output it consumes; with a
+# StageCache, every stage is memoized on exactly those inputs.
+
+from core.mission_profile import simulate_mission, MISSION_INPUT_KEYS
+from core.hydrogen_system import evaluate_hydrogen_system, HYDROGEN_INPUT_KEYS
+from core.energy_flow import calculate_energy_flow, ENERGY_INPUT_KEYS
+from core.cost_model import estimate_costs, COST_INPUT_KEYS
+from core.emissions import calculate_emissions, EMISSIONS_INPUT_KEYS
+from core.stage_cache import config_hash
+from utils.instrument import metrics
+
+# Bump when a stage's output changes for the same config, so persisted
+# results (utils.results_store) from older models are not reused
+MODEL_VERSION = 1
+
+# (name, function, config keys, upstream stage)
+STAGES = [
+    ("mission", simulate_mission, MISSION_INPUT_KEYS, None),
+    ("hydrogen", evaluate_hydrogen_system, HYDROGEN_INPUT_KEYS, "mission"),
+    ("energy", calculate_energy_flow, ENERGY_INPUT_KEYS, "hydrogen"),
+    ("cost", estimate_costs, COST_INPUT_KEYS, "energy"),
+    ("emissions", calculate_emissions, EMISSIONS_INPUT_KEYS, "energy"),
+]
+SPAN_NAMES = {name: f"pipeline.{name}" for name, _, _, _ in STAGES}
+
+
+def run_pipeline(config, cache=None):
+    # With profiling on, each stage is timed as "pipeline.<stage>"
+    results, keys = {}, {}
+    with metrics.span("pipeline"):
+        for name, fn, input_keys, upstream in STAGES:
+            args = (config,) if upstream is None else (config, results[upstream])
+            with metrics.span(SPAN_NAMES[name]):
+                if cache is None:
+                    results[name] = fn(*args)
+                    continue
+                keys[name] = config_hash(config, input_keys, [name, keys.get(upstream)])
+                results[name] = cache.get_or_compute(name, keys[name], lambda: fn(*args))
+    return results
@@ -0,0 +1,223 @@
+# core/sensitivity.py
+#
+# Global sensitivity analysis over declared parameter ranges. Two designs:
+#
+#   sobol   Saltelli design: base matrices A, B and, per parameter, A with
+#           that column taken from B -- N * (d + 2) evaluations. First-order
+#           indices use the Saltelli (2010) estimator on mean-centred
+#           outputs, total indices Jansen's; confidence intervals come from
+#           bootstrapping the N rows.
+#   morris  r one-at-a-time trajectories on a p-level grid -- r * (d + 1)
+#           evaluations; reports mu, mu* and sigma of the elementary effects.
+#
+# Designs are drawn in the unit hypercube, mapped onto the parameter ranges
+# and evaluated with core.batch.run_batch in chunks, optionally sharded over
+# a process pool. A spec (usually YAML) follows the sweep spec layout:
+#
+#   base: config/sample_scenarios/high_carbon_price.yaml
+#   method: sobol
+#   samples: 16384
+#   parameters:
+#     route_km: {low: 100, high: 3000}
+#     engine_type: [PEMFC, H2-ICE]
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import yaml
+
+from core.batch import run_batch
+from core.sweep import base_config, chunk_bounds, DEFAULT_CHUNK_SIZE
+from utils.instrument import metrics
+from utils.logger import log
+
+DEFAULT_OUTPUTS = {
+    "cost_per_ton_km_usd": "cost_cost_per_ton_km_usd",
+    "emissions_per_ton_km_kg_co2e": "emissions_emissions_per_ton_km_kg_co2e",
+}
+DEFAULT_SAMPLES = 4096
+DEFAULT_BOOTSTRAP = 100
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_LEVELS = 4
+
+
+def load_sensitivity_spec(path):
+    with open(path, "r") as f:
+        spec = yaml.safe_load(f)
+    if "parameters" not in spec:
+        raise ValueError(f"Sensitivity spec {path} has no 'parameters' section")
+    return spec
+
+
+def scale_parameter(param, u):
+    # {low, high} maps linearly; a list of values is split into equal slices
+    if isinstance(param, dict):
+        return param["low"] + u * (param["high"] - param["low"])
+    values = np.asarray(param)
+    return values[np.minimum((u * len(values)).astype(np.int64), len(values) - 1)]
+
+
+def _evaluate_chunk(task):
+    config, parameters, unit, outputs = task
+    columns = dict(config)
+    for j, (key, param) in enumerate(parameters.items()):
+        columns[key] = scale_parameter(param, unit[:, j])
+    results = run_batch(columns)
+    n = unit.shape[0]
+    return {name: np.broadcast_to(results[col], (n,)).astype(np.float64) for name, col in outputs.items()}
+
+
+def evaluate_design(config, parameters, unit, outputs=None, workers=1, chunk_size=None):
+    # unit: (n, d) points in [0, 1)^d, columns in parameters order
+    outputs = outputs or DEFAULT_OUTPUTS
+    tasks = [(config, parameters, unit[a:b], outputs)
+             for a, b in chunk_bounds(unit.shape[0], chunk_size or DEFAULT_CHUNK_SIZE)]
+    with metrics.span("sensitivity.evaluate"):
+        if workers == 1 or len(tasks) == 1:
+            chunks = [_evaluate_chunk(t) for t in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunks = list(pool.map(_evaluate_chunk, tasks))
+    return {name: np.concatenate([c[name] for c in chunks]) for name in outputs}
+
+
+def saltelli_design(n, d, seed=0):
+    # Rows: A (n), B (n), then AB_1 ... AB_d (n each)
+    rng = np.random.default_rng(seed)
+    a, b = rng.random((n, d)), rng.random((n, d))
+    ab = np.repeat(a[None], d, axis=0)
+    ab[np.arange(d), :, np.arange(d)] = b.T
+    return np.concatenate([a, b, ab.reshape(n * d, d)])
+
+
+def sobol_indices(y, n, d):
+    # y ordered as saltelli_design; returns first-order and total indices.
+    # Outputs are centred first: the first-order estimator's variance grows
+    # with the output mean, and costs sit far from zero.
+    y = y - np.mean(y[:2 * n])
+    ya, yb, yab = y[:n], y[n:2 * n], y[2 * n:].reshape(d, n).T
+    var = np.var(np.concatenate([ya, yb]))
+    if var == 0:
+        return np.full(d, np.nan), np.full(d, np.nan)
+    first = np.mean(yb[:, None] * (yab - ya[:, None]), axis=0) / var
+    total = 0.5 * np.mean((ya[:, None] - yab) ** 2, axis=0) / var
+    return first, total
+
+
+def bootstrap_sobol(y, n, d, resamples=DEFAULT_BOOTSTRAP, confidence=DEFAULT_CONFIDENCE, seed=0):
+    # Percentile intervals from resampling the n design rows with replacement
+    rng = np.random.default_rng(seed)
+    ya, yb, yab = y[:n], y[n:2 * n], y[2 * n:].reshape(d, n).T
+    first = np.empty((resamples, d))
+    total = np.empty((resamples, d))
+    for r in range(resamples):
+        idx = rng.integers(0, n, n)
+        sample = np.concatenate([ya[idx], yb[idx], yab[idx].T.ravel()])
+        first[r], total[r] = sobol_indices(sample, n, d)
+    tail = (1 - confidence) / 2 * 100
+    return np.percentile(first, [tail, 100 - tail], axis=0), np.percentile(total, [tail, 100 - tail], axis=0)
+
+
+def morris_design(r, d, levels=DEFAULT_LEVELS, seed=0):
+    # r trajectories of d + 1 points. Each starts on the p-level grid and
+    # moves one coordinate at a time, in random order, by +/- delta.
+    rng = np.random.default_rng(seed)
+    delta = levels / (2 * (levels - 1))
+    x0 = rng.integers(0, levels, (r, d)) / (levels - 1)
+    step = np.where(x0 + delta <= 1, delta, -delta)
+    order = np.argsort(rng.random((r, d)), axis=1)
+
+    moves = np.zeros((r, d, d))
+    rows = np.arange(r)[:, None]
+    moves[rows, np.arange(d)[None, :], order] = step[rows, order]
+    points = x0[:, None, :] + np.concatenate([np.zeros((r, 1, d)), np.cumsum(moves, axis=1)], axis=1)
+    # Keep the top level strictly inside [0, 1) for scale_parameter
+    return np.minimum(points, np.nextafter(1, 0)).reshape(r * (d + 1), d), order, step
+
+
+def morris_effects(y, order, step):
+    r, d = order.shape
+    y = y.reshape(r, d + 1)
+    rows = np.arange(r)[:, None]
+    effects = np.empty((r, d))
+    effects[rows, order] = np.diff(y, axis=1) / step[rows, order]
+    return {
+        "mu": effects.mean(axis=0),
+        "mu_star": np.abs(effects).mean(axis=0),
+        "sigma": effects.std(axis=0, ddof=1) if r > 1 else np.zeros(d),
+    }
+
+
+def run_sensitivity(spec, workers=None, chunk_size=None):
+    config = base_config(spec)
+    parameters = spec["parameters"]
+    names = list(parameters)
+    d = len(names)
+    method = spec.get("method", "sobol")
+    seed = int(spec.get("seed", 0))
+    n = int(spec.get("samples", DEFAULT_SAMPLES))
+    outputs = spec.get("outputs") or DEFAULT_OUTPUTS
+    workers = workers or spec.get("workers") or 1
+
+    if method == "sobol":
+        unit = saltelli_design(n, d, seed)
+    elif method == "morris":
+        unit, order, step = morris_design(n, d, int(spec.get("levels", DEFAULT_LEVELS)), seed)
+    else:
+        raise ValueError(f"Unknown sensitivity method: {method}")
+
+    log(f"Sensitivity ({method}): {d} parameters, {unit.shape[0]:,} evaluations on {workers} worker(s)")
+    ys = evaluate_design(config, parameters, unit, outputs, workers, chunk_size)
+
+    report = {"method": method, "parameters": names, "evaluations": int(unit.shape[0]), "outputs": {}}
+    for name, y in ys.items():
+        if method == "morris":
+            report["outputs"][name] = {k: dict(zip(names, v.tolist())) for k, v in morris_effects(y, order, step).items()}
+            continue
+        first, total = sobol_indices(y, n, d)
+        first_ci, total_ci = bootstrap_sobol(y, n, d, int(spec.get("bootstrap", DEFAULT_BOOTSTRAP)),
+                                             spec.get("confidence", DEFAULT_CONFIDENCE), seed)
+        report["outputs"][name] = {
+            key: {"S1": first[j], "S1_ci": first_ci[:, j].tolist(), "ST": total[j], "ST_ci": total_ci[:, j].tolist()}
+            for j, key in enumerate(names)
+        }
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(description="Run a HydroSim global sensitivity analysis")
+    parser.add_argument("spec", help="Sensitivity spec YAML file")
+    parser.add_argument("--method", choices=["sobol", "morris"], default=None)
+    parser.add_argument("--samples", type=int, default=None, help="Sobol base samples / Morris trajectories")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--output-dir", default="outputs/results")
+    args = parser.parse_args()
+
+    spec = load_sensitivity_spec(args.spec)
+    if args.method:
+        spec["method"] = args.method
+    if args.samples:
+        spec["samples"] = args.samples
+
+    report = run_sensitivity(spec, args.workers, args.chunk_size)
+    for output, indices in report["outputs"].items():
+        print(f"\n{output}")
+        for key, v in indices.items():
+            if report["method"] == "sobol":
+                print(f"  {key:<36}S1 {v['S1']:>7.3f} [{v['S1_ci'][0]:.3f}, {v['S1_ci'][1]:.3f}]"
+                      f"   ST {v['ST']:>7.3f} [{v['ST_ci'][0]:.3f}, {v['ST_ci'][1]:.3f}]")
+        if report["method"] == "morris":
+            for key in report["parameters"]:
+                print(f"  {key:<36}mu* {indices['mu_star'][key]:>10.4g}   sigma {indices['sigma'][key]:>10.4g}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    out_file = f"{args.output_dir}/sensitivity_{report['method']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out_file, "w") as f:
+        json.dump(report, f, indent=2, default=float)
+    print(f"📄 Sensitivity results saved: {out_file}")
@@ -0,0 +1,98 @@
+# core/stage_cache.py
+#
+# Memoization for the core/ stages. A stage's cache key is a hash of only
+# the config keys it declares plus the keys of the stages it depends on, so
+# changing e.g. carbon_price_usd_per_ton only invalidates estimate_costs.
+# Results live in an in-memory LRU tier and, optionally, a pickle-per-entry
+# disk tier.
+
+import hashlib
+import json
+import os
+import pickle
+from collections import OrderedDict
+
+from utils.instrument import metrics
+
+
+def _canonical(value):
+    # NumPy scalars and other non-JSON values hash by their Python value / str
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def config_hash(config, keys=None, extra=()):
+    if keys is not None:
+        config = {k: config[k] for k in keys if k in config}
+    payload = json.dumps([config, list(extra)], sort_keys=True, default=_canonical, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class StageCache:
+    def __init__(self, maxsize=4096, disk_dir=None):
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._stats = {}
+
+    def _count(self, stage, field):
+        stats = self._stats.setdefault(stage, {"hits": 0, "disk_hits": 0, "misses": 0})
+        stats[field] += 1
+        metrics.count(f"cache.{stage}.{field}")
+
+    def _disk_path(self, stage, key):
+        return os.path.join(self.disk_dir, stage, key[:2], f"{key}.pkl")
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, stage, key):
+        # Cached value or None; counts a miss when absent
+        full_key = f"{stage}:{key}"
+        if full_key in self._entries:
+            self._entries.move_to_end(full_key)
+            self._count(stage, "hits")
+            return dict(self._entries[full_key])
+
+        if self.disk_dir:
+            path = self._disk_path(stage, key)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    value = pickle.load(f)
+                self._remember(full_key, value)
+                self._count(stage, "disk_hits")
+                return dict(value)
+
+        self._count(stage, "misses")
+        return None
+
+    def put(self, stage, key, value):
+        self._remember(f"{stage}:{key}", dict(value))
+        if self.disk_dir:
+            path = self._disk_path(stage, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    def get_or_compute(self, stage, key, compute):
+        value = self.get(stage, key)
+        if value is None:
+            value = compute()
+            self.put(stage, key, value)
+        return value
+
+    def stats(self):
+        return {stage: dict(s) for stage, s in self._stats.items()}
+
+    def clear(self):
+        self._entries.clear()
+        self._stats.clear()
+
+    def __len__(self):
+        return len(self._entries)
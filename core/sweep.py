@@ -0,0 +1,238 @@
+# core/sweep.py
+#
+# Scenario sweeps over any config key. A sweep spec (usually YAML) names a
+# base config and a set of parameters; the grid is never materialised as
+# per-point dicts. Each chunk of point indices is turned into columnar inputs
+# inside the worker and evaluated with core.batch.run_batch, and chunks are
+# handed back in grid order.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import yaml
+
+from core.batch import run_batch
+from utils.cli_args import add_sweep_arguments
+from utils.instrument import metrics
+from utils.logger import log
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Inputs resolved from port_pair, copied through to the result columns
+PASSTHROUGH_KEYS = ["origin_port", "destination_port"]
+
+
+def load_sweep_spec(path):
+    with open(path, "r") as f:
+        spec = yaml.safe_load(f)
+    if "parameters" not in spec:
+        raise ValueError(f"Sweep spec {path} has no 'parameters' section")
+    return spec
+
+
+def base_config(spec):
+    config = dict(spec.get("base_config") or {})
+    if spec.get("base"):
+        with open(spec["base"], "r") as f:
+            config = {**yaml.safe_load(f), **config}
+    return config
+
+
+def parameter_values(param):
+    # A parameter is either an explicit list or a range:
+    #   {start, stop, step}  -> np.arange (stop excluded, like range())
+    #   {start, stop, num}   -> np.linspace (stop included)
+    if isinstance(param, dict):
+        if "step" in param:
+            return np.arange(param["start"], param["stop"], param["step"])
+        if "num" in param:
+            return np.linspace(param["start"], param["stop"], param["num"])
+        raise ValueError(f"Grid parameter needs 'step' or 'num': {param}")
+    return np.asarray(param)
+
+
+def sweep_shape(spec):
+    return tuple(len(parameter_values(p)) for p in spec["parameters"].values())
+
+
+def sweep_size(spec):
+    if spec.get("mode", "grid") == "sample":
+        return int(spec["samples"])
+    return int(np.prod(sweep_shape(spec), dtype=np.int64))
+
+
+def _sample_parameter(rng, param, n):
+    # {low, high} draws uniformly; anything else draws from its grid values
+    if isinstance(param, dict) and "low" in param:
+        return rng.uniform(param["low"], param["high"], n)
+    values = parameter_values(param)
+    return values[rng.integers(0, len(values), n)]
+
+
+def resolve_port_pairs(columns, routing="sea_lane"):
+    # port_pair values are [origin, destination]; route_km comes from the
+    # precomputed port distance matrix
+    from geo.port_matrix import get_port_matrix
+
+    pairs = np.asarray(columns.pop("port_pair"), dtype=str)
+    columns["origin_port"], columns["destination_port"] = pairs[..., 0], pairs[..., 1]
+    columns["route_km"] = get_port_matrix().lookup_km(
+        pairs[..., 0], pairs[..., 1], routed=routing != "great_circle")
+    return columns
+
+
+def build_chunk(spec, start, stop, base=None):
+    columns = dict(base if base is not None else base_config(spec))
+    params = spec["parameters"]
+
+    if spec.get("mode", "grid") == "sample":
+        # Seeded per chunk start, so a given point does not depend on the worker
+        rng = np.random.default_rng([int(spec.get("seed", 0)), start])
+        for key, param in params.items():
+            columns[key] = _sample_parameter(rng, param, stop - start)
+    else:
+        values = [parameter_values(p) for p in params.values()]
+        index = np.unravel_index(np.arange(start, stop), tuple(len(v) for v in values))
+        for key, vals, idx in zip(params, values, index):
+            columns[key] = vals[idx]
+
+    if "port_pair" in columns:
+        resolve_port_pairs(columns, spec.get("routing", "sea_lane"))
+    return columns
+
+
+def result_extra_columns(spec):
+    # Swept inputs written next to the results, so every row says which
+    # scenario it is; port_pair is written as its origin / destination
+    keys = [k for k in spec["parameters"] if k != "port_pair"]
+    if "port_pair" in spec["parameters"]:
+        keys += PASSTHROUGH_KEYS
+    return list(dict.fromkeys(keys))
+
+
+def string_columns(spec):
+    # Extra columns holding text (e.g. engine_type), for the result schema
+    out = [k for k, p in spec["parameters"].items()
+           if k != "port_pair" and not isinstance(p, dict) and parameter_values(p).dtype.kind in "OSU"]
+    return out + (PASSTHROUGH_KEYS if "port_pair" in spec["parameters"] else [])
+
+
+def _run_chunk(task):
+    spec, base, start, stop = task
+    with metrics.span("sweep.build_chunk"):
+        columns = build_chunk(spec, start, stop, base)
+    results = run_batch(columns)
+    for key in result_extra_columns(spec):
+        results[key] = np.broadcast_to(columns[key], (stop - start,))
+    return results
+
+
+def _init_profiled_worker(trace):
+    # Forked workers inherit the parent's metrics; start them from zero
+    metrics.reset()
+    metrics.enable(trace)
+
+
+def _run_chunk_profiled(task):
+    # Returns the worker's metrics with the chunk so the parent can merge them
+    return _run_chunk(task), metrics.drain()
+
+
+def chunk_bounds(total, chunk_size):
+    return [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+
+def iter_sweep(spec, workers=None, chunk_size=None):
+    # Yields one columnar result per chunk, in grid order. At most
+    # 2 * workers chunks are in flight, so memory stays bounded.
+    workers = workers or spec.get("workers") or os.cpu_count() or 1
+    chunk_size = chunk_size or spec.get("chunk_size") or DEFAULT_CHUNK_SIZE
+    base = base_config(spec)
+    tasks = [(spec, base, start, stop) for start, stop in chunk_bounds(sweep_size(spec), chunk_size)]
+
+    log(f"Sweeping {sweep_size(spec):,} scenarios in {len(tasks)} chunks on {workers} worker(s)")
+
+    if workers == 1:
+        for i, task in enumerate(tasks):
+            yield _run_chunk(task)
+            log(f"Sweep chunk {i + 1}/{len(tasks)} done", level="debug", every_s=5, key="sweep.progress")
+        return
+
+    profiled = metrics.enabled
+    pool_args = {"initializer": _init_profiled_worker, "initargs": (metrics.trace,)} if profiled else {}
+    with ProcessPoolExecutor(max_workers=workers, **pool_args) as pool:
+        pending = []
+        done = 0
+
+        def collect(future):
+            nonlocal done
+            result = future.result()
+            if profiled:
+                result, worker_metrics = result
+                metrics.merge(worker_metrics)
+            done += 1
+            log(f"Sweep chunk {done}/{len(tasks)} done", level="debug", every_s=5, key="sweep.progress")
+            return result
+
+        for task in tasks:
+            if profiled:
+                pending.append(pool.submit(_run_chunk_profiled, task))
+            else:
+                pending.append(pool.submit(_run_chunk, task))
+            if len(pending) >= 2 * workers:
+                yield collect(pending.pop(0))
+        for future in pending:
+            yield collect(future)
+
+
+def merge_results(chunks):
+    chunks = list(chunks)
+    if not chunks:
+        return {}
+    return {k: np.concatenate([c[k] for c in chunks]) for k in chunks[0]}
+
+
+def run_sweep(spec, workers=None, chunk_size=None):
+    return merge_results(iter_sweep(spec, workers, chunk_size))
+
+
+def run_sweep_to_sink(spec, sink, workers=None, chunk_size=None):
+    # Streams each finished chunk into a results sink instead of merging
+    for chunk in iter_sweep(spec, workers, chunk_size):
+        sink.write(chunk)
+    return sink.rows_written
+
+
+def sweep_command(args):
+    # Shared by `python -m core.sweep` and `python main.py sweep`
+    from utils.results_writer import open_result_sink
+
+    if args.profile or args.trace:
+        metrics.enable(trace=bool(args.trace))
+
+    spec = load_sweep_spec(args.spec)
+    os.makedirs(args.output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_file = f"{args.output_dir}/sweep_{timestamp}.{args.format}"
+
+    with open_result_sink(out_file, result_extra_columns(spec), args.compression, string_columns(spec)) as sink:
+        rows = run_sweep_to_sink(spec, sink, args.workers, args.chunk_size)
+    print(f"📄 Sweep results saved: {out_file} ({rows:,} rows)")
+
+    if args.profile:
+        metrics.write_json(args.profile)
+        print(f"⏱️ Profile saved: {args.profile}")
+    if args.trace:
+        metrics.write_chrome_trace(args.trace)
+        print(f"⏱️ Trace saved: {args.trace}")
+    return out_file
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a HydroSim scenario sweep")
+    add_sweep_arguments(parser)
+    sweep_command(parser.parse_args())
@@ -0,0 +1,14 @@
+# geo/distance.py
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    # Great-circle distance in km; accepts scalars or broadcastable arrays
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0))) * EARTH_RADIUS_KM
@@ -0,0 +1,153 @@
+# geo/lane_cache.py
+#
+# One-time preprocessing of the sea-lane dataset into flat NumPy arrays:
+#   coords.npy        float64 (n_coords, 2) lon/lat of every vertex
+#   offsets.npy       int64 (n_parts + 1) start of each part in coords
+#   part_feature.npy  int32 (n_parts) source feature of each part
+#   meta.json         source path, sha256 and feature properties
+# The arrays are loaded memory-mapped. A cache whose recorded hash does not
+# match the source file is rebuilt.
+
+import hashlib
+import json
+import os
+import zipfile
+
+import numpy as np
+
+LANES_GEOJSON = "Shipping_Lanes_v1.geojson"
+LANES_ZIP = "Shipping-Lanes.zip"
+DEFAULT_CACHE_DIR = "outputs/cache/lanes"
+CACHE_FORMAT_VERSION = 1
+
+
+class LaneArrays:
+    def __init__(self, coords, offsets, part_feature, meta):
+        self.coords = coords
+        self.offsets = offsets
+        self.part_feature = part_feature
+        self.meta = meta
+
+    @property
+    def n_parts(self):
+        return len(self.offsets) - 1
+
+    def part(self, i):
+        return self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+
+def resolve_source(path=LANES_GEOJSON):
+    # Falls back to the GeoJSON packed inside Shipping-Lanes.zip
+    if os.path.exists(path):
+        return path
+    if os.path.exists(LANES_ZIP):
+        return LANES_ZIP
+    raise FileNotFoundError(f"Sea-lane source not found: {path}")
+
+
+def source_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_geojson(path):
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as zf:
+            member = next(n for n in zf.namelist() if n.endswith(".geojson"))
+            return json.loads(zf.read(member))
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def parse_lanes(path):
+    coords, offsets, part_feature, properties = [], [0], [], []
+    for i, feature in enumerate(_read_geojson(path)["features"]):
+        geom = feature["geometry"]
+        properties.append(feature.get("properties") or {})
+        if geom["type"] == "LineString":
+            lines = [geom["coordinates"]]
+        elif geom["type"] == "MultiLineString":
+            lines = geom["coordinates"]
+        else:
+            continue
+        for line in lines:
+            coords.extend(pt[:2] for pt in line)
+            offsets.append(len(coords))
+            part_feature.append(i)
+
+    return (np.asarray(coords, dtype=np.float64).reshape(-1, 2),
+            np.asarray(offsets, dtype=np.int64),
+            np.asarray(part_feature, dtype=np.int32),
+            properties)
+
+
+def build_lane_cache(source=LANES_GEOJSON, cache_dir=DEFAULT_CACHE_DIR, digest=None):
+    source = resolve_source(source)
+    coords, offsets, part_feature, properties = parse_lanes(source)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(os.path.join(cache_dir, "coords.npy"), coords)
+    np.save(os.path.join(cache_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(cache_dir, "part_feature.npy"), part_feature)
+
+    meta = {
+        "format_version": CACHE_FORMAT_VERSION,
+        "source": source,
+        "sha256": digest or source_hash(source),
+        "n_parts": len(offsets) - 1,
+        "n_coords": len(coords),
+        "properties": properties,
+    }
+    # meta.json is written last and marks the cache as complete
+    tmp = os.path.join(cache_dir, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(cache_dir, "meta.json"))
+    return meta
+
+
+def read_cache_meta(cache_dir=DEFAULT_CACHE_DIR):
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_lane_cache(source=LANES_GEOJSON, cache_dir=DEFAULT_CACHE_DIR):
+    source = resolve_source(source)
+    digest = source_hash(source)
+    meta = read_cache_meta(cache_dir)
+    if (meta is None or meta.get("sha256") != digest
+            or meta.get("format_version") != CACHE_FORMAT_VERSION):
+        meta = build_lane_cache(source, cache_dir, digest)
+
+    return LaneArrays(
+        np.load(os.path.join(cache_dir, "coords.npy"), mmap_mode="r"),
+        np.load(os.path.join(cache_dir, "offsets.npy"), mmap_mode="r"),
+        np.load(os.path.join(cache_dir, "part_feature.npy"), mmap_mode="r"),
+        meta,
+    )
+
+
+def lane_parts(lanes):
+    # Builds shapely LineStrings for every part in one vectorized call
+    import shapely
+
+    part_ids = np.repeat(np.arange(lanes.n_parts), np.diff(lanes.offsets))
+    return shapely.linestrings(np.asarray(lanes.coords), indices=part_ids)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Preprocess sea lanes into the binary lane cache")
+    parser.add_argument("source", nargs="?", default=LANES_GEOJSON)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    meta = build_lane_cache(args.source, args.cache_dir)
+    print(f"🗺️ Lane cache written to {args.cache_dir}: {meta['n_parts']} parts, {meta['n_coords']} vertices")
@@ -0,0 +1,87 @@
+# geo/lanes.py
+#
+# Sea-lane parts, loaded from the binary lane cache, and a spatial index over
+# them. The index is built once and reused for every port pair; matching only
+# runs exact distance checks on parts whose bounding box lies within
+# threshold_deg of both ports.
+#
+# For rendering, the index also keeps Douglas-Peucker simplified copies of
+# every part at LOD_TOLERANCES_DEG; choose_lod picks the coarsest level whose
+# error stays under half a screen pixel for the current view.
+
+import numpy as np
+import shapely
+from shapely.geometry import Point, box
+from shapely.strtree import STRtree
+
+from geo.lane_cache import DEFAULT_CACHE_DIR, LANES_GEOJSON, lane_parts, load_lane_cache
+
+# Level 0 is the raw geometry; tolerances in degrees
+LOD_TOLERANCES_DEG = [0.0, 0.01, 0.05, 0.2]
+# The app's full orthographic globe spans ~180 degrees over ~550 px
+GLOBE_DEG_PER_PX = 180 / 550
+
+
+class LaneIndex:
+    def __init__(self, parts):
+        self.parts = np.asarray(parts, dtype=object)
+        self.tree = STRtree(self.parts)
+        self.lods = [self.parts] + [shapely.simplify(self.parts, tol, preserve_topology=False)
+                                    for tol in LOD_TOLERANCES_DEG[1:]]
+
+    def candidates(self, lon, lat, threshold_deg):
+        return self.tree.query(box(lon - threshold_deg, lat - threshold_deg,
+                                   lon + threshold_deg, lat + threshold_deg))
+
+    def match(self, start, end, threshold_deg=1.0):
+        # start / end are (lon, lat). Returns the indices of the parts that
+        # pass within threshold_deg of both ports, in dataset order.
+        candidates = np.intersect1d(self.candidates(*start, threshold_deg),
+                                    self.candidates(*end, threshold_deg))
+        if candidates.size == 0:
+            return candidates
+        geoms = self.parts[candidates]
+        near = ((shapely.distance(Point(start), geoms) < threshold_deg)
+                & (shapely.distance(Point(end), geoms) < threshold_deg))
+        return candidates[near]
+
+    def match_lanes(self, start, end, threshold_deg=1.0, lod=0):
+        return list(self.lods[lod][self.match(start, end, threshold_deg)])
+
+
+def choose_lod(zoom=1.0, extent_deg=None, extent_px=550):
+    # zoom is the globe projection scale; extent_deg / extent_px describe a
+    # view fitted to the route instead of the whole globe
+    deg_per_px = GLOBE_DEG_PER_PX / zoom
+    if extent_deg is not None:
+        deg_per_px = min(deg_per_px, extent_deg / extent_px)
+    level = 0
+    for i, tol in enumerate(LOD_TOLERANCES_DEG):
+        if tol <= 0.5 * deg_per_px:
+            level = i
+    return level
+
+
+def simplify_coords(lon, lat, lod):
+    # Simplifies one polyline (e.g. a computed route) to a LOD level
+    if lod == 0 or len(lon) < 3:
+        return np.asarray(lon), np.asarray(lat)
+    line = shapely.simplify(shapely.linestrings(lon, lat), LOD_TOLERANCES_DEG[lod], preserve_topology=False)
+    coords = shapely.get_coordinates(line)
+    return coords[:, 0], coords[:, 1]
+
+
+def nan_separated(geoms):
+    # Concatenates line parts into single lon / lat arrays with NaN breaks,
+    # so plotly draws them as one trace
+    if len(geoms) == 0:
+        return np.empty(0), np.empty(0)
+    coords, index = shapely.get_coordinates(np.asarray(geoms, dtype=object), return_index=True)
+    breaks = np.flatnonzero(np.diff(index)) + 1
+    lon = np.insert(coords[:, 0], breaks, np.nan)
+    lat = np.insert(coords[:, 1], breaks, np.nan)
+    return lon, lat
+
+
+def load_lane_index(source=LANES_GEOJSON, cache_dir=DEFAULT_CACHE_DIR):
+    return LaneIndex(lane_parts(load_lane_cache(source, cache_dir)))
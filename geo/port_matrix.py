@@ -0,0 +1,236 @@
+# geo/port_matrix.py
+#
+# Precomputed port x port distances: great-circle km, sea-lane km and the
+# shortest-path trees needed to rebuild every routed polyline. Great-circle
+# distances are computed in NumPy blocks; lane routing runs one Dijkstra per
+# departure port (sharded over a process pool) and then resolves all arrival
+# ports for that tree with array math. Ports further than MAX_SNAP_KM from
+# any lane are left unrouted (lookups fall back to the great circle) with a
+# warning. The artifact is versioned and tied to the hash of the lane data it
+# was routed on.
+
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from geo.distance import haversine_km
+from geo.lane_cache import DEFAULT_CACHE_DIR, LANES_GEOJSON
+from geo.ports import port_coords, ports
+from geo.routing import load_lane_graph
+from utils.logger import log
+
+MATRIX_FORMAT_VERSION = 2
+DEFAULT_MATRIX_PATH = os.path.join(DEFAULT_CACHE_DIR, f"port_matrix_v{MATRIX_FORMAT_VERSION}.npz")
+SOURCE_BLOCK = 32
+MAX_SNAP_KM = 200.0
+NO_ROUTE, SAME_EDGE = -2, -1
+
+
+def great_circle_matrix(lons, lats, block=1024):
+    lons, lats = np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64)
+    out = np.empty((len(lons), len(lons)))
+    for i in range(0, len(lons), block):
+        out[i:i + block] = haversine_km(lons[i:i + block, None], lats[i:i + block, None],
+                                        lons[None, :], lats[None, :])
+    return out
+
+
+_worker_graph = None
+
+
+def _init_worker(source, cache_dir):
+    global _worker_graph
+    _worker_graph = load_lane_graph(source, cache_dir)
+
+
+def _tree_block(task, graph=None):
+    graph = graph or _worker_graph
+    trees = [graph.shortest_path_tree(edge, pos) for edge, pos in zip(*task)]
+    return (np.stack([t[0] for t in trees]),
+            np.stack([t[1] for t in trees]).astype(np.int32),
+            np.stack([t[2] for t in trees]).astype(np.int32))
+
+
+def resolve_targets(graph, dist, s_edge, s_pos, t_edge, t_pos):
+    # Lane km from one tree to every snapped target, and the node each target
+    # is entered from (SAME_EDGE for a direct run along the source edge)
+    along_s = graph.edge_cum_km[graph.edge_offsets[s_edge] + s_pos]
+    along_t = graph.edge_cum_km[graph.edge_offsets[t_edge] + t_pos]
+    u, v = graph.edge_u[t_edge], graph.edge_v[t_edge]
+    via_u = dist[u] + along_t
+    via_v = dist[v] + (graph.edge_km[t_edge] - along_t)
+    direct = np.where(t_edge == s_edge, np.abs(along_t - along_s), np.inf)
+
+    lane_km = np.minimum(np.minimum(via_u, via_v), direct)
+    arrive = np.where(via_u <= via_v, u, v)
+    arrive = np.where(direct <= np.minimum(via_u, via_v), SAME_EDGE, arrive)
+    arrive = np.where(np.isfinite(lane_km), arrive, NO_ROUTE)
+    return lane_km, arrive
+
+
+def build_port_matrix(names, lons, lats, graph, workers=1, source=LANES_GEOJSON, cache_dir=DEFAULT_CACHE_DIR):
+    lons, lats = np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64)
+    n = len(names)
+    snap_edge, snap_pos, snap_km = graph.snap_many(lons, lats)
+
+    tasks = [(snap_edge[i:i + SOURCE_BLOCK], snap_pos[i:i + SOURCE_BLOCK]) for i in range(0, n, SOURCE_BLOCK)]
+    if workers == 1:
+        blocks = [_tree_block(task, graph) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(source, cache_dir)) as pool:
+            blocks = list(pool.map(_tree_block, tasks))
+    dist = np.concatenate([b[0] for b in blocks])
+    pred_node = np.concatenate([b[1] for b in blocks])
+    pred_edge = np.concatenate([b[2] for b in blocks])
+
+    routed_km = np.empty((n, n))
+    arrive_node = np.empty((n, n), dtype=np.int32)
+    for i in range(n):
+        lane_km, arrive_node[i] = resolve_targets(graph, dist[i], snap_edge[i], snap_pos[i], snap_edge, snap_pos)
+        routed_km[i] = lane_km + snap_km[i] + snap_km
+
+    # A port-to-lane leg this long would cut across land; leave those ports
+    # unrouted rather than report a made-up sea distance
+    far = snap_km > MAX_SNAP_KM
+    if far.any():
+        log(f"Ports more than {MAX_SNAP_KM:g} km from the lane network, using great-circle distances: "
+            + ", ".join(f"{names[i]} ({snap_km[i]:.0f} km)" for i in np.flatnonzero(far)), level="warning")
+        routed_km[far], routed_km[:, far] = np.inf, np.inf
+        arrive_node[far], arrive_node[:, far] = NO_ROUTE, NO_ROUTE
+    np.fill_diagonal(routed_km, 0.0)
+
+    return PortMatrix(
+        names=np.asarray(names, dtype=str),
+        lon=lons,
+        lat=lats,
+        great_circle_km=great_circle_matrix(lons, lats),
+        routed_km=routed_km,
+        snap_edge=snap_edge,
+        snap_pos=snap_pos,
+        snap_km=snap_km,
+        pred_node=pred_node,
+        pred_edge=pred_edge,
+        arrive_node=arrive_node,
+        graph_sha256=np.array(str(graph.source_sha256)),
+        format_version=np.array(MATRIX_FORMAT_VERSION),
+    )
+
+
+class PortMatrix:
+    ARRAYS = ["names", "lon", "lat", "great_circle_km", "routed_km", "snap_edge", "snap_pos", "snap_km",
+              "pred_node", "pred_edge", "arrive_node", "graph_sha256", "format_version"]
+
+    def __init__(self, **arrays):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.index = {name: i for i, name in enumerate(self.names.tolist())}
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, **{name: getattr(self, name) for name in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in cls.ARRAYS})
+
+    def indices(self, names):
+        # Maps an array of port names to matrix indices
+        unique, inverse = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+        missing = [p for p in unique.tolist() if p not in self.index]
+        if missing:
+            raise KeyError(f"Ports not in distance matrix: {', '.join(missing)}")
+        return np.array([self.index[p] for p in unique.tolist()], dtype=np.int64)[inverse]
+
+    def lookup_km(self, origins, destinations, routed=True):
+        # Vectorized distance lookup; routed pairs without a lane connection
+        # fall back to the great-circle distance
+        i, j = self.indices(origins), self.indices(destinations)
+        great_circle = self.great_circle_km[i, j]
+        if not routed:
+            return great_circle
+        km = self.routed_km[i, j]
+        return np.where(np.isfinite(km), km, great_circle)
+
+    def distance_km(self, origin, destination, routed=True):
+        return float(self.lookup_km([origin], [destination], routed)[0])
+
+    def route(self, origin, destination, graph):
+        # Rebuilds the stored sea-lane route as a Route, or None
+        i, j = self.index[origin], self.index[destination]
+        arrive = int(self.arrive_node[i, j])
+        if i == j or arrive == NO_ROUTE:
+            return None
+
+        s_edge, s_pos = int(self.snap_edge[i]), int(self.snap_pos[i])
+        t_edge, t_pos = int(self.snap_edge[j]), int(self.snap_pos[j])
+        if arrive == SAME_EDGE:
+            legs = [(s_edge, s_pos, t_pos)]
+        else:
+            legs = graph.tree_legs(self.pred_node[i], self.pred_edge[i], s_edge, s_pos, arrive)
+            legs.append((t_edge, graph.nearest_end(t_edge, arrive, t_pos), t_pos))
+
+        snap_km = (float(self.snap_km[i]), float(self.snap_km[j]))
+        lane_km = float(self.routed_km[i, j]) - snap_km[0] - snap_km[1]
+        start, end = (self.lon[i], self.lat[i]), (self.lon[j], self.lat[j])
+        return graph.legs_to_route(start, end, legs, lane_km, snap_km)
+
+
+def default_ports():
+    names = list(ports)
+    return names, [port_coords[p][1] for p in names], [port_coords[p][0] for p in names]
+
+
+def load_port_matrix(path=DEFAULT_MATRIX_PATH, names=None, lons=None, lats=None, workers=1,
+                     source=LANES_GEOJSON, cache_dir=DEFAULT_CACHE_DIR):
+    # Loads the stored matrix, rebuilding it if the format version, the lane
+    # data or the port list have changed
+    if names is None:
+        names, lons, lats = default_ports()
+    graph = load_lane_graph(source, cache_dir)
+
+    if os.path.exists(path):
+        matrix = PortMatrix.load(path)
+        if (int(matrix.format_version) == MATRIX_FORMAT_VERSION
+                and str(matrix.graph_sha256) == str(graph.source_sha256)
+                and matrix.names.tolist() == list(names)
+                and np.array_equal(matrix.lon, lons) and np.array_equal(matrix.lat, lats)):
+            return matrix
+
+    matrix = build_port_matrix(names, lons, lats, graph, workers, source, cache_dir)
+    matrix.save(path)
+    return matrix
+
+
+@functools.lru_cache(maxsize=1)
+def get_port_matrix():
+    # One matrix per process for O(1) lookups from sweeps and the app
+    return load_port_matrix()
+
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+
+    parser = argparse.ArgumentParser(description="Precompute the port x port distance and route matrix")
+    parser.add_argument("--ports-csv", help="CSV with name,lat,lon columns (default: built-in port list)")
+    parser.add_argument("--output", default=DEFAULT_MATRIX_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if args.ports_csv:
+        with open(args.ports_csv, newline="") as f:
+            rows = list(csv.DictReader(f))
+        names = [r["name"] for r in rows]
+        lons, lats = [float(r["lon"]) for r in rows], [float(r["lat"]) for r in rows]
+    else:
+        names, lons, lats = default_ports()
+
+    graph = load_lane_graph()
+    matrix = build_port_matrix(names, lons, lats, graph, args.workers)
+    matrix.save(args.output)
+    print(f"🧭 Port matrix written to {args.output}: {len(names)} ports, "
+          f"{int(np.isfinite(matrix.routed_km).sum())} routed pairs")
@@ -0,0 +1,37 @@
+# geo/ports.py
+
+# Port data and coordinates (only routes available in the sea lane dataset)
+ports = [
+    "Singapore", "Port Klang", "Jakarta", "Rotterdam", "Hamburg", "Antwerp",
+    "Los Angeles", "New York", "Houston", "Dubai", "Jeddah", "Doha"
+]
+port_coords = {
+    'Singapore': (1.3521, 103.8198),
+    'Port Klang': (3.0014, 101.4000),
+    'Jakarta': (-6.2088, 106.8456),
+    'Rotterdam': (51.9244, 4.4777),
+    'Hamburg': (53.5511, 9.9937),
+    'Antwerp': (51.2194, 4.4025),
+    'Los Angeles': (33.7405, -118.2760),
+    'New York': (40.7128, -74.0060),
+    'Houston': (29.7604, -95.3698),
+    'Dubai': (25.276987, 55.296249),
+    'Jeddah': (21.4858, 39.1925),
+    'Doha': (25.276987, 51.5200)
+}
+
+# Region mapping to assign fuel prices
+region_mapping = {
+    'Singapore': 'Southeast Asia', 'Port Klang': 'Southeast Asia', 'Jakarta': 'Southeast Asia',
+    'Rotterdam': 'EU', 'Hamburg': 'EU', 'Antwerp': 'EU',
+    'Los Angeles': 'USA', 'New York': 'USA', 'Houston': 'USA',
+    'Dubai': 'Middle East', 'Jeddah': 'Middle East', 'Doha': 'Middle East'
+}
+
+# Regional fuel prices: hydrogen (USD/kg) by engine type, diesel (USD/liter)
+region_fuel_prices = {
+    'Southeast Asia': {'PEMFC': 6.0, 'H2-ICE': 5.0, 'diesel_per_liter': 0.85},
+    'EU': {'PEMFC': 9.0, 'H2-ICE': 7.5, 'diesel_per_liter': 1.5},
+    'USA': {'PEMFC': 7.0, 'H2-ICE': 6.0, 'diesel_per_liter': 1.0},
+    'Middle East': {'PEMFC': 5.0, 'H2-ICE': 4.0, 'diesel_per_liter': 0.6}
+}
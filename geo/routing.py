@@ -0,0 +1,437 @@
+# geo/routing.py
+#
+# Routable sea-lane network. Lane parts are noded at their intersections,
+# vertices are snapped together, short digitisation gaps between dangling
+# ends and other lanes are bridged, long straight runs are densified so
+# ports can snap to their middle, and chains of degree-2 vertices are
+# contracted into single edges. Graph nodes are therefore lane endpoints and
+# junctions; each edge keeps its full vertex geometry and length in km.
+#
+# Ports are snapped to the nearest lane vertex and joined to the two ends of
+# that edge, then routed with A* using a haversine heuristic.
+
+import heapq
+import math
+import os
+
+import numpy as np
+
+from geo.distance import EARTH_RADIUS_KM, haversine_km
+from geo.lane_cache import DEFAULT_CACHE_DIR, LANES_GEOJSON, lane_parts, load_lane_cache
+
+GRAPH_FORMAT_VERSION = 2
+GRAPH_FILE = "lane_graph.npz"
+SNAP_DEG = 1e-6        # vertices closer than this are merged
+MAX_GAP_KM = 100.0     # dangling lane ends are bridged across gaps up to this
+MAX_SEGMENT_KM = 25.0  # longer lane segments get evenly spaced extra vertices
+
+
+class Route:
+    def __init__(self, distance_km, coords, lane_km, snap_km):
+        self.distance_km = distance_km
+        self.coords = coords          # (n, 2) lon/lat polyline, port to port
+        self.lane_km = lane_km        # portion travelled along lanes
+        self.snap_km = snap_km        # (departure, arrival) port-to-lane legs
+
+    @property
+    def lon(self):
+        return self.coords[:, 0]
+
+    @property
+    def lat(self):
+        return self.coords[:, 1]
+
+
+def _segment_km(coords):
+    return haversine_km(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+
+def _find(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def _bridge_gaps(vertex_coords, a, b):
+    # Connects each dangling vertex to the nearest vertex in another
+    # connected component, if one lies within MAX_GAP_KM
+    n = len(vertex_coords)
+    parent = list(range(n))
+    for u, v in zip(a.tolist(), b.tolist()):
+        parent[_find(parent, u)] = _find(parent, v)
+    component = np.array([_find(parent, i) for i in range(n)])
+
+    degree = np.bincount(np.concatenate([a, b]), minlength=n)
+    bridges = []
+    for d in np.flatnonzero(degree == 1):
+        km = haversine_km(vertex_coords[d, 0], vertex_coords[d, 1],
+                          vertex_coords[:, 0], vertex_coords[:, 1])
+        km[component == component[d]] = np.inf
+        nearest = int(np.argmin(km))
+        if km[nearest] <= MAX_GAP_KM:
+            bridges.append((d, nearest))
+
+    if not bridges:
+        return a, b
+    bridges = np.array(bridges, dtype=np.int64)
+    pairs = np.stack([np.concatenate([a, bridges[:, 0]]), np.concatenate([b, bridges[:, 1]])], axis=1)
+    pairs = np.unique(np.sort(pairs, axis=1), axis=0)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _densify(vertex_coords, a, b):
+    # Splits segments longer than MAX_SEGMENT_KM with vertices interpolated
+    # in lon/lat (the geometry the lanes are drawn with), taking the short
+    # way round across the antimeridian
+    parts = np.ceil(haversine_km(vertex_coords[a, 0], vertex_coords[a, 1],
+                                 vertex_coords[b, 0], vertex_coords[b, 1]) / MAX_SEGMENT_KM).astype(np.int64)
+    long = np.flatnonzero(parts > 1)
+    if not len(long):
+        return vertex_coords, a, b
+
+    new_coords, new_a, new_b = [], [], []
+    next_id = len(vertex_coords)
+    for i in long.tolist():
+        t = np.arange(1, parts[i])[:, None] / parts[i]
+        start, step = vertex_coords[a[i]], vertex_coords[b[i]] - vertex_coords[a[i]]
+        step[0] = (step[0] + 180.0) % 360.0 - 180.0
+        coords = start + t * step
+        coords[:, 0] = (coords[:, 0] + 180.0) % 360.0 - 180.0
+        new_coords.append(coords)
+        chain = np.concatenate([[a[i]], np.arange(next_id, next_id + parts[i] - 1), [b[i]]])
+        new_a.append(chain[:-1])
+        new_b.append(chain[1:])
+        next_id += parts[i] - 1
+
+    keep = parts <= 1
+    return (np.concatenate([vertex_coords] + new_coords),
+            np.concatenate([a[keep]] + new_a), np.concatenate([b[keep]] + new_b))
+
+
+def _contract(n, a, b):
+    # Walks chains of degree-2 vertices between kept vertices (degree != 2)
+    neighbours = [[] for _ in range(n)]
+    for u, v in zip(a.tolist(), b.tolist()):
+        neighbours[u].append(v)
+        neighbours[v].append(u)
+    keep = [len(nb) != 2 and len(nb) > 0 for nb in neighbours]
+
+    chains, seen = [], set()
+
+    def walk(start, first):
+        chain, prev, cur = [start, first], start, first
+        while not keep[cur] and cur != start:
+            nxt = neighbours[cur][0] if neighbours[cur][0] != prev else neighbours[cur][1]
+            prev, cur = cur, nxt
+            chain.append(cur)
+        return chain
+
+    for start in range(n):
+        if not keep[start]:
+            continue
+        for first in neighbours[start]:
+            if (start, first) in seen:
+                continue
+            chain = walk(start, first)
+            seen.add((start, first))
+            seen.add((chain[-1], chain[-2]))
+            chains.append(chain)
+
+    # Closed loops made only of degree-2 vertices: keep one vertex per loop
+    on_chain = np.zeros(n, dtype=bool)
+    for chain in chains:
+        on_chain[chain] = True
+    for start in range(n):
+        if not on_chain[start] and neighbours[start]:
+            keep[start] = True
+            chain = walk(start, neighbours[start][0])
+            on_chain[chain] = True
+            chains.append(chain)
+
+    return np.flatnonzero(keep), chains
+
+
+def build_lane_graph(lanes):
+    import shapely
+
+    # Node lines at their mutual intersections, then snap shared vertices
+    noded = shapely.get_parts(shapely.union_all(lane_parts(lanes)))
+    coords, line_idx = shapely.get_coordinates(noded, return_index=True)
+
+    key = np.round(coords / SNAP_DEG).astype(np.int64)
+    key[key[:, 0] == round(-180 / SNAP_DEG), 0] = round(180 / SNAP_DEG)  # join across the antimeridian
+    _, first, vertex_id = np.unique(key, axis=0, return_index=True, return_inverse=True)
+    vertex_id = vertex_id.ravel()
+    vertex_coords = coords[first]
+
+    same_line = line_idx[1:] == line_idx[:-1]
+    a, b = vertex_id[:-1][same_line], vertex_id[1:][same_line]
+    a, b = a[a != b], b[a != b]
+    pairs = np.unique(np.sort(np.stack([a, b], axis=1), axis=1), axis=0)
+    a, b = _bridge_gaps(vertex_coords, pairs[:, 0], pairs[:, 1])
+    vertex_coords, a, b = _densify(vertex_coords, a, b)
+
+    node_vertex, chains = _contract(len(vertex_coords), a, b)
+    node_of_vertex = np.full(len(vertex_coords), -1, dtype=np.int64)
+    node_of_vertex[node_vertex] = np.arange(len(node_vertex))
+
+    edge_offsets = np.zeros(len(chains) + 1, dtype=np.int64)
+    edge_offsets[1:] = np.cumsum([len(c) for c in chains])
+    edge_vertices = np.concatenate(chains).astype(np.int64)
+    edge_u = node_of_vertex[[c[0] for c in chains]]
+    edge_v = node_of_vertex[[c[-1] for c in chains]]
+
+    # Cumulative km along each edge, in the same layout as edge_vertices
+    step_km = np.concatenate([[0.0], _segment_km(vertex_coords[edge_vertices])])
+    step_km[edge_offsets[:-1]] = 0.0
+    edge_cum_km = np.cumsum(step_km)
+    edge_cum_km -= np.repeat(edge_cum_km[edge_offsets[:-1]], np.diff(edge_offsets))
+    edge_km = edge_cum_km[edge_offsets[1:] - 1]
+
+    return LaneGraph(
+        vertex_coords=vertex_coords,
+        node_vertex=node_vertex,
+        edge_u=edge_u,
+        edge_v=edge_v,
+        edge_km=edge_km,
+        edge_offsets=edge_offsets,
+        edge_vertices=edge_vertices,
+        edge_cum_km=edge_cum_km,
+        source_sha256=np.array(lanes.meta["sha256"]),
+        format_version=np.array(GRAPH_FORMAT_VERSION),
+    )
+
+
+class LaneGraph:
+    ARRAYS = ["vertex_coords", "node_vertex", "edge_u", "edge_v", "edge_km",
+              "edge_offsets", "edge_vertices", "edge_cum_km", "source_sha256", "format_version"]
+
+    def __init__(self, **arrays):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.node_coords = self.vertex_coords[self.node_vertex]
+        self.edge_coords = self.vertex_coords[self.edge_vertices]
+
+        # CSR adjacency: for node i, adj_node/adj_edge[indptr[i]:indptr[i+1]]
+        src = np.concatenate([self.edge_u, self.edge_v])
+        order = np.argsort(src, kind="stable")
+        self.adj_node = np.concatenate([self.edge_v, self.edge_u])[order]
+        self.adj_edge = np.concatenate([np.arange(len(self.edge_u))] * 2)[order]
+        self.indptr = np.zeros(len(self.node_vertex) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum(np.bincount(src, minlength=len(self.node_vertex)))
+        self._steps = None
+
+    def steps(self):
+        # Per-node list of (neighbour, km, edge, from position, to position),
+        # built once as plain Python objects for the search loop
+        if self._steps is None:
+            last = (np.diff(self.edge_offsets) - 1).tolist()
+            edge_u, edge_km = self.edge_u.tolist(), self.edge_km.tolist()
+            adj_node, adj_edge, indptr = self.adj_node.tolist(), self.adj_edge.tolist(), self.indptr.tolist()
+            self._steps = []
+            for node in range(self.n_nodes):
+                steps = []
+                for i in range(indptr[node], indptr[node + 1]):
+                    edge = adj_edge[i]
+                    forward = edge_u[edge] == node
+                    steps.append((adj_node[i], edge_km[edge], edge,
+                                  0 if forward else last[edge], last[edge] if forward else 0))
+                self._steps.append(steps)
+            self._node_rad = (np.radians(self.node_coords[:, 0]).tolist(),
+                              np.radians(self.node_coords[:, 1]).tolist())
+        return self._steps
+
+    @property
+    def n_nodes(self):
+        return len(self.node_vertex)
+
+    @property
+    def n_edges(self):
+        return len(self.edge_u)
+
+    def save(self, path):
+        np.savez(path, **{name: getattr(self, name) for name in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in cls.ARRAYS})
+
+    def edge_slice(self, edge, start, stop):
+        # Vertex coords of an edge between two positions, in travel order
+        offset = self.edge_offsets[edge]
+        if start <= stop:
+            return self.edge_coords[offset + start:offset + stop + 1]
+        return self.edge_coords[offset + stop:offset + start + 1][::-1]
+
+    def edge_len(self, edge):
+        return int(self.edge_offsets[edge + 1] - self.edge_offsets[edge]) - 1
+
+    def snap(self, lon, lat):
+        # Nearest lane vertex -> (edge, position along edge, snap distance km)
+        km = haversine_km(lon, lat, self.edge_coords[:, 0], self.edge_coords[:, 1])
+        flat = int(np.argmin(km))
+        edge = int(np.searchsorted(self.edge_offsets, flat, side="right")) - 1
+        return edge, flat - int(self.edge_offsets[edge]), float(km[flat])
+
+    def snap_many(self, lons, lats, block=256):
+        # Vectorized snap for many points, in blocks to bound memory
+        lons, lats = np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64)
+        flat = np.empty(len(lons), dtype=np.int64)
+        km = np.empty(len(lons))
+        for i in range(0, len(lons), block):
+            d = haversine_km(lons[i:i + block, None], lats[i:i + block, None],
+                             self.edge_coords[None, :, 0], self.edge_coords[None, :, 1])
+            flat[i:i + block] = np.argmin(d, axis=1)
+            km[i:i + block] = d[np.arange(len(d)), flat[i:i + block]]
+        edge = np.searchsorted(self.edge_offsets, flat, side="right") - 1
+        return edge, flat - self.edge_offsets[edge], km
+
+    def _along(self, edge, pos):
+        return float(self.edge_cum_km[self.edge_offsets[edge] + pos])
+
+    def shortest_path_tree(self, edge, pos):
+        # Dijkstra from a snapped point to every node. Returns lane km to each
+        # node (inf if unreachable) and the predecessor node / edge of each
+        # node on its shortest path (-1 for the first hop from the point).
+        node_steps = self.steps()
+        dist = np.full(self.n_nodes, np.inf)
+        pred_node = np.full(self.n_nodes, -2, dtype=np.int64)
+        pred_edge = np.full(self.n_nodes, -1, dtype=np.int64)
+
+        heap = []
+        for node, end in ((int(self.edge_u[edge]), 0), (int(self.edge_v[edge]), self.edge_len(edge))):
+            cost = abs(self._along(edge, end) - self._along(edge, pos))
+            if cost < dist[node]:
+                dist[node], pred_node[node], pred_edge[node] = cost, -1, edge
+                heapq.heappush(heap, (cost, node))
+
+        done = np.zeros(self.n_nodes, dtype=bool)
+        while heap:
+            g, node = heapq.heappop(heap)
+            if done[node]:
+                continue
+            done[node] = True
+            for nxt, cost, nxt_edge, _, _ in node_steps[node]:
+                if g + cost < dist[nxt]:
+                    dist[nxt], pred_node[nxt], pred_edge[nxt] = g + cost, node, nxt_edge
+                    heapq.heappush(heap, (g + cost, nxt))
+        return dist, pred_node, pred_edge
+
+    def nearest_end(self, edge, node, pos):
+        # Position (0 or last) of the end of edge at node closest to pos
+        ends = [e for e, n in ((0, self.edge_u[edge]), (self.edge_len(edge), self.edge_v[edge])) if n == node]
+        return min(ends, key=lambda e: abs(self._along(edge, e) - self._along(edge, pos)))
+
+    def tree_legs(self, pred_node, pred_edge, s_edge, s_pos, node):
+        # Legs (edge, from position, to position) from the tree source to node
+        legs = []
+        while pred_node[node] >= 0:
+            edge, parent = int(pred_edge[node]), int(pred_node[node])
+            forward = self.edge_u[edge] == parent
+            legs.append((edge, 0, self.edge_len(edge)) if forward else (edge, self.edge_len(edge), 0))
+            node = parent
+        legs.append((s_edge, s_pos, self.nearest_end(s_edge, node, s_pos)))
+        legs.reverse()
+        return legs
+
+    def legs_to_route(self, start, end, legs, lane_km, snap_km):
+        lane_coords = np.concatenate([self.edge_slice(e, a, b) for e, a, b in legs])
+        coords = np.concatenate([[start], lane_coords, [end]])
+        return Route(lane_km + snap_km[0] + snap_km[1], coords, lane_km, snap_km)
+
+    def route(self, start, end):
+        # start / end are (lon, lat). Returns a Route, or None when the two
+        # snapped lanes are not connected.
+        s_edge, s_pos, s_km = self.snap(*start)
+        t_edge, t_pos, t_km = self.snap(*end)
+        source, target = self.n_nodes, self.n_nodes + 1
+
+        # Virtual legs from the snapped points to the ends of their edges,
+        # as (neighbour, cost, edge, from position, to position)
+        extra = {source: []}
+        for node, pos in ((self.edge_u[s_edge], 0), (self.edge_v[s_edge], self.edge_len(s_edge))):
+            cost = abs(self._along(s_edge, pos) - self._along(s_edge, s_pos))
+            extra[source].append((int(node), cost, s_edge, s_pos, pos))
+        for node, pos in ((self.edge_u[t_edge], 0), (self.edge_v[t_edge], self.edge_len(t_edge))):
+            cost = abs(self._along(t_edge, pos) - self._along(t_edge, t_pos))
+            extra.setdefault(int(node), []).append((target, cost, t_edge, pos, t_pos))
+        if s_edge == t_edge:
+            cost = abs(self._along(s_edge, t_pos) - self._along(s_edge, s_pos))
+            extra[source].append((target, cost, s_edge, s_pos, t_pos))
+
+        node_steps = self.steps()
+        node_lon, node_lat = self._node_rad
+        t_lon, t_lat = np.radians(self.edge_coords[self.edge_offsets[t_edge] + t_pos]).tolist()
+
+        def heuristic(node):
+            if node >= source:
+                return 0.0
+            lon, lat = node_lon[node], node_lat[node]
+            a = (math.sin((t_lat - lat) / 2) ** 2
+                 + math.cos(lat) * math.cos(t_lat) * math.sin((t_lon - lon) / 2) ** 2)
+            return 2 * math.asin(math.sqrt(min(a, 1.0))) * EARTH_RADIUS_KM
+
+        best = {source: 0.0}
+        prev = {}
+        heap = [(heuristic(source), 0.0, source)]
+        done = set()
+        while heap:
+            _, g, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            if node == target:
+                break
+            done.add(node)
+
+            steps = node_steps[node] if node < source else []
+            if node in extra:
+                steps = steps + extra[node]
+            for nxt, cost, edge, a, b in steps:
+                if nxt in done:
+                    continue
+                g_next = g + cost
+                if g_next < best.get(nxt, math.inf):
+                    best[nxt] = g_next
+                    prev[nxt] = (node, edge, a, b)
+                    heapq.heappush(heap, (g_next + heuristic(nxt), g_next, nxt))
+
+        if target not in prev:
+            return None
+
+        legs, node = [], target
+        while node != source:
+            node, edge, a, b = prev[node]
+            legs.append((edge, a, b))
+        legs.reverse()
+        return self.legs_to_route(start, end, legs, best[target], (s_km, t_km))
+
+
+def load_lane_graph(source=LANES_GEOJSON, cache_dir=DEFAULT_CACHE_DIR):
+    # Builds the graph once and persists it next to the lane cache; it is
+    # rebuilt whenever the lane source hash changes
+    lanes = load_lane_cache(source, cache_dir)
+    path = os.path.join(cache_dir, GRAPH_FILE)
+    if os.path.exists(path):
+        graph = LaneGraph.load(path)
+        if (str(graph.source_sha256) == lanes.meta["sha256"]
+                and int(graph.format_version) == GRAPH_FORMAT_VERSION):
+            return graph
+
+    graph = build_lane_graph(lanes)
+    graph.save(path)
+    return graph
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the sea-lane routing graph")
+    parser.add_argument("source", nargs="?", default=LANES_GEOJSON)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    graph = build_lane_graph(load_lane_cache(args.source, args.cache_dir))
+    graph.save(os.path.join(args.cache_dir, GRAPH_FILE))
+    print(f"🧭 Lane graph written to {args.cache_dir}: {graph.n_nodes} nodes, {graph.n_edges} edges")
@@ -1,162 +1,274 @@
-import yaml
+# main.py
+#
+# HydroSim command line. Importing this module has no side effects and only
+# loads the NumPy core; pandas, matplotlib and the geo data are imported by
+# the subcommands that need them.
+#
+#   python main.py run config/sample_scenarios/high_carbon_price.yaml --engine PEMFC
+#   python main.py sweep config/sweeps/engine_distance.yaml --workers 4
+#   python main.py compare          # PEMFC vs H2-ICE comparison CSV
+#   python main.py plot             # comparison CSV, comparison and scaling plots
+#   python main.py serve --port 8765  # HTTP/JSON job service (see server.py)
+#   python main.py report outputs/results/sweep_<timestamp>.parquet  # HTML chart report
+#   python main.py                  # same as plot
+
+import argparse
 import json
 import os
+import sys
 from datetime import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
-
-from core.mission_profile import simulate_mission
-from core.hydrogen_system import evaluate_hydrogen_system
-from core.energy_flow import calculate_energy_flow
-from core.cost_model import estimate_costs
-from core.emissions import calculate_emissions
+
+import yaml
+
+from core.pipeline import run_pipeline
 from utils.logger import log
 
+DEFAULT_CONFIG = "config/sample_scenarios/high_carbon_price.yaml"
+OUTPUT_DIR = "outputs/results"
+ENGINE_TYPES = ["PEMFC", "H2-ICE"]
+
+
 def load_config(path):
     with open(path, 'r') as f:
         return yaml.safe_load(f)
 
-def run_simulation(config):
-    log(f"Simulating for engine type: {config['engine_type']}")
-    mission = simulate_mission(config)
-    hydro = evaluate_hydrogen_system(config, mission)
-    energy = calculate_energy_flow(config, hydro)
-    cost = estimate_costs(config, energy)
-    emissions = calculate_emissions(config, energy)
-
-    return {
-        "engine": config["engine_type"],
-        "mission": mission,
-        "hydrogen": hydro,
-        "energy": energy,
-        "cost": cost,
-        "emissions": emissions
-    }
-
-# Create output dir
-output_dir = "outputs/results"
-os.makedirs(output_dir, exist_ok=True)
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-# Load base config and run both engine types
-base_config = load_config("config/sample_scenarios/high_carbon_price.yaml")
-results_all = []
-
-for engine_type in ["PEMFC", "H2-ICE"]:
-    config = base_config.copy()
-    config["engine_type"] = engine_type
-    sim_result = run_simulation(config)
-    results_all.append(sim_result)
-
-# Convert to DataFrame and save CSV
-rows = []
-for res in results_all:
-    flat = {"engine": res["engine"]}
-    for section in ["mission", "hydrogen", "energy", "cost", "emissions"]:
-        for k, v in res[section].items():
-            flat[f"{section}_{k}"] = v
-    rows.append(flat)
-
-df = pd.DataFrame(rows)
-csv_file = f"{output_dir}/comparison_{timestamp}.csv"
-df.to_csv(csv_file, index=False)
-print(f"📄 Comparison CSV saved: {csv_file}")
-
-# Plot comparison chart
-labels = ["PEMFC", "H2-ICE"]
-costs = df["cost_total_cost_usd"].tolist()
-emissions = df["emissions_total_emissions_kg_co2e"].tolist()
-costs_per_ton_km = df["cost_cost_per_ton_km_usd"].tolist()
-emissions_per_ton_km = df["emissions_emissions_per_ton_km_kg_co2e"].tolist()
-
-
-x = range(len(labels))
-width = 0.35
-
-fig, ax1 = plt.subplots(figsize=(10, 6))
-ax1.bar([i - width/2 for i in x], costs, width, label="Fuel Cost (USD)", color="green")
-ax1.bar([i + width/2 for i in x], emissions, width, label="CO₂ Emissions (kg)", color="red")
-ax1.set_xticks(x)
-ax1.set_xticklabels(labels)
-ax1.set_ylabel("Amount")
-ax1.set_title(f"Engine Comparison – {base_config['route_km']} km Route")
-ax1.legend()
-ax1.grid(axis="y", linestyle="--", alpha=0.6)
-
-# Annotate values
-for i in x:
-    ax1.text(i - width/2, costs[i] + 200, f"${costs[i]:,.0f}", ha='center', fontsize=10, fontweight='bold')
-    ax1.text(i + width/2, emissions[i] + 200, f"{emissions[i]:,.0f} kg", ha='center', fontsize=10, fontweight='bold')
-
-plot_file = f"{output_dir}/comparison_plot_{timestamp}.png"
-plt.tight_layout()
-plt.savefig(plot_file)
-plt.close()
-
-print(f"📊 Comparison plot saved: {plot_file}")
-
-
-
-distances = list(range(200, 2200, 200))
-results_distance_scaled = {"PEMFC": [], "H2-ICE": []}
-
-for engine in ["PEMFC", "H2-ICE"]:
-    for dist in distances:
-        config = base_config.copy()
-        config["engine_type"] = engine
-        config["route_km"] = dist
-        sim_result = run_simulation(config)
-
-        cost_per_km = sim_result["cost"]["cost_per_km_usd"]
-        emissions_per_km = sim_result["emissions"]["emissions_per_km_kg_co2e"]
-
-        results_distance_scaled[engine].append({
-            "distance": dist,
-            "cost_per_km": cost_per_km,
-            "emissions_per_km": emissions_per_km
-        })
-
-# Plot Line Graph
-fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 10), sharex=True)
-
-# Cost per km
-ax1.plot(
-    distances,
-    [x["cost_per_km"] for x in results_distance_scaled["PEMFC"]],
-    label="PEMFC", color="green", marker="o"
-)
-ax1.plot(
-    distances,
-    [x["cost_per_km"] for x in results_distance_scaled["H2-ICE"]],
-    label="H2-ICE", color="blue", marker="s"
-)
-ax1.set_ylabel("Cost per km (USD)")
-ax1.set_title("Cost Comparison vs Distance")
-ax1.legend()
-ax1.grid(True)
-
-# Emissions per km
-ax2.plot(
-    distances,
-    [x["emissions_per_km"] for x in results_distance_scaled["PEMFC"]],
-    label="PEMFC", color="green", marker="o"
-)
-ax2.plot(
-    distances,
-    [x["emissions_per_km"] for x in results_distance_scaled["H2-ICE"]],
-    label="H2-ICE", color="blue", marker="s"
-)
-ax2.set_ylabel("Emissions per km (kg CO₂e)")
-ax2.set_xlabel("Route Distance (km)")
-ax2.set_title("Emissions Comparison vs Distance")
-ax2.legend()
-ax2.grid(True)
-
-# Save
-plot_path = f"{output_dir}/scaling_plot_{timestamp}.png"
-plt.tight_layout()
-plt.savefig(plot_path)
-plt.close()
-
-print(f"📈 Distance scaling plot saved: {plot_path}")
+def run_simulation(config, cache=None):
+    # Pass a core.stage_cache.StageCache to memoize stages across calls
+    log(f"Simulating for engine type: {config['engine_type']}", level="debug")
+    return {"engine": config["engine_type"], **run_pipeline(config, cache)}
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def compare_engines(base_config, output_dir=OUTPUT_DIR, timestamp=None, store=None):
+    # With a utils.results_store.ResultsStore, stored runs are reused and new ones recorded
+    import pandas as pd
+    from core.batch import run_batch
+
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+    log(f"Simulating for engine types: {', '.join(ENGINE_TYPES)}")
+    if store is None:
+        df = pd.DataFrame(run_batch({**base_config, "engine_type": ENGINE_TYPES}))
+    else:
+        from utils.results_store import flatten_result
+
+        results = store.run([{**base_config, "engine_type": engine} for engine in ENGINE_TYPES])
+        df = pd.DataFrame([flatten_result(r) for r in results])
+    csv_file = f"{output_dir}/comparison_{timestamp}.csv"
+    df.to_csv(csv_file, index=False)
+    print(f"📄 Comparison CSV saved: {csv_file}")
+    return df
+
+
+def plot_comparison(base_config, df, output_dir=OUTPUT_DIR, timestamp=None):
+    plt = _pyplot()
+    timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    labels = ENGINE_TYPES
+    costs = df["cost_total_cost_usd"].tolist()
+    emissions = df["emissions_total_emissions_kg_co2e"].tolist()
+
+    x = range(len(labels))
+    width = 0.35
+
+    fig, ax1 = plt.subplots(figsize=(10, 6))
+    ax1.bar([i - width/2 for i in x], costs, width, label="Fuel Cost (USD)", color="green")
+    ax1.bar([i + width/2 for i in x], emissions, width, label="CO₂ Emissions (kg)", color="red")
+    ax1.set_xticks(x)
+    ax1.set_xticklabels(labels)
+    ax1.set_ylabel("Amount")
+    ax1.set_title(f"Engine Comparison – {base_config['route_km']} km Route")
+    ax1.legend()
+    ax1.grid(axis="y", linestyle="--", alpha=0.6)
+
+    # Annotate values
+    for i in x:
+        ax1.text(i - width/2, costs[i] + 200, f"${costs[i]:,.0f}", ha='center', fontsize=10, fontweight='bold')
+        ax1.text(i + width/2, emissions[i] + 200, f"{emissions[i]:,.0f} kg", ha='center', fontsize=10, fontweight='bold')
+
+    plot_file = f"{output_dir}/comparison_plot_{timestamp}.png"
+    plt.tight_layout()
+    plt.savefig(plot_file)
+    plt.close()
+
+    print(f"📊 Comparison plot saved: {plot_file}")
+    return plot_file
+
+
+def plot_distance_scaling(base_config, output_dir=OUTPUT_DIR, timestamp=None):
+    from core.batch import run_batch
+
+    plt = _pyplot()
+    timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    distances = list(range(200, 2200, 200))
+    results_distance_scaled = {}
+
+    for engine in ENGINE_TYPES:
+        scaled = run_batch({**base_config, "engine_type": engine, "route_km": distances})
+        results_distance_scaled[engine] = {
+            "cost_per_km": scaled["cost_cost_per_km_usd"],
+            "emissions_per_km": scaled["emissions_emissions_per_km_kg_co2e"]
+        }
+
+    # Plot Line Graph
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 10), sharex=True)
+
+    # Cost per km
+    ax1.plot(
+        distances,
+        results_distance_scaled["PEMFC"]["cost_per_km"],
+        label="PEMFC", color="green", marker="o"
+    )
+    ax1.plot(
+        distances,
+        results_distance_scaled["H2-ICE"]["cost_per_km"],
+        label="H2-ICE", color="blue", marker="s"
+    )
+    ax1.set_ylabel("Cost per km (USD)")
+    ax1.set_title("Cost Comparison vs Distance")
+    ax1.legend()
+    ax1.grid(True)
+
+    # Emissions per km
+    ax2.plot(
+        distances,
+        results_distance_scaled["PEMFC"]["emissions_per_km"],
+        label="PEMFC", color="green", marker="o"
+    )
+    ax2.plot(
+        distances,
+        results_distance_scaled["H2-ICE"]["emissions_per_km"],
+        label="H2-ICE", color="blue", marker="s"
+    )
+    ax2.set_ylabel("Emissions per km (kg CO₂e)")
+    ax2.set_xlabel("Route Distance (km)")
+    ax2.set_title("Emissions Comparison vs Distance")
+    ax2.legend()
+    ax2.grid(True)
+
+    # Save
+    plot_path = f"{output_dir}/scaling_plot_{timestamp}.png"
+    plt.tight_layout()
+    plt.savefig(plot_path)
+    plt.close()
+
+    print(f"📈 Distance scaling plot saved: {plot_path}")
+    return plot_path
+
+
+def open_store(path):
+    # Results store context for --store, or a no-op context without it
+    from contextlib import nullcontext
+
+    if not path:
+        return nullcontext()
+    from utils.results_store import ResultsStore
+    return ResultsStore(path)
+
+
+def run_command(args):
+    config = load_config(args.config)
+    if args.engine:
+        config["engine_type"] = args.engine
+    config.setdefault("engine_type", ENGINE_TYPES[0])
+    if args.store:
+        with open_store(args.store) as store:
+            result = store.run([config])[0]
+    else:
+        result = run_simulation(config)
+    text = json.dumps(result, indent=2, default=float)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"📄 Results saved: {args.output}")
+    else:
+        print(text)
+
+
+def sweep_command(args):
+    from core.sweep import sweep_command
+    sweep_command(args)
+
+
+def serve_command(args):
+    from server import serve_command
+    serve_command(args)
+
+
+def report_command(args):
+    from utils.report import report_command
+    report_command(args)
+
+
+def compare_command(args):
+    with open_store(args.store) as store:
+        compare_engines(load_config(args.config), args.output_dir, store=store)
+
+
+def plot_command(args):
+    base_config = load_config(args.config)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    with open_store(args.store) as store:
+        df = compare_engines(base_config, args.output_dir, timestamp, store)
+    plot_comparison(base_config, df, args.output_dir, timestamp)
+    plot_distance_scaling(base_config, args.output_dir, timestamp)
+
+
+def build_parser():
+    from utils.cli_args import add_report_arguments, add_serve_arguments, add_sweep_arguments
+
+    parser = argparse.ArgumentParser(description="HydroSim hydrogen propulsion simulator")
+    parser.add_argument("--log-level", choices=["debug", "info", "warning", "error"], default=None)
+    commands = parser.add_subparsers(dest="command")
+
+    run = commands.add_parser("run", help="Simulate one scenario and print its stage results as JSON")
+    run.add_argument("config", nargs="?", default=DEFAULT_CONFIG)
+    run.add_argument("--engine", choices=ENGINE_TYPES, default=None, help="Override the config's engine_type (default: PEMFC if unset)")
+    run.add_argument("--output", default=None, help="Write the JSON to this file instead of stdout")
+    run.add_argument("--store", default=None, help="Results store (SQLite) to reuse and record runs")
+    run.set_defaults(func=run_command)
+
+    sweep = commands.add_parser("sweep", help="Run a scenario sweep (see core.sweep)")
+    add_sweep_arguments(sweep)
+    sweep.set_defaults(func=sweep_command)
+
+    serve = commands.add_parser("serve", help="Run the HTTP/JSON job service")
+    add_serve_arguments(serve)
+    serve.set_defaults(func=serve_command)
+
+    report = commands.add_parser("report", help="Build an HTML chart report from a results table")
+    add_report_arguments(report)
+    report.set_defaults(func=report_command)
+
+    for name, func, text in [("compare", compare_command, "Write the PEMFC vs H2-ICE comparison CSV"),
+                             ("plot", plot_command, "Write the comparison CSV and plots")]:
+        sub = commands.add_parser(name, help=text)
+        sub.add_argument("config", nargs="?", default=DEFAULT_CONFIG)
+        sub.add_argument("--output-dir", default=OUTPUT_DIR)
+        sub.add_argument("--store", default=None, help="Results store (SQLite) to reuse and record runs")
+        sub.set_defaults(func=func)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        # Bare `python main.py` keeps its original behaviour
+        args = parser.parse_args([*([f"--log-level={args.log_level}"] if args.log_level else []), "plot"])
+    if args.log_level:
+        from utils.logger import set_level
+        set_level(args.log_level)
+    args.func(args)
+    return 0
+
 
+if __name__ == "__main__":
+    sys.exit(main())
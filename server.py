@@ -0,0 +1,412 @@
+# server.py
+#
+# Local HTTP/JSON job service. A job is a list of scenario configs; each
+# scenario is keyed by config_hash, so identical configs -- within a job,
+# across concurrent jobs, or already computed -- share one computation.
+# New scenarios go on one asyncio queue; dispatcher tasks drain it in
+# batches onto a process pool running the core/ pipeline.
+#
+#   POST /jobs                  {"base": {...}, "configs": [{...}, ...]} -> 202 {"id": ...}
+#   GET  /jobs/<id>             status and progress
+#   GET  /jobs/<id>/results     per-scenario results, in submission order
+#   GET  /jobs/<id>/events      progress as newline-delimited JSON until done
+#   GET  /health                queue depth and cache / dedup counters
+#
+# Backpressure: a job is rejected with 503 when it would push the number of
+# queued scenarios past max_pending. With a results store, lookups and writes
+# run on one dedicated thread that owns the SQLite connection, so disk I/O
+# and lock waits never block the event loop. Standard library only.
+#
+#   python server.py --port 8765 --workers 4
+
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from core.stage_cache import StageCache, config_hash
+from utils.cli_args import (DEFAULT_BATCH_SIZE, DEFAULT_HOST, DEFAULT_MAX_PENDING, DEFAULT_PORT,
+                            DEFAULT_RESULT_CACHE, add_serve_arguments)
+from utils.instrument import metrics
+from utils.logger import log
+
+MAX_BODY_BYTES = 64 * 2**20
+KEEP_FINISHED_JOBS = 10_000
+
+STATUS_TEXT = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 503: "Service Unavailable"}
+
+_worker_cache = None
+
+
+def run_configs(configs):
+    # Worker side: one result per config. A failing config yields an error
+    # entry instead of failing its whole batch. Each worker keeps a
+    # StageCache, so batches sharing e.g. a route reuse its mission stage.
+    global _worker_cache
+    from main import run_simulation
+
+    if _worker_cache is None:
+        _worker_cache = StageCache()
+    results = []
+    for config in configs:
+        try:
+            results.append(run_simulation(config, _worker_cache))
+        except Exception as e:
+            results.append({"error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id, keys, futures):
+        self.id = job_id
+        self.keys = keys
+        self.futures = futures
+        self.created = time.time()
+        self.finished = None
+        self.completed = 0
+        self.failed = 0
+        self._changed = asyncio.Event()
+        unique = list({id(f): f for f in futures}.values())
+        self.remaining = len(unique)
+        for future in unique:
+            future.add_done_callback(self._scenario_done)
+
+    @property
+    def done(self):
+        return self.remaining == 0
+
+    def _scenario_done(self, future):
+        self.remaining -= 1
+        if future.cancelled() or "error" in future.result():
+            self.failed += 1
+        else:
+            self.completed += 1
+        if self.done:
+            self.finished = time.time()
+        # Wake current waiters; later ones wait on a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_changed(self):
+        await self._changed.wait()
+
+    def status(self):
+        unique = self.completed + self.failed + self.remaining
+        return {
+            "id": self.id,
+            "state": "done" if self.done else "running",
+            "scenarios": len(self.keys),
+            "unique": unique,
+            "completed": self.completed,
+            "failed": self.failed,
+            "progress": (self.completed + self.failed) / unique if unique else 1.0,
+            "elapsed_s": (self.finished or time.time()) - self.created,
+        }
+
+    def results(self):
+        return [{"config_hash": key, **future.result()} for key, future in zip(self.keys, self.futures)]
+
+
+class JobService:
+    def __init__(self, workers=None, batch_size=DEFAULT_BATCH_SIZE, max_pending=DEFAULT_MAX_PENDING,
+                 result_cache=DEFAULT_RESULT_CACHE, concurrency=None, store=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        # Batches in flight; two per worker keeps the pool busy while results are collected
+        self.concurrency = concurrency or 2 * self.workers
+        self.cache = StageCache(maxsize=result_cache)
+        # Optional results store path; the ResultsStore is opened in start()
+        # on self._store_thread and only ever used from that thread
+        self.store_path = store
+        self.store = None
+        self._store_thread = None
+        self.jobs = {}
+        self.stats = {"jobs": 0, "rejected_jobs": 0, "scenarios": 0, "stored": 0, "computed": 0, "failed": 0}
+        self._ids = itertools.count(1)
+        self._inflight = {}
+        self._queue = None
+        self._pool = None
+        self._dispatchers = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        # Fork the workers now, before the listening socket exists: workers
+        # forked later would inherit it and every open client connection,
+        # holding those connections open after the server closes them.
+        # This also pays the workers' import cost up front.
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._pool, run_configs, [])
+        if self.store_path:
+            from utils.results_store import ResultsStore
+
+            self._store_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="results-store")
+            self.store = await loop.run_in_executor(self._store_thread, ResultsStore, self.store_path)
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.concurrency)]
+        log(f"Job service: {self.workers} worker(s), batches of {self.batch_size}, "
+            f"{self.concurrency} batch(es) in flight")
+
+    async def stop(self):
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._pool.shutdown(cancel_futures=True)
+        if self.store is not None:
+            await asyncio.get_running_loop().run_in_executor(self._store_thread, self.store.close)
+            self._store_thread.shutdown()
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def _split_known(self, keys, configs, cached):
+        # Moves cached scenarios into cached; returns {key: config} of the
+        # ones neither cached nor in flight
+        new = {}
+        for key, config in zip(keys, configs):
+            if key in self._inflight or key in cached or key in new:
+                continue
+            value = self.cache.get("service", key)
+            if value is None:
+                new[key] = config
+            else:
+                cached[key] = value
+        return new
+
+    async def submit(self, configs):
+        keys = [config_hash(config) for config in configs]
+        cached = {}
+        new = self._split_known(keys, configs, cached)
+        if self.store is not None and new:
+            loop = asyncio.get_running_loop()
+            stored = await loop.run_in_executor(self._store_thread, self.store.lookup, list(new.values()))
+            for key, value in zip(list(new), stored):
+                if value is not None:
+                    cached[key] = value
+                    self.cache.put("service", key, value)
+                    del new[key]
+                    self.stats["stored"] += 1
+            # Other jobs may have queued or finished some of these while the lookup ran
+            new = self._split_known(keys, configs, cached)
+        if self.pending + len(new) > self.max_pending:
+            self.stats["rejected_jobs"] += 1
+            raise QueueFull(f"job adds {len(new):,} scenarios to {self.pending:,} queued; limit is {self.max_pending:,}")
+
+        loop = asyncio.get_running_loop()
+        futures, created = [], {}
+        for key in keys:
+            future = self._inflight.get(key) or created.get(key)
+            if future is None:
+                future = created[key] = loop.create_future()
+                if key in cached:
+                    future.set_result(cached[key])
+                else:
+                    self._inflight[key] = future
+                    self._queue.put_nowait((key, new[key]))
+            futures.append(future)
+        self.stats["jobs"] += 1
+        self.stats["scenarios"] += len(keys)
+        self.stats["computed"] += len(new)
+
+        job = Job(str(next(self._ids)), keys, futures)
+        self.jobs[job.id] = job
+        self._forget_finished_jobs()
+        return job
+
+    def _forget_finished_jobs(self):
+        if len(self.jobs) <= KEEP_FINISHED_JOBS:
+            return
+        for job_id in [j.id for j in self.jobs.values() if j.done][:len(self.jobs) - KEEP_FINISHED_JOBS]:
+            del self.jobs[job_id]
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            keys = [k for k, _ in batch]
+            configs = [c for _, c in batch]
+            try:
+                with metrics.span("service.batch"):
+                    results = await loop.run_in_executor(self._pool, run_configs, configs)
+            except Exception as e:
+                results = [{"error": f"{type(e).__name__}: {e}"}] * len(batch)
+            for key, result in zip(keys, results):
+                if "error" in result:
+                    self.stats["failed"] += 1
+                else:
+                    self.cache.put("service", key, result)
+                future = self._inflight.pop(key)
+                if not future.done():
+                    future.set_result(result)
+            if self.store is not None:
+                # Waiters are already answered; the write only holds this dispatcher.
+                # Shielded so stop() cannot drop a queued write; the store is
+                # closed on the same thread after it.
+                try:
+                    write = loop.run_in_executor(self._store_thread, self.store.put_many, configs, results)
+                    await asyncio.shield(write)
+                except Exception as e:
+                    log(f"Results store write failed: {type(e).__name__}: {e}", level="warning")
+
+    def health(self):
+        # deduplicated = scenarios answered by an in-flight, cached or stored computation
+        return {"pending": self.pending, "inflight": len(self._inflight), "workers": self.workers,
+                "deduplicated": self.stats["scenarios"] - self.stats["computed"], **self.stats,
+                "cache": self.cache.stats().get("service", {})}
+
+
+def parse_job(body):
+    # {"configs": [...]} with an optional "base" merged under every config,
+    # or a bare list of configs
+    payload = json.loads(body)
+    if isinstance(payload, list):
+        payload = {"configs": payload}
+    configs = payload.get("configs") if isinstance(payload, dict) else None
+    if not isinstance(configs, list) or not all(isinstance(c, dict) for c in configs):
+        raise ValueError("expected {\"configs\": [config, ...]}")
+    base = payload.get("base") or {}
+    return [{**base, **c} for c in configs]
+
+
+def _response(status, payload, headers=()):
+    body = json.dumps(payload, default=float).encode()
+    head = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}", "Content-Type: application/json",
+            f"Content-Length: {len(body)}", *headers]
+    return ("\r\n".join(head) + "\r\n\r\n").encode() + body
+
+
+async def _read_request(reader):
+    # (method, path, headers, body), or None when the client closed
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_BYTES:
+        raise OverflowError(length)
+    body = await reader.readexactly(length) if length else b""
+    return method, urlsplit(target).path.rstrip("/"), headers, body
+
+
+async def _stream_events(job, writer):
+    # Chunked NDJSON: one status line per progress change, the last one "done"
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                 b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+    while True:
+        line = (json.dumps(job.status()) + "\n").encode()
+        writer.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        await writer.drain()
+        if job.done:
+            break
+        await job.wait_changed()
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+async def handle_request(service, method, path, body, writer):
+    # Returns the response bytes, or None when it streamed the response itself
+    parts = path.split("/")[1:]
+    if path == "/health":
+        return _response(200, service.health())
+    if path == "/jobs":
+        if method != "POST":
+            return _response(405, {"error": "use POST to submit a job"})
+        try:
+            job = await service.submit(parse_job(body))
+        except ValueError as e:
+            return _response(400, {"error": str(e)})
+        except QueueFull as e:
+            return _response(503, {"error": str(e)}, ["Retry-After: 1"])
+        return _response(202, job.status())
+    if len(parts) in (2, 3) and parts[0] == "jobs":
+        job = service.jobs.get(parts[1])
+        if job is None:
+            return _response(404, {"error": f"no job {parts[1]}"})
+        view = parts[2] if len(parts) == 3 else "status"
+        if view == "status":
+            return _response(200, job.status())
+        if view == "results":
+            if not job.done:
+                return _response(202, job.status())
+            return _response(200, {**job.status(), "results": job.results()})
+        if view == "events":
+            await _stream_events(job, writer)
+            return None
+    return _response(404, {"error": f"no route {method} {path}"})
+
+
+async def handle_connection(service, reader, writer):
+    # HTTP/1.1 with keep-alive; one request at a time per connection
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except OverflowError:
+                writer.write(_response(413, {"error": f"body over {MAX_BODY_BYTES:,} bytes"}, ["Connection: close"]))
+                break
+            except (ValueError, asyncio.IncompleteReadError):
+                writer.write(_response(400, {"error": "malformed request"}, ["Connection: close"]))
+                break
+            if request is None:
+                break
+            method, path, headers, body = request
+            response = await handle_request(service, method, path, body, writer)
+            if response is None:
+                break
+            writer.write(response)
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, store=None, **service_options):
+    service = JobService(store=store, **service_options)
+    await service.start()
+    server = await asyncio.start_server(lambda r, w: handle_connection(service, r, w), host, port,
+                                        backlog=1024)
+    log(f"Job service listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def serve_command(args):
+    # Shared by `python server.py` and `python main.py serve`
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, batch_size=args.batch_size,
+                          max_pending=args.max_pending, result_cache=args.result_cache, store=args.store))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the HydroSim job service")
+    add_serve_arguments(parser)
+    sys.exit(serve_command(parser.parse_args()))
@@ -0,0 +1,27 @@
+# tests/conftest.py
+#
+# Tests run from the repository root, where the sample configs, the lane
+# GeoJSON and outputs/cache live.
+
+import os
+import sys
+
+import pytest
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_CONFIG = os.path.join(ROOT, "config/sample_scenarios/high_carbon_price.yaml")
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def _repo_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.fixture
+def base_config():
+    with open(BASE_CONFIG, "r") as f:
+        return yaml.safe_load(f)
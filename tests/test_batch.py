@@ -0,0 +1,48 @@
+# Vectorized run_batch must match the scalar run_pipeline bit for bit.
+
+import numpy as np
+
+from core.batch import RESULT_KEYS, SECTIONS, run_batch
+from core.pipeline import run_pipeline
+
+
+def _random_columns(base, n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        **base,
+        "engine_type": rng.choice(["PEMFC", "H2-ICE"], n),
+        "enable_orc": rng.random(n) < 0.5,
+        "route_km": rng.integers(50, 5000, n).astype(np.float64),
+        "load_factor": rng.uniform(0.1, 1.0, n),
+        "transit_speed_kmh": rng.uniform(10, 45, n),
+        "fuel_cost_usd_per_kg": rng.uniform(3, 10, n),
+        "carbon_price_usd_per_ton": rng.uniform(0, 300, n),
+        "emission_factor_kg_co2e_per_kg_h2": rng.uniform(0, 10, n),
+        "cargo_mass_tons": rng.uniform(500, 12000, n),
+        "forcing_power_factor": rng.uniform(0.9, 1.5, n),
+    }
+
+
+def _row(columns, i):
+    return {k: (v[i].item() if isinstance(v, np.ndarray) else v) for k, v in columns.items()}
+
+
+def test_batch_matches_pipeline(base_config):
+    n = 2000
+    columns = _random_columns(base_config, n)
+    batch = run_batch(columns)
+    for i in range(n):
+        scalar = run_pipeline(_row(columns, i))
+        for section in SECTIONS:
+            for key in RESULT_KEYS[section]:
+                expected = scalar[section][key]
+                actual = np.broadcast_to(batch[f"{section}_{key}"], (n,))[i]
+                assert actual == expected, (i, section, key, actual, expected)
+
+
+def test_batch_broadcasts_scalars(base_config):
+    # Scalar inputs broadcast against the array ones
+    batch = run_batch({**base_config, "engine_type": "PEMFC", "route_km": [100.0, 200.0, 400.0]})
+    cost = np.broadcast_to(batch["cost_total_cost_usd"], (3,))
+    for km, value in zip([100.0, 200.0, 400.0], cost):
+        assert value == run_pipeline({**base_config, "engine_type": "PEMFC", "route_km": km})["cost"]["total_cost_usd"]
@@ -0,0 +1,80 @@
+# Bunkering against hand-worked event sequences: stockouts, oversized
+# demands, berth queueing and the storage balance.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.bunkering import simulate_bunkering
+
+START = pd.Timestamp("2025-01-01")
+
+
+def arrivals(hours, demands, port="P"):
+    return pd.DataFrame({"port": port, "time": [START + pd.Timedelta(hours=h) for h in hours],
+                         "hydrogen_kg": np.asarray(demands, dtype=np.float64)})
+
+
+def storage(capacity=1000.0, production=50.0, bunker_rate=1000.0, berths=1, **ports):
+    return {"default": {"capacity_kg": capacity, "production_kg_per_h": production,
+                        "bunker_rate_kg_per_h": bunker_rate, "berths": berths},
+            "ports": ports}
+
+
+def test_stockouts():
+    # t=0 A takes 900 of 1000 kg. t=1 B wants more than the tank holds:
+    # oversized, never served. t=2 C finds 200 kg (short 300) and starts at
+    # t=8 once 500 kg are in; D (t=3) waits for C's berth until t=8.5, finds
+    # 25 kg (short 275) and starts at t=14.
+    summary, per_arrival = simulate_bunkering(arrivals([0, 1, 2, 3], [900, 1500, 500, 300]), storage())
+    assert per_arrival["stockout"].tolist() == [False, True, True, True]
+    assert per_arrival["oversized"].tolist() == [False, True, False, False]
+    assert per_arrival["served"].tolist() == [True, False, True, True]
+    assert per_arrival["shortfall_kg"].tolist() == pytest.approx([0, 500, 300, 275])
+    assert per_arrival["start_h"].tolist()[2:] == pytest.approx([8, 14])
+    assert per_arrival["wait_h"].tolist()[2:] == pytest.approx([6, 11])
+
+    row = summary.iloc[0]
+    assert (row["stockouts"], row["oversized"], row["served"], row["unserved"]) == (3, 1, 3, 1)
+    assert row["supplied_kg"] == 1700 and row["min_level_kg"] == pytest.approx(0.0)
+
+
+def test_berth_queue_without_stockouts():
+    # Ample storage, one berth, a vessel every hour taking 2 h to bunker:
+    # the k-th vessel waits k hours
+    n = 10
+    summary, per_arrival = simulate_bunkering(arrivals(range(n), [200] * n),
+                                              storage(capacity=1e6, bunker_rate=100.0))
+    assert not per_arrival["stockout"].any()
+    assert per_arrival["wait_h"].tolist() == pytest.approx(list(range(n)))
+    assert summary.iloc[0]["berth_utilisation"] == pytest.approx(1.0)
+
+    # With two berths one frees up just as each vessel arrives
+    _, two_berths = simulate_bunkering(arrivals(range(n), [200] * n),
+                                       storage(capacity=1e6, bunker_rate=100.0, berths=2))
+    assert two_berths["wait_h"].max() == pytest.approx(0.0)
+
+
+def test_storage_balance():
+    # Random demand: supply never exceeds the initial fill plus production
+    rng = np.random.default_rng(0)
+    hours = np.sort(rng.uniform(0, 500, 300))
+    frame = pd.concat([arrivals(hours[:150], rng.uniform(50, 400, 150), "P"),
+                       arrivals(hours[150:], rng.uniform(50, 400, 150), "Q")])
+    summary, per_arrival = simulate_bunkering(frame, storage(capacity=2000.0, production=80.0, berths=2,
+                                                             Q={"capacity_kg": 500.0}))
+    end_h = per_arrival["start_h"].max()
+    for _, row in summary.iterrows():
+        capacity = 500.0 if row["port"] == "Q" else 2000.0
+        assert row["supplied_kg"] <= capacity + 80.0 * end_h + 1e-6
+        assert row["min_level_kg"] >= 0.0
+        assert 0.0 <= row["storage_utilisation"] <= 1.0
+    served = per_arrival[per_arrival["served"]]
+    assert (served["wait_h"] >= 0).all()
+    assert not per_arrival.loc[~per_arrival["stockout"], "shortfall_kg"].any()
+    assert (per_arrival["oversized"] == (per_arrival["port"].eq("Q") & (per_arrival["hydrogen_kg"] > 500))).all()
+
+
+def test_horizon_cuts_events():
+    _, per_arrival = simulate_bunkering(arrivals([0, 1, 2, 3], [900, 1500, 500, 300]), storage(), horizon_h=10)
+    assert per_arrival["served"].tolist() == [True, False, True, False]
@@ -0,0 +1,123 @@
+# Forcing grid sampling on small synthetic grids, and the voyage tracks
+# the grids are sampled along.
+
+import numpy as np
+import pytest
+
+from core.forcing import (VARIABLES, ForcingGrid, generate_synthetic_forcing, great_circle_track, polyline_track,
+                          port_power_factors, port_tracks, voyage_power_factors)
+from geo.port_matrix import get_port_matrix
+from geo.ports import port_coords
+from geo.routing import load_lane_graph
+
+
+@pytest.fixture
+def grid(tmp_path):
+    return generate_synthetic_forcing(str(tmp_path), start="2025-01-01", days=4, dt_h=6, resolution_deg=5.0)
+
+
+def _overwrite(grid, name, values):
+    field = np.lib.format.open_memmap(f"{grid.path}/{name}.npy", mode="r+")
+    field[:] = values
+    field.flush()
+    del field
+
+
+def _axes(grid):
+    lon = grid.lon0 + grid.dlon * np.arange(grid.nlon)
+    lat = grid.lat0 + grid.dlat * np.arange(grid.nlat)
+    t = grid.dt_h * np.arange(grid.nt)
+    return lon, lat, t
+
+
+def test_trilinear_is_exact_for_linear_fields(grid):
+    # Interpolation reproduces a + b lon + c lat + d t away from the longitude seam
+    lon, lat, t = _axes(grid)
+    _overwrite(grid, "u_wind", 1 + 0.05 * lon[None, None, :] + 0.25 * lat[None, :, None] + 0.1 * t[:, None, None])
+    grid = ForcingGrid(grid.path)
+
+    rng = np.random.default_rng(1)
+    x = rng.uniform(lon[0], lon[-1], 2000)
+    y = rng.uniform(lat[0], lat[-1], 2000)
+    h = rng.uniform(0, t[-1], 2000)
+    sampled = grid.sample(x, y, h, ["u_wind"])["u_wind"]
+    np.testing.assert_allclose(sampled, 1 + 0.05 * x + 0.25 * y + 0.1 * h, atol=1e-4)
+
+
+def test_grid_points_are_returned_exactly(grid):
+    lon, lat, t = _axes(grid)
+    field = np.load(f"{grid.path}/wave_height.npy")
+    i, j, k = 3, 7, 5
+    value = grid.sample(lon[k], lat[j], t[i], ["wave_height"])["wave_height"]
+    assert value == pytest.approx(float(field[i, j, k]), rel=1e-6)
+
+
+def test_longitude_wraps_on_global_grids(grid):
+    assert grid.periodic
+    a = grid.sample([179.0, -181.0, 357.5], [10.0, 10.0, 20.0], [5.0, 5.0, 5.0])
+    b = grid.sample([179.0, 179.0, -2.5], [10.0, 10.0, 20.0], [5.0, 5.0, 5.0])
+    for name in VARIABLES:
+        np.testing.assert_allclose(a[name], b[name], rtol=1e-6, atol=1e-6)
+
+
+def test_calm_fields_leave_power_unchanged(grid):
+    for name in VARIABLES:
+        _overwrite(grid, name, 0.0)
+    grid = ForcingGrid(grid.path)
+    factors = port_power_factors(grid, ["Rotterdam", "Singapore"], ["Singapore", "Houston"],
+                                 np.datetime64("2025-01-02"), [15000.0, 18000.0], 30.0)
+    np.testing.assert_allclose(factors, 1.0)
+
+
+def test_samples_outside_time_range_warn(grid, capsys):
+    grid.sample(0.0, 0.0, grid.hours("2027-06-01"), ["u_wind"])
+    assert "outside its time range" in capsys.readouterr().out
+
+
+def test_polyline_track_spacing_and_heading():
+    # Equal 5 degree steps east along the equator, once across the antimeridian
+    lon, lat, heading, frac = polyline_track([170.0, 175.0, 180.0, -175.0], [0.0, 0.0, 0.0, 0.0], 6)
+    np.testing.assert_allclose(lon, [171.25, 173.75, 176.25, 178.75, -178.75, -176.25])
+    np.testing.assert_allclose(lat, 0.0)
+    np.testing.assert_allclose(heading, 90.0)
+    np.testing.assert_allclose(frac, (np.arange(6) + 0.5) / 6)
+
+    # Due south, with a repeated vertex
+    lon, lat, heading, _ = polyline_track([0.0, 0.0, 0.0, 0.0], [10.0, 4.0, 4.0, 0.0], 5)
+    np.testing.assert_allclose(lat, [9.0, 7.0, 5.0, 3.0, 1.0])
+    np.testing.assert_allclose(heading, 180.0)
+
+
+def test_port_tracks_follow_routed_lanes():
+    origins = np.array(["Rotterdam", "Singapore", "Doha"])
+    destinations = np.array(["Singapore", "Houston", "Rotterdam"])
+    (lon, lat, heading, _), pair = port_tracks(origins, destinations, n_points=32)
+    matrix, graph = get_port_matrix(), load_lane_graph()
+    for i, (origin, destination) in enumerate(zip(origins, destinations)):
+        route = matrix.route(origin, destination, graph)
+        a, b = port_coords[origin], port_coords[destination]
+        if route is None:
+            # Doha is beyond the lane snap cap: great-circle fallback
+            expected = great_circle_track([a[1]], [a[0]], [b[1]], [b[0]], 32)[:3]
+            expected = [e[0] for e in expected]
+        else:
+            expected = polyline_track(route.lon, route.lat, 32)[:3]
+        for actual, wanted in zip((lon[pair[i]], lat[pair[i]], heading[pair[i]]), expected):
+            np.testing.assert_allclose(actual, wanted)
+
+    # Rotterdam -> Singapore goes via Suez, nowhere near the great circle over Asia
+    a, b = port_coords["Rotterdam"], port_coords["Singapore"]
+    assert np.abs(lat[pair[0]] - great_circle_track([a[1]], [a[0]], [b[1]], [b[0]], 32)[1][0]).max() > 20
+
+
+def test_great_circle_routing_matches_coordinates(grid):
+    departure, route_km = np.datetime64("2025-01-02"), [15000.0, 18000.0]
+    a, b = port_coords["Rotterdam"], port_coords["Houston"]
+    c = port_coords["Singapore"]
+    by_name = port_power_factors(grid, ["Rotterdam", "Singapore"], ["Houston", "Houston"], departure, route_km,
+                                 30.0, routing="great_circle")
+    by_coords = voyage_power_factors(grid, [a[1], c[1]], [a[0], c[0]], [b[1], b[1]], [b[0], b[0]], departure,
+                                     np.array(route_km) / 30.0, 30.0)
+    np.testing.assert_allclose(by_name, by_coords)
+    routed = port_power_factors(grid, ["Rotterdam", "Singapore"], ["Houston", "Houston"], departure, route_km, 30.0)
+    assert not np.allclose(routed, by_name)
@@ -0,0 +1,65 @@
+# Stage timers record every pipeline and batch stage when profiling is on,
+# and nothing when it is off; merged reservoirs stay bounded.
+
+import pytest
+
+from core.batch import BATCH_STAGES, run_batch
+from core.pipeline import STAGES, run_pipeline
+from utils import instrument
+from utils.instrument import Instrumentation, StageStats, metrics
+
+
+@pytest.fixture
+def config(base_config):
+    return {**base_config, "engine_type": "PEMFC"}
+
+
+@pytest.fixture
+def profiling():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def test_disabled_records_nothing(config):
+    metrics.reset()
+    assert not metrics.enabled
+    run_pipeline(config)
+    run_batch({**config, "route_km": [100, 200]})
+    assert metrics.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_stage_spans(config, profiling):
+    run_pipeline(config)
+    run_pipeline(config)
+    run_batch({**config, "route_km": [100, 200, 300]})
+    stages = profiling.snapshot()["stages"]
+    expected = {"pipeline", *(f"pipeline.{s[0]}" for s in STAGES), *(f"batch.{s[0]}" for s in BATCH_STAGES),
+                "batch.flatten"}
+    assert expected <= set(stages)
+    assert stages["pipeline.mission"]["calls"] == 2
+    assert profiling.snapshot()["counters"]["batch.rows"] == 3
+
+
+def test_profiled_results_match(config, profiling):
+    profiled = run_pipeline(config), run_batch(config)["cost_total_cost_usd"].tolist()
+    metrics.disable()
+    assert (run_pipeline(config), run_batch(config)["cost_total_cost_usd"].tolist()) == profiled
+
+
+def test_reservoir_merge_bounded(monkeypatch):
+    monkeypatch.setattr(instrument, "RESERVOIR_SIZE", 100)
+    stats = StageStats()
+    for _ in range(300):
+        stats.add(1.0)
+    other = Instrumentation()
+    for _ in range(50):
+        other.record("x", 2.0)
+    calls, total_s, samples = other.drain()["stages"]["x"]
+    stats.merge(calls, total_s, samples)
+    assert stats.calls == 350 and stats.total_s == 400.0
+    assert len(stats.samples) == 100
+    # 50 of 350 calls took 2 s, so about a seventh of the merged samples do
+    assert 10 <= stats.samples.count(2.0) <= 20
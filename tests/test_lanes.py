@@ -0,0 +1,58 @@
+# The STRtree lane matcher must return exactly the parts the original
+# brute-force scan (distance from every part to both ports) accepts.
+
+import itertools
+
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import Point
+
+from geo.lanes import load_lane_index
+from geo.ports import port_coords
+
+
+@pytest.fixture(scope="module")
+def index():
+    return load_lane_index()
+
+
+def brute_force_match(parts, start, end, threshold_deg):
+    start, end = Point(start), Point(end)
+    return [i for i, part in enumerate(parts)
+            if start.distance(part) < threshold_deg and end.distance(part) < threshold_deg]
+
+
+def port_pairs():
+    # (lon, lat) pairs; port_coords holds (lat, lon)
+    return [(port_coords[a][::-1], port_coords[b][::-1]) for a, b in itertools.permutations(port_coords, 2)]
+
+
+def near_lane_pairs(index, n=300, seed=0):
+    # Random "ports" scattered around two vertices of the same lane part, so
+    # most pairs match something
+    coords, part = shapely.get_coordinates(index.parts, return_index=True)
+    rng = np.random.default_rng(seed)
+    pairs = []
+    for p in rng.integers(0, len(index.parts), n):
+        vertices = coords[part == p]
+        a, b = vertices[rng.integers(0, len(vertices), 2)] + rng.normal(0, 0.5, (2, 2))
+        pairs.append((tuple(a), tuple(b)))
+    return pairs
+
+
+@pytest.mark.parametrize("threshold_deg", [0.5, 1.0, 3.0])
+def test_match_equals_brute_force(index, threshold_deg):
+    matched = 0
+    for start, end in port_pairs() + near_lane_pairs(index):
+        expected = brute_force_match(index.parts, start, end, threshold_deg)
+        assert index.match(start, end, threshold_deg).tolist() == expected, (start, end)
+        matched += bool(expected)
+    assert matched > 100
+
+
+def test_match_lanes_picks_lod(index):
+    start, end = near_lane_pairs(index, n=1)[0]
+    matched = index.match(start, end, 3.0)
+    for lod in range(len(index.lods)):
+        assert list(index.match_lanes(start, end, 3.0, lod)) == list(index.lods[lod][matched])
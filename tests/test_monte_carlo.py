@@ -0,0 +1,77 @@
+# Monte Carlo estimates against closed forms. With the load factor fixed
+# the hydrogen used H is constant, so total cost is H * (fuel price +
+# emission factor * carbon price / 1000) and emissions are H * emission
+# factor -- linear in the sampled inputs.
+
+import numpy as np
+import pytest
+
+from core.monte_carlo import draw_samples, run_monte_carlo, sample_distribution
+from core.pipeline import run_pipeline
+
+N = 400_000
+
+
+@pytest.fixture
+def config(base_config):
+    return {**base_config, "engine_type": "PEMFC"}
+
+
+@pytest.fixture
+def hydrogen_kg(config):
+    return run_pipeline(config)["energy"]["hydrogen_used_kg"]
+
+
+def within(estimate, expected, std, n=N, z=5):
+    # Mean estimate within z standard errors
+    return abs(estimate - expected) <= z * std / np.sqrt(n)
+
+
+def test_cost_moments(config, hydrogen_kg):
+    # fuel ~ U(3, 10), carbon ~ N(100, 40), emission factor fixed at 10:
+    # cost = H * (fuel + carbon / 100)
+    distributions = {"fuel_cost_usd_per_kg": {"low": 3, "high": 10},
+                     "carbon_price_usd_per_ton": {"dist": "normal", "mean": 100, "std": 40}}
+    cost = run_monte_carlo({**config, "emission_factor_kg_co2e_per_kg_h2": 10}, distributions, N, seed=1)
+    cost = cost["metrics"]["total_cost_usd"]
+
+    mean = hydrogen_kg * (6.5 + 1.0)
+    std = hydrogen_kg * np.sqrt(49 / 12 + 0.4 ** 2)
+    assert within(cost["mean"], mean, std)
+    assert cost["std"] == pytest.approx(std, rel=0.01)
+    assert sum(cost["histogram"]["counts"]) == N
+
+
+def test_emission_percentiles(config, hydrogen_kg):
+    # emission factor ~ U(0, 10): emissions percentile p is H * p / 10
+    summary = run_monte_carlo(config, {"emission_factor_kg_co2e_per_kg_h2": {"low": 0, "high": 10}}, N, seed=2)
+    emissions = summary["metrics"]["total_emissions_kg_co2e"]
+    for p, value in emissions["percentiles"].items():
+        assert value == pytest.approx(hydrogen_kg * float(p[1:]) / 10, rel=0.02)
+    assert within(emissions["mean"], hydrogen_kg * 5, hydrogen_kg * 10 / np.sqrt(12))
+
+
+@pytest.mark.parametrize("param, mean, var", [
+    ({"low": 2, "high": 6}, 4, 16 / 12),
+    ({"dist": "normal", "mean": 3, "std": 0.5}, 3, 0.25),
+    ({"dist": "triangular", "low": 3, "mode": 5, "high": 10}, 6, (9 + 25 + 100 - 15 - 30 - 50) / 18),
+    ({"dist": "lognormal", "mean": 0.0, "sigma": 0.25}, np.exp(0.25 ** 2 / 2),
+     (np.exp(0.25 ** 2) - 1) * np.exp(0.25 ** 2)),
+    ([1, 2, 6], 3, 14 / 3),
+])
+def test_distribution_moments(param, mean, var):
+    values = sample_distribution(np.random.default_rng(0), param, N)
+    assert within(values.mean(), mean, np.sqrt(var))
+    assert values.var() == pytest.approx(var, rel=0.02)
+
+
+def test_clipping_and_seeds():
+    clipped = {"dist": "normal", "mean": 0, "std": 1, "min": -1, "max": 2}
+    values = sample_distribution(np.random.default_rng(0), clipped, N)
+    assert values.min() == -1 and values.max() == 2
+
+    spec = {"a": {"low": 0, "high": 1}, "b": {"dist": "normal", "mean": 0, "std": 1}}
+    first = draw_samples(spec, 100, seed=7)
+    again = draw_samples(dict(reversed(spec.items())), 100, seed=7)
+    assert all(np.array_equal(first[k], again[k]) for k in spec)
+    assert not np.array_equal(first["a"], draw_samples(spec, 100, seed=8)["a"])
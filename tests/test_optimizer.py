@@ -0,0 +1,57 @@
+# Pareto fronts must hold exactly the non-dominated candidates, and the
+# optimizer's chunk cache must be reused until an input changes.
+
+import numpy as np
+import pytest
+
+from core import optimizer
+from core.optimizer import DEFAULT_OBJECTIVES, optimize, pareto_front
+from core.stage_cache import StageCache
+
+SPEC = {
+    "base": "config/sample_scenarios/high_carbon_price.yaml",
+    "routes": [["Rotterdam", "Singapore"], ["Houston", "New York"], ["Doha", "Jeddah"]],
+    "routing": "sea_lane",
+    "transit_speed_kmh": {"start": 12, "stop": 42, "step": 3},
+}
+
+
+def dominates(a, b):
+    return np.all(a <= b) and np.any(a < b)
+
+
+def brute_force_front(points):
+    return np.array([not any(dominates(q, p) for q in points) for p in points])
+
+
+@pytest.mark.parametrize("m, k, levels", [(200, 2, None), (200, 3, None), (300, 3, 4), (50, 4, 2)])
+def test_pareto_front_matches_brute_force(m, k, levels):
+    # levels: integer-valued objectives, so ties and duplicates occur
+    rng = np.random.default_rng(m * k)
+    points = rng.random((5, m, k)) if levels is None else rng.integers(0, levels, (5, m, k)).astype(float)
+    front = pareto_front(points)
+    for route in range(5):
+        assert front[route].tolist() == brute_force_front(points[route]).tolist()
+
+
+def test_frontier_has_no_dominated_points():
+    frontier = optimize(SPEC, cache=StageCache())
+    assert set(zip(frontier["origin_port"], frontier["destination_port"])) == {tuple(r) for r in SPEC["routes"]}
+    for _, route in frontier.groupby(["origin_port", "destination_port"]):
+        points = route[DEFAULT_OBJECTIVES].to_numpy()
+        assert brute_force_front(points).all()
+        # Duration is an objective, so more than the slowest speed survives
+        assert route["transit_speed_kmh"].nunique() > 1
+
+
+def test_chunk_cache_reuse_and_invalidation(monkeypatch):
+    cache = StageCache()
+    first = optimize(SPEC, cache=cache)
+    misses = cache.stats()["optimizer"]["misses"]
+    assert optimize(SPEC, cache=cache).equals(first)
+    assert cache.stats()["optimizer"]["misses"] == misses
+
+    # A different port matrix (e.g. rebuilt on new lane data) must not reuse chunks
+    monkeypatch.setattr(optimizer, "port_matrix_key", lambda: "rebuilt")
+    optimize(SPEC, cache=cache)
+    assert cache.stats()["optimizer"]["misses"] == 2 * misses
@@ -0,0 +1,91 @@
+# The port matrix must agree with on-demand A* routing, fall back to the
+# great circle for unrouted ports and rebuild when its inputs change.
+
+import itertools
+
+import numpy as np
+import pytest
+
+from geo import port_matrix
+from geo.port_matrix import MAX_SNAP_KM, PortMatrix, default_ports, load_port_matrix
+from geo.routing import load_lane_graph
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return load_lane_graph()
+
+
+@pytest.fixture(scope="module")
+def matrix(tmp_path_factory):
+    return load_port_matrix(str(tmp_path_factory.mktemp("matrix") / "matrix.npz"))
+
+
+def distinct(coords):
+    # Drops the vertex repeated where two route legs meet
+    return coords[np.r_[True, np.any(coords[1:] != coords[:-1], axis=1)]]
+
+
+def test_lookup_matches_astar(graph, matrix):
+    names = matrix.names.tolist()
+    for origin, destination in itertools.permutations(names, 2):
+        i, j = matrix.index[origin], matrix.index[destination]
+        km = matrix.distance_km(origin, destination)
+        if max(matrix.snap_km[i], matrix.snap_km[j]) > MAX_SNAP_KM:
+            assert km == matrix.great_circle_km[i, j]
+            assert matrix.route(origin, destination, graph) is None
+            continue
+        route = graph.route((matrix.lon[i], matrix.lat[i]), (matrix.lon[j], matrix.lat[j]))
+        assert km == pytest.approx(route.distance_km, rel=1e-9)
+
+        rebuilt = matrix.route(origin, destination, graph)
+        assert rebuilt.distance_km == pytest.approx(km)
+        assert np.array_equal(distinct(rebuilt.coords), distinct(route.coords))
+
+
+def test_lookup_vectorized(matrix):
+    names = matrix.names.tolist()
+    origins, destinations = zip(*itertools.product(names, repeat=2))
+    routed = matrix.lookup_km(origins, destinations)
+    great_circle = matrix.lookup_km(origins, destinations, routed=False)
+    assert np.all(np.isfinite(routed))
+    assert np.all(routed >= great_circle - 1e-6)
+    assert routed.tolist() == [matrix.distance_km(o, d) for o, d in zip(origins, destinations)]
+    with pytest.raises(KeyError):
+        matrix.lookup_km(["Atlantis"], [names[0]])
+
+
+def test_far_ports_warn(graph, capsys):
+    # A point inland is beyond the snap cap; everything from it falls back
+    names, lons, lats = default_ports()
+    built = port_matrix.build_port_matrix(names[:2] + ["Inland"], lons[:2] + [20.0], lats[:2] + [0.0], graph)
+    assert "Inland" in capsys.readouterr().out
+    assert built.snap_km[2] > MAX_SNAP_KM
+    assert np.isfinite(built.routed_km[0, 1])
+    assert built.distance_km("Inland", names[0]) == built.great_circle_km[2, 0]
+
+
+def test_reload_and_rebuild(tmp_path, monkeypatch):
+    path = str(tmp_path / "matrix.npz")
+    names, lons, lats = default_ports()
+    calls = []
+    build = port_matrix.build_port_matrix
+    monkeypatch.setattr(port_matrix, "build_port_matrix", lambda *a, **kw: calls.append(a[0]) or build(*a, **kw))
+
+    first = load_port_matrix(path, names, lons, lats)
+    again = load_port_matrix(path, names, lons, lats)
+    assert len(calls) == 1
+    assert np.array_equal(first.routed_km, again.routed_km)
+
+    # Changing the port list, a coordinate or the format version rebuilds
+    load_port_matrix(path, names[:-1], lons[:-1], lats[:-1])
+    moved = list(lons)
+    moved[0] += 0.5
+    load_port_matrix(path, names[:-1], moved[:-1], lats[:-1])
+    assert len(calls) == 3
+
+    stale = PortMatrix.load(path)
+    stale.format_version = np.array(port_matrix.MATRIX_FORMAT_VERSION - 1)
+    stale.save(path)
+    load_port_matrix(path, names[:-1], moved[:-1], lats[:-1])
+    assert len(calls) == 4
@@ -0,0 +1,83 @@
+# Results store round trips must return exactly what a fresh simulation
+# does, and equivalent configs must be simulated and stored only once.
+
+import json
+import sqlite3
+
+import pytest
+
+from main import run_simulation
+from utils import results_store
+from utils.results_store import ResultsStore, run_key
+
+
+@pytest.fixture
+def configs(base_config):
+    # Steady-state and time-series missions; the latter add mission keys
+    return [{**base_config, "engine_type": engine, "route_km": km, **mode}
+            for engine in ["PEMFC", "H2-ICE"] for km in [400, 1200] for mode in [{}, {"mission_mode": "timeseries"}]]
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultsStore(str(tmp_path / "results.sqlite")) as store:
+        yield store
+
+
+def counting(calls):
+    def simulate(config):
+        calls.append(config)
+        return results_store.simulate_config(config)
+    return simulate
+
+
+def test_round_trip_keeps_full_result(store, configs, tmp_path):
+    computed = store.run(configs)
+    expected = [json.loads(json.dumps(run_simulation(c), default=float)) for c in configs]
+    assert computed == expected
+    assert "peak_power_kw" in computed[1]["mission"]
+
+    with ResultsStore(str(tmp_path / "results.sqlite")) as reopened:
+        assert reopened.lookup(configs) == expected
+        frame = reopened.query(with_results=True, with_configs=True, order_by="route_km")
+    assert len(frame) == len(configs)
+    assert sorted(map(json.dumps, frame["result"])) == sorted(map(json.dumps, expected))
+
+
+def test_dedup(store, configs):
+    calls = []
+    duplicated = configs + [{**c, "route_km": float(c["route_km"])} for c in configs]
+    results = store.run(duplicated, counting(calls))
+    assert len(calls) == len(configs) == len(store)
+    assert results[:len(configs)] == results[len(configs):]
+
+    assert store.run(configs, counting(calls)) == results[:len(configs)]
+    assert len(calls) == len(configs)
+    assert store.put_many(configs, results) == 0
+    assert store.put_many([{**configs[0], "load_factor": 0.5}], [{"error": "failed"}]) == 0
+
+
+def test_query_filters(store, configs):
+    store.run(configs)
+    frame = store.query(engine_type="H2-ICE", min_route_km=1000)
+    assert len(frame) == 2
+    assert set(frame["engine_type"]) == {"H2-ICE"} and frame["route_km"].min() >= 1000
+    with pytest.raises(ValueError):
+        store.query(vessel_type="RoRo")
+
+
+def test_key_includes_model_version(configs, monkeypatch):
+    key = run_key(configs[0])
+    assert run_key({**configs[0], "route_km": 400.0}) == key
+    monkeypatch.setattr(results_store, "MODEL_VERSION", results_store.MODEL_VERSION + 1)
+    assert run_key(configs[0]) != key
+
+
+def test_refuses_other_format(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    ResultsStore(path).close()
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA user_version = {results_store.STORE_FORMAT_VERSION - 1}")
+    conn.close()
+    with pytest.raises(ValueError, match="format"):
+        ResultsStore(path)
@@ -0,0 +1,73 @@
+# A* routes on the lane graph must match a full Dijkstra tree from the same
+# snapped point, never beat the great circle, and trace a polyline whose
+# length is the reported distance.
+
+import itertools
+
+import numpy as np
+import pytest
+
+from geo.distance import haversine_km
+from geo.port_matrix import resolve_targets
+from geo.ports import port_coords
+from geo.routing import load_lane_graph
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return load_lane_graph()
+
+
+def port_pairs():
+    # (lon, lat) pairs; port_coords holds (lat, lon)
+    return [(port_coords[a][::-1], port_coords[b][::-1]) for a, b in itertools.permutations(port_coords, 2)]
+
+
+def lane_points(graph, n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    return [tuple(p) for p in graph.edge_coords[rng.choice(len(graph.edge_coords), n, replace=False)]]
+
+
+def dijkstra_km(graph, start, end):
+    s_edge, s_pos, s_km = graph.snap(*start)
+    t_edge, t_pos, t_km = graph.snap(*end)
+    dist, _, _ = graph.shortest_path_tree(s_edge, s_pos)
+    lane_km, _ = resolve_targets(graph, dist, s_edge, s_pos, np.array([t_edge]), np.array([t_pos]))
+    return float(lane_km[0]) + s_km + t_km
+
+
+def polyline_km(route):
+    return float(np.sum(haversine_km(route.lon[:-1], route.lat[:-1], route.lon[1:], route.lat[1:])))
+
+
+def test_astar_matches_dijkstra(graph):
+    pairs = port_pairs() + list(itertools.permutations(lane_points(graph), 2))[:400]
+    routed = 0
+    for start, end in pairs:
+        route = graph.route(start, end)
+        expected = dijkstra_km(graph, start, end)
+        if route is None:
+            assert not np.isfinite(expected)
+            continue
+        routed += 1
+        assert route.distance_km == pytest.approx(expected, rel=1e-9, abs=1e-6)
+    assert routed > len(pairs) // 2
+
+
+def test_route_distances(graph):
+    for start, end in port_pairs():
+        route = graph.route(start, end)
+        if route is None:
+            continue
+        great_circle = float(haversine_km(start[0], start[1], end[0], end[1]))
+        assert route.distance_km >= great_circle - 1e-6
+        assert route.distance_km == pytest.approx(route.lane_km + sum(route.snap_km))
+        assert polyline_km(route) == pytest.approx(route.distance_km, rel=1e-6)
+        assert tuple(route.coords[0]) == start and tuple(route.coords[-1]) == end
+
+
+def test_route_to_self_is_snap_legs(graph):
+    start = port_coords["Rotterdam"][::-1]
+    route = graph.route(start, start)
+    assert route.lane_km == pytest.approx(0.0, abs=1e-9)
+    assert route.distance_km == pytest.approx(2 * route.snap_km[0])
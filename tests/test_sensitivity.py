@@ -0,0 +1,87 @@
+# Sobol and Morris estimators against functions with known indices, then
+# through the model on a case that is linear in its inputs.
+
+import numpy as np
+import pytest
+
+from core.pipeline import run_pipeline
+from core.sensitivity import (bootstrap_sobol, morris_design, morris_effects, run_sensitivity, saltelli_design,
+                              sobol_indices)
+
+BASE = "config/sample_scenarios/high_carbon_price.yaml"
+
+
+def ishigami(u, a=7.0, b=0.1):
+    x = -np.pi + 2 * np.pi * u
+    return np.sin(x[:, 0]) + a * np.sin(x[:, 1]) ** 2 + b * x[:, 2] ** 4 * np.sin(x[:, 0])
+
+
+def test_sobol_ishigami():
+    # Analytic indices for a = 7, b = 0.1
+    n, d = 2 ** 15, 3
+    y = ishigami(saltelli_design(n, d, seed=3))
+    first, total = sobol_indices(y, n, d)
+    assert first == pytest.approx([0.3139, 0.4424, 0.0], abs=0.03)
+    assert total == pytest.approx([0.5576, 0.4424, 0.2437], abs=0.03)
+
+
+def test_sobol_additive_with_bootstrap():
+    # y = sum c_i x_i, x_i ~ U(0, 1): S1 = ST = c_i^2 / sum c^2
+    n, d = 2 ** 13, 4
+    c = np.array([4.0, 2.0, 1.0, 0.0])
+    y = saltelli_design(n, d, seed=4) @ c
+    first, total = sobol_indices(y, n, d)
+    expected = c ** 2 / np.sum(c ** 2)
+    assert first == pytest.approx(expected, abs=0.03)
+    assert total == pytest.approx(expected, abs=0.03)
+    # A constant offset (costs sit far from zero) must not change the estimate
+    assert sobol_indices(y + 1e4, n, d)[0] == pytest.approx(first, abs=1e-6)
+
+    first_ci, total_ci = bootstrap_sobol(y, n, d, resamples=200, seed=4)
+    assert np.all(first_ci[0] <= first_ci[1]) and np.all(total_ci[0] <= total_ci[1])
+    assert np.all((first_ci[0] - 0.01 <= expected) & (expected <= first_ci[1] + 0.01))
+
+
+def test_morris_linear_and_interaction():
+    r, d = 50, 3
+    unit, order, step = morris_design(r, d, levels=4, seed=5)
+    assert np.all((unit >= 0) & (unit < 1))
+    # Each trajectory moves every coordinate exactly once
+    moved = np.abs(np.diff(unit.reshape(r, d + 1, d), axis=1)) > 0
+    assert np.all(moved.sum(axis=1) == 1) and np.all(moved.sum(axis=2) == 1)
+
+    effects = morris_effects(unit @ np.array([3.0, -2.0, 0.0]), order, step)
+    assert effects["mu"] == pytest.approx([3.0, -2.0, 0.0])
+    assert effects["mu_star"] == pytest.approx([3.0, 2.0, 0.0])
+    assert effects["sigma"] == pytest.approx([0.0, 0.0, 0.0], abs=1e-12)
+
+    effects = morris_effects(unit[:, 0] * unit[:, 1], order, step)
+    assert effects["sigma"][0] > 0 and effects["sigma"][1] > 0 and effects["mu_star"][2] == 0
+
+
+@pytest.fixture
+def spec():
+    # With the emission factor fixed, cost per ton-km is k * (fuel + 0.01 * carbon)
+    return {"base": BASE, "base_config": {"engine_type": "PEMFC", "emission_factor_kg_co2e_per_kg_h2": 10},
+            "parameters": {"fuel_cost_usd_per_kg": {"low": 3, "high": 10},
+                           "carbon_price_usd_per_ton": {"low": 0, "high": 300}},
+            "outputs": {"cost_per_ton_km_usd": "cost_cost_per_ton_km_usd"}, "seed": 6}
+
+
+def test_model_sobol(spec):
+    report = run_sensitivity({**spec, "method": "sobol", "samples": 8192, "bootstrap": 20})
+    var_fuel, var_carbon = 7 ** 2 / 12, (0.01 * 300) ** 2 / 12
+    indices = report["outputs"]["cost_per_ton_km_usd"]
+    assert report["evaluations"] == 8192 * 4
+    assert indices["fuel_cost_usd_per_kg"]["S1"] == pytest.approx(var_fuel / (var_fuel + var_carbon), abs=0.03)
+    assert indices["carbon_price_usd_per_ton"]["ST"] == pytest.approx(var_carbon / (var_fuel + var_carbon), abs=0.03)
+
+
+def test_model_morris(spec, base_config):
+    report = run_sensitivity({**spec, "method": "morris", "samples": 20})
+    config = {**base_config, **spec["base_config"]}
+    k = run_pipeline(config)["energy"]["hydrogen_used_kg"] / (config["route_km"] * config["cargo_mass_tons"])
+    mu_star = report["outputs"]["cost_per_ton_km_usd"]["mu_star"]
+    # Effects are per unit of the [0, 1] design range
+    assert mu_star["fuel_cost_usd_per_kg"] == pytest.approx(7 * k)
+    assert mu_star["carbon_price_usd_per_ton"] == pytest.approx(0.01 * 300 * k)
@@ -0,0 +1,87 @@
+# The job service must compute each distinct scenario once: duplicates in a
+# job, across concurrent jobs and already cached or stored scenarios all
+# share one result.
+
+import asyncio
+
+import pytest
+
+from main import run_simulation
+from server import JobService, QueueFull, parse_job
+
+
+def scenarios(base_config, routes):
+    return [{**base_config, "engine_type": "PEMFC", "route_km": km} for km in routes]
+
+
+def run_service(coro_fn, **kwargs):
+    async def main():
+        service = JobService(workers=1, **kwargs)
+        await service.start()
+        try:
+            return await coro_fn(service)
+        finally:
+            await service.stop()
+    return asyncio.run(main())
+
+
+async def results(job):
+    await asyncio.gather(*job.futures)
+    return job.results()
+
+
+def test_duplicates_computed_once(base_config):
+    first = scenarios(base_config, [400, 400, 800, 400])
+    second = scenarios(base_config, [800, 1200, 400])
+
+    async def go(service):
+        jobs = [await service.submit(first), await service.submit(second)]
+        out = [await results(job) for job in jobs]
+        assert service.stats["computed"] == 3
+        assert service.health()["deduplicated"] == 4
+        assert all(job.status()["state"] == "done" for job in jobs)
+
+        again = await service.submit(first)
+        out.append(await results(again))
+        assert service.stats["computed"] == 3
+        assert service.cache.stats()["service"]["hits"] == 2
+        return out
+
+    out = run_service(go)
+    for job, configs in zip(out, [first, second, first]):
+        assert [{k: v for k, v in r.items() if k != "config_hash"} for r in job] == [run_simulation(c) for c in configs]
+    assert out[0][0]["config_hash"] == out[0][1]["config_hash"] == out[1][2]["config_hash"]
+
+
+def test_store_answers_later_services(base_config, tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    configs = scenarios(base_config, [400, 800])
+
+    async def go(service):
+        await results(await service.submit(configs))
+        return dict(service.stats)
+
+    assert run_service(go, store=path)["computed"] == 2
+    stats = run_service(go, store=path)
+    assert stats["computed"] == 0 and stats["stored"] == 2
+
+
+def test_failed_scenarios_and_backpressure(base_config):
+    async def go(service):
+        job = await service.submit([{**base_config, "engine_type": "Steam"}] + scenarios(base_config, [400]))
+        out = await results(job)
+        assert "error" in out[0] and "error" not in out[1]
+        assert job.status()["failed"] == 1 and service.stats["failed"] == 1
+
+        with pytest.raises(QueueFull):
+            await service.submit(scenarios(base_config, [1000, 2000, 3000]))
+        assert service.stats["rejected_jobs"] == 1
+
+    run_service(go, max_pending=2)
+
+
+def test_parse_job_merges_base():
+    assert parse_job('{"base": {"a": 1, "b": 2}, "configs": [{"b": 3}]}') == [{"a": 1, "b": 3}]
+    assert parse_job('[{"a": 1}]') == [{"a": 1}]
+    with pytest.raises(ValueError):
+        parse_job('{"configs": 1}')
@@ -0,0 +1,68 @@
+# StageCache must only recompute the stages whose declared inputs changed,
+# and cached results must equal a fresh run.
+
+import pytest
+
+from core.pipeline import STAGES, run_pipeline
+from core.stage_cache import StageCache, config_hash
+
+STAGE_NAMES = [name for name, _, _, _ in STAGES]
+
+
+@pytest.fixture
+def config(base_config):
+    return {**base_config, "engine_type": "PEMFC"}
+
+
+def misses(cache, before):
+    return {stage for stage, s in cache.stats().items() if s["misses"] > before.get(stage, {}).get("misses", 0)}
+
+
+def test_repeat_run_hits(config):
+    cache = StageCache()
+    first = run_pipeline(config, cache)
+    before = cache.stats()
+    assert run_pipeline(config, cache) == first == run_pipeline(config)
+    assert misses(cache, before) == set()
+    assert all(cache.stats()[s]["hits"] == 1 for s in STAGE_NAMES)
+
+
+@pytest.mark.parametrize("key, value, expected", [
+    ("carbon_price_usd_per_ton", 250, {"cost"}),
+    ("emission_factor_kg_co2e_per_kg_h2", 0, {"cost", "emissions"}),
+    ("engine_type", "H2-ICE", {"hydrogen", "energy", "cost", "emissions"}),
+    ("route_km", 900, set(STAGE_NAMES)),
+    ("vessel_type", "Tanker", set()),
+])
+def test_input_change_invalidates_downstream(config, key, value, expected):
+    cache = StageCache()
+    run_pipeline(config, cache)
+    before = cache.stats()
+    changed = {**config, key: value}
+    assert run_pipeline(changed, cache) == run_pipeline(changed)
+    assert misses(cache, before) == expected
+
+
+def test_disk_tier(config, tmp_path):
+    first = run_pipeline(config, StageCache(disk_dir=str(tmp_path)))
+    cache = StageCache(disk_dir=str(tmp_path))
+    assert run_pipeline(config, cache) == first
+    assert all(cache.stats()[s]["disk_hits"] == 1 for s in STAGE_NAMES)
+
+
+def test_lru_eviction_and_copies():
+    cache = StageCache(maxsize=2)
+    for i in range(3):
+        cache.put("stage", config_hash({"i": i}), {"value": i})
+    assert len(cache) == 2
+    assert cache.get("stage", config_hash({"i": 0})) is None
+
+    value = cache.get("stage", config_hash({"i": 2}))
+    value["value"] = -1
+    assert cache.get("stage", config_hash({"i": 2})) == {"value": 2}
+
+
+def test_config_hash_ignores_undeclared_keys():
+    assert config_hash({"a": 1, "b": 2}, ["a"]) == config_hash({"a": 1, "b": 3}, ["a"])
+    assert config_hash({"a": 1}, ["a"]) != config_hash({"a": 2}, ["a"])
+    assert config_hash({"a": 1}, ["a"], ["x"]) != config_hash({"a": 1}, ["a"], ["y"])
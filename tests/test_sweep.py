@@ -0,0 +1,71 @@
+# Parallel sweeps must return exactly the serial result, in grid order,
+# with the swept inputs alongside the results.
+
+import numpy as np
+import pytest
+
+from core.sweep import (build_chunk, chunk_bounds, load_sweep_spec, result_extra_columns, run_sweep, run_sweep_to_sink,
+                        string_columns, sweep_size)
+from utils.results_writer import open_result_sink
+
+SAMPLE_SPEC = {
+    "base": "config/sample_scenarios/high_carbon_price.yaml",
+    "mode": "sample",
+    "samples": 5000,
+    "seed": 7,
+    "parameters": {
+        "engine_type": ["PEMFC", "H2-ICE"],
+        "route_km": {"low": 100, "high": 3000},
+        "carbon_price_usd_per_ton": {"low": 0, "high": 300},
+    },
+}
+
+
+def _assert_same(a, b):
+    assert a.keys() == b.keys()
+    for key in a:
+        np.testing.assert_array_equal(a[key], b[key], err_msg=key)
+
+
+@pytest.mark.parametrize("spec", ["config/sweeps/engine_distance.yaml", "config/sweeps/port_pairs.yaml", SAMPLE_SPEC],
+                         ids=["grid", "port_pairs", "sample"])
+def test_parallel_matches_serial(spec):
+    if isinstance(spec, str):
+        spec = load_sweep_spec(spec)
+    chunk_size = max(1, sweep_size(spec) // 5)
+    serial = run_sweep(spec, workers=1, chunk_size=chunk_size)
+    parallel = run_sweep(spec, workers=2, chunk_size=chunk_size)
+    assert len(serial["engine"]) == sweep_size(spec)
+    _assert_same(serial, parallel)
+
+
+def test_sample_sweep_is_seeded():
+    _assert_same(run_sweep(SAMPLE_SPEC, workers=1, chunk_size=1000),
+                 run_sweep(SAMPLE_SPEC, workers=1, chunk_size=1000))
+
+
+@pytest.mark.parametrize("spec, extra", [
+    ("config/sweeps/engine_distance.yaml", ["engine_type", "route_km"]),
+    ("config/sweeps/port_pairs.yaml", ["engine_type", "origin_port", "destination_port"]),
+    (SAMPLE_SPEC, ["engine_type", "route_km", "carbon_price_usd_per_ton"]),
+], ids=["grid", "port_pairs", "sample"])
+def test_swept_inputs_in_results(spec, extra, tmp_path):
+    if isinstance(spec, str):
+        spec = load_sweep_spec(spec)
+    assert result_extra_columns(spec) == extra
+    results = run_sweep(spec, workers=1, chunk_size=7)
+    chunks = [build_chunk(spec, a, b) for a, b in chunk_bounds(sweep_size(spec), 7)]
+    inputs = {k: np.concatenate([np.broadcast_to(c[k], (len(c["engine_type"]),)) for c in chunks]) for k in chunks[0]}
+    for key in extra:
+        np.testing.assert_array_equal(results[key], inputs[key], err_msg=key)
+    np.testing.assert_array_equal(results["engine"], inputs["engine_type"])
+
+    # The streamed table carries them too, as text or float64 columns
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "sweep.parquet")
+    with open_result_sink(path, extra, string_columns=string_columns(spec)) as sink:
+        run_sweep_to_sink(spec, sink, workers=1, chunk_size=7)
+    table = pq.read_table(path)
+    assert table.column_names[-len(extra):] == extra
+    for key in extra:
+        assert table.column(key).to_pylist() == results[key].tolist()
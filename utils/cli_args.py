@@ -0,0 +1,56 @@
+# utils/cli_args.py
+#
+# Argument definitions (and their defaults) for the subcommands whose
+# modules are heavy to import. main.py builds its whole parser from here,
+# so `python main.py run ...` never imports asyncio, the process pool or
+# matplotlib; server.py, core/sweep.py and utils/report.py import the same
+# definitions for their own __main__ and re-export the defaults.
+
+# server.py
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_MAX_PENDING = 1_000_000
+DEFAULT_RESULT_CACHE = 100_000
+
+# utils/report.py
+DEFAULT_METRICS = ["cost_total_cost_usd", "emissions_total_emissions_kg_co2e"]
+DEFAULT_X = "mission_distance_km"
+DEFAULT_HUE = "engine"
+DEFAULT_GROUP_BY = ["origin_port", "destination_port"]
+REPORT_OUTPUT_DIR = "outputs/reports"
+
+
+def add_sweep_arguments(parser):
+    parser.add_argument("spec", help="Sweep spec YAML file")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--output-dir", default="outputs/results")
+    parser.add_argument("--format", choices=["parquet", "arrows", "csv"], default="parquet")
+    parser.add_argument("--compression", default="zstd")
+    parser.add_argument("--profile", help="Write per-stage timings and counters to this JSON file")
+    parser.add_argument("--trace", help="Write a Chrome trace (chrome://tracing, Perfetto) to this file")
+
+
+def add_serve_arguments(parser):
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Scenarios per pool task")
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING,
+                        help="Queued scenarios before new jobs are rejected with 503")
+    parser.add_argument("--result-cache", type=int, default=DEFAULT_RESULT_CACHE,
+                        help="Completed scenarios kept for deduplication")
+    parser.add_argument("--store", default=None, help="Results store (SQLite) to reuse and record runs")
+
+
+def add_report_arguments(parser):
+    parser.add_argument("results", help="Results table (.csv, .parquet or .arrows)")
+    parser.add_argument("--group-by", nargs="*", default=None,
+                        help=f"Scenario columns (default: {' '.join(DEFAULT_GROUP_BY)} when present)")
+    parser.add_argument("--x", default=DEFAULT_X, help="x column of the scenario charts")
+    parser.add_argument("--hue", default=DEFAULT_HUE, help="One line per value of this column")
+    parser.add_argument("--metrics", nargs="+", default=DEFAULT_METRICS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--title", default="HydroSim report")
+    parser.add_argument("--output-dir", default=REPORT_OUTPUT_DIR)
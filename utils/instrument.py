@@ -0,0 +1,156 @@
+# utils/instrument.py
+#
+# Per-stage timers and counters. Disabled by default; when disabled
+# metrics.span() hands back one shared no-op context and count() returns
+# at once, so instrumented code runs a single code path either way. Enable with metrics.enable() or HYDROSIM_PROFILE=1 (add
+# HYDROSIM_PROFILE_TRACE=1 to also keep Chrome trace events).
+#
+# Timing samples per stage are kept in a fixed-size reservoir, so p50/p99
+# stay cheap and memory stays bounded in long sweeps.
+
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+RESERVOIR_SIZE = 10_000
+MAX_TRACE_EVENTS = 1_000_000
+_NO_SPAN = nullcontext()
+
+
+class StageStats:
+    def __init__(self):
+        self.calls = 0
+        self.total_s = 0.0
+        self.samples = []
+
+    def add(self, seconds):
+        self.calls += 1
+        self.total_s += seconds
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(seconds)
+        else:
+            i = random.randrange(self.calls)
+            if i < RESERVOIR_SIZE:
+                self.samples[i] = seconds
+
+    def merge(self, calls, total_s, samples):
+        # Each reservoir is a uniform sample of its own calls; drawing from
+        # each side in proportion to its calls keeps the merged one uniform
+        samples = list(samples)
+        if len(self.samples) + len(samples) > RESERVOIR_SIZE:
+            own = round(RESERVOIR_SIZE * self.calls / (self.calls + calls)) if self.calls + calls else 0
+            own = min(max(own, RESERVOIR_SIZE - len(samples)), len(self.samples))
+            self.samples = (random.sample(self.samples, own)
+                            + random.sample(samples, min(RESERVOIR_SIZE - own, len(samples))))
+        else:
+            self.samples = self.samples + samples
+        self.calls += calls
+        self.total_s += total_s
+
+    def summary(self):
+        s = np.array(self.samples) if self.samples else np.zeros(1)
+        return {
+            "calls": self.calls,
+            "total_s": self.total_s,
+            "mean_s": self.total_s / self.calls if self.calls else 0.0,
+            "p50_s": float(np.percentile(s, 50)),
+            "p99_s": float(np.percentile(s, 99)),
+            "max_s": float(s.max()),
+        }
+
+
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self.trace = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, trace=False):
+        self.enabled = True
+        self.trace = trace
+
+    def disable(self):
+        self.enabled = False
+        self.trace = False
+
+    def reset(self):
+        self.stages = {}
+        self.counters = {}
+        self.events = []
+        self._t0 = time.perf_counter()
+
+    def record(self, name, seconds, start=None):
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats()
+            stats.add(seconds)
+            if self.trace and start is not None and len(self.events) < MAX_TRACE_EVENTS:
+                self.events.append({
+                    "name": name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                    "ts": (start - self._t0) * 1e6, "dur": seconds * 1e6,
+                })
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def span(self, name):
+        # Times the with-block as stage `name`; a shared no-op when disabled
+        if not self.enabled:
+            return _NO_SPAN
+        return self._timed_span(name)
+
+    @contextmanager
+    def _timed_span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, start)
+
+    def snapshot(self):
+        return {
+            "stages": {name: s.summary() for name, s in sorted(self.stages.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def drain(self):
+        # Raw state for merging into another process's metrics, then reset
+        state = {
+            "stages": {n: (s.calls, s.total_s, s.samples) for n, s in self.stages.items()},
+            "counters": dict(self.counters),
+            "events": self.events,
+        }
+        self.reset()
+        return state
+
+    def merge(self, state):
+        with self._lock:
+            for name, (calls, total_s, samples) in state["stages"].items():
+                self.stages.setdefault(name, StageStats()).merge(calls, total_s, samples)
+            for name, n in state["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            self.events.extend(state["events"][:MAX_TRACE_EVENTS - len(self.events)])
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def write_chrome_trace(self, path):
+        # Loadable in chrome://tracing or https://ui.perfetto.dev
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+metrics = Instrumentation()
+
+if os.environ.get("HYDROSIM_PROFILE") == "1":
+    metrics.enable(trace=os.environ.get("HYDROSIM_PROFILE_TRACE") == "1")
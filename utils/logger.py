@@ -1,2 +1,60 @@
-def log(msg):
-    print(f"[HydroSim] {msg}")
+# utils/logger.py
+#
+# Leveled, rate-limited logging. Text output keeps the "[HydroSim] msg"
+# format; HYDROSIM_LOG_FORMAT=json emits one JSON object per line instead.
+# Messages below the active level return before any formatting work.
+
+import json
+import os
+import sys
+import time
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+_level = LEVELS.get(os.environ.get("HYDROSIM_LOG_LEVEL", "info").lower(), LEVELS["info"])
+_format = os.environ.get("HYDROSIM_LOG_FORMAT", "text").lower()
+_last_emit = {}
+_suppressed = {}
+
+
+def set_level(level):
+    global _level
+    _level = LEVELS[level]
+
+
+def set_format(fmt):
+    global _format
+    if fmt not in ("text", "json"):
+        raise ValueError(f"Unknown log format: {fmt}")
+    _format = fmt
+
+
+def is_enabled_for(level):
+    return LEVELS[level] >= _level
+
+
+def log(msg, level="info", every_s=None, key=None, **fields):
+    # every_s rate-limits messages sharing a key (default: the message text);
+    # the number of dropped messages is reported with the next one emitted
+    if LEVELS[level] < _level:
+        return
+
+    if every_s is not None:
+        key = key or msg
+        now = time.monotonic()
+        if now - _last_emit.get(key, -float("inf")) < every_s:
+            _suppressed[key] = _suppressed.get(key, 0) + 1
+            return
+        _last_emit[key] = now
+        dropped = _suppressed.pop(key, 0)
+        if dropped:
+            fields["suppressed"] = dropped
+
+    if _format == "json":
+        record = {"ts": round(time.time(), 3), "level": level, "msg": msg, **fields}
+        print(json.dumps(record, default=str), file=sys.stdout)
+        return
+
+    extra = " ".join(f"{k}={v}" for k, v in fields.items())
+    prefix = "[HydroSim]" if level == "info" else f"[HydroSim:{level.upper()}]"
+    print(f"{prefix} {msg}" + (f" ({extra})" if extra else ""))
@@ -0,0 +1,316 @@
+# utils/report.py
+#
+# Headless chart reports for large result tables (sweep, fleet or results
+# store output). Rows are grouped into scenarios -- by default one per port
+# pair -- and each scenario gets one chart with a panel per metric, plotted
+# against an x column with one line per engine. Summary charts cover the
+# whole table. Everything is written as a single index.html next to a
+# charts/ directory.
+#
+# Charts are drawn on the Agg canvas directly (no pyplot state, no display)
+# by a pool of worker processes. Each worker builds its figure, axes and
+# lines once and only swaps line data, limits and titles between charts, and
+# PNGs are written with light compression. The report_charts benchmark times
+# that single-worker render loop; scaling across workers is not measured.
+#
+#   python -m utils.report outputs/results/sweep_20250101_120000.parquet
+#   python -m utils.report fleet.csv --group-by vessel_type --x route_km
+
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from utils.cli_args import (DEFAULT_GROUP_BY, DEFAULT_HUE, DEFAULT_METRICS, DEFAULT_X,
+                            REPORT_OUTPUT_DIR as OUTPUT_DIR, add_report_arguments)
+from utils.instrument import metrics
+from utils.logger import log
+
+CHARTS_PER_TASK = 25
+FIGSIZE = (8, 5.5)
+DPI = 80
+PNG_OPTIONS = {"compress_level": 1}
+SCATTER_POINTS = 20_000
+HISTOGRAM_BINS = 50
+TICKS = 5
+
+METRIC_LABELS = {
+    "cost_total_cost_usd": "Total cost (USD)",
+    "cost_fuel_cost_usd": "Fuel cost (USD)",
+    "cost_carbon_cost_usd": "Carbon cost (USD)",
+    "cost_cost_per_km_usd": "Cost per km (USD)",
+    "cost_cost_per_ton_km_usd": "Cost per ton-km (USD)",
+    "emissions_total_emissions_kg_co2e": "Emissions (kg CO₂e)",
+    "emissions_emissions_per_km_kg_co2e": "Emissions per km (kg CO₂e)",
+    "emissions_emissions_per_ton_km_kg_co2e": "Emissions per ton-km (kg CO₂e)",
+    "energy_hydrogen_used_kg": "Hydrogen used (kg)",
+    "mission_distance_km": "Route distance (km)",
+    "mission_duration_hours": "Duration (h)",
+}
+
+
+def label(column):
+    return METRIC_LABELS.get(column, column)
+
+
+def read_results(path):
+    import pandas as pd
+
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    if path.endswith(".arrows"):
+        import pyarrow as pa
+
+        with pa.ipc.open_stream(path) as reader:
+            return reader.read_all().to_pandas()
+    raise ValueError(f"Unsupported results file {path} (expected .csv, .parquet or .arrows)")
+
+
+def _new_figure(nrows=1, sharex=True):
+    # Agg canvas without pyplot, so nothing is registered or shown
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=FIGSIZE, dpi=DPI)
+    FigureCanvasAgg(figure)
+    axes = figure.subplots(nrows, 1, sharex=sharex, squeeze=False)[:, 0]
+    figure.subplots_adjust(left=0.11, right=0.97, top=0.92, bottom=0.09, hspace=0.3)
+    return figure, list(axes)
+
+
+def _compact_axis(ax):
+    # Few, short tick labels: tick text layout is most of the drawing time
+    from matplotlib.ticker import EngFormatter, MaxNLocator
+
+    ax.xaxis.set_major_locator(MaxNLocator(TICKS))
+    ax.yaxis.set_major_locator(MaxNLocator(TICKS))
+    ax.yaxis.set_major_formatter(EngFormatter(sep=""))
+    ax.grid(True, linestyle="--", alpha=0.6)
+
+
+def _save(figure, path):
+    figure.savefig(path, dpi=DPI, pil_kwargs=PNG_OPTIONS)
+
+
+class ScenarioChart:
+    # One figure with a panel per metric, reused for every scenario: the
+    # lines of each hue are created once and only their data change
+    def __init__(self, metric_columns, hues, x_column):
+        from matplotlib import colormaps
+
+        self.figure, self.axes = _new_figure(len(metric_columns))
+        colors = colormaps["tab10"].colors
+        self.lines = {}
+        for ax, column in zip(self.axes, metric_columns):
+            ax.set_ylabel(label(column))
+            _compact_axis(ax)
+        self.axes[-1].set_xlabel(label(x_column))
+        for i, hue in enumerate(hues):
+            self.lines[hue] = [ax.plot([], [], marker="o", markersize=4, color=colors[i % len(colors)],
+                                       label=str(hue))[0] for ax in self.axes]
+        self._legend_hues = None
+
+    def render(self, path, title, series):
+        # series: {hue: (x, [y per metric])}
+        for hue, lines in self.lines.items():
+            x, ys = series.get(hue, ((), [()] * len(lines)))
+            for line, y in zip(lines, ys):
+                line.set_data(x, y)
+                line.set_visible(len(x) > 0)
+        for ax in self.axes:
+            ax.relim(visible_only=True)
+            ax.autoscale_view()
+        shown = tuple(h for h in self.lines if h in series)
+        if shown != self._legend_hues:
+            self.axes[0].legend(handles=[self.lines[h][0] for h in shown], loc="best")
+            self._legend_hues = shown
+        self.axes[0].set_title(title)
+        _save(self.figure, path)
+
+
+_chart = None
+
+
+def _init_worker(metric_columns, hues, x_column):
+    global _chart
+    _chart = ScenarioChart(metric_columns, hues, x_column)
+
+
+def _render_charts(task):
+    for path, title, series in task:
+        _chart.render(path, title, series)
+    return len(task)
+
+
+def scenario_series(df, group_by, x_column, hue, metric_columns):
+    # Mean of each metric per (scenario, hue, x); yields (key, series)
+    means = df.groupby(group_by + [hue, x_column], sort=True, observed=True)[metric_columns].mean().reset_index()
+    for key, group in means.groupby(group_by, sort=False, observed=True):
+        series = {}
+        for h, rows in group.groupby(hue, sort=False, observed=True):
+            series[h] = (rows[x_column].to_numpy(np.float64),
+                         [rows[c].to_numpy(np.float64) for c in metric_columns])
+        yield key if isinstance(key, tuple) else (key,), series
+
+
+def render_summary(df, charts_dir, x_column, hue, metric_columns, hues):
+    # Whole-table charts: metric distributions, metric vs metric, and means
+    # against x. Returns [(title, relative path)]
+    from matplotlib import colormaps
+    from matplotlib.ticker import EngFormatter
+
+    colors = dict(zip(hues, colormaps["tab10"].colors))
+    out = []
+
+    figure, axes = _new_figure(len(metric_columns), sharex=False)
+    for ax, column in zip(axes, metric_columns):
+        values = df[column].to_numpy(np.float64)
+        bins = np.histogram_bin_edges(values[np.isfinite(values)], HISTOGRAM_BINS)
+        for h, rows in df.groupby(hue, sort=True, observed=True):
+            ax.hist(rows[column].to_numpy(np.float64), bins=bins, alpha=0.5, color=colors.get(h), label=str(h))
+        ax.set_xlabel(label(column))
+        ax.set_ylabel("Runs")
+        _compact_axis(ax)
+    axes[0].legend(loc="best")
+    axes[0].set_title("Distribution by " + hue)
+    out.append(("Distributions", "summary_distributions.png"))
+    _save(figure, os.path.join(charts_dir, out[-1][1]))
+
+    if len(metric_columns) >= 2:
+        figure, (ax,) = _new_figure()
+        sample = df.sample(SCATTER_POINTS, random_state=0) if len(df) > SCATTER_POINTS else df
+        for h, rows in sample.groupby(hue, sort=True, observed=True):
+            ax.scatter(rows[metric_columns[0]], rows[metric_columns[1]], s=6, alpha=0.5,
+                       color=colors.get(h), label=str(h))
+        ax.set_xlabel(label(metric_columns[0]))
+        ax.set_ylabel(label(metric_columns[1]))
+        _compact_axis(ax)
+        ax.xaxis.set_major_formatter(EngFormatter(sep=""))
+        ax.legend(loc="best")
+        ax.set_title(f"{label(metric_columns[1])} vs {label(metric_columns[0])}")
+        out.append(("Trade-off", "summary_tradeoff.png"))
+        _save(figure, os.path.join(charts_dir, out[-1][1]))
+
+    chart = ScenarioChart(metric_columns, hues, x_column)
+    (_, series), = scenario_series(df.assign(_all=0), ["_all"], x_column, hue, metric_columns)
+    out.append(("Mean over all scenarios", "summary_means.png"))
+    chart.render(os.path.join(charts_dir, out[-1][1]), f"Mean over all scenarios by {label(x_column)}", series)
+    return out
+
+
+def _number(v):
+    return f"{v:,.0f}" if abs(v) >= 1000 else f"{v:.4g}"
+
+
+def _html_table(frame):
+    return frame.to_html(float_format=_number, border=0, classes="data", escape=True)
+
+
+def write_index(path, title, source, df, group_by, hue, metric_columns, summary, scenarios):
+    # scenarios: [(anchor, title, relative image path, {metric: mean})]
+    esc = html.escape
+    parts = [
+        "<!DOCTYPE html>",
+        f"<html><head><meta charset=\"utf-8\"><title>{esc(title)}</title><style>",
+        "body{font-family:sans-serif;margin:2em;max-width:1100px}img{max-width:100%}",
+        "table.data{border-collapse:collapse;font-size:0.9em}",
+        "table.data td,table.data th{padding:2px 8px;text-align:right;border-bottom:1px solid #ddd}",
+        "section{margin-top:2em}</style></head><body>",
+        f"<h1>{esc(title)}</h1>",
+        f"<p>Source: {esc(str(source))} &middot; {len(df):,} rows &middot; {len(scenarios):,} scenarios "
+        f"&middot; generated {datetime.now():%Y-%m-%d %H:%M:%S}</p>",
+        "<h2 id=\"summary\">Summary</h2>",
+        _html_table(df.groupby(hue, observed=True)[metric_columns].agg(["mean", "min", "max"]).rename(columns=label)),
+    ]
+    for name, image in summary:
+        parts.append(f"<h3>{esc(name)}</h3><img src=\"{esc(image)}\" alt=\"{esc(name)}\">")
+
+    parts.append(f"<h2 id=\"scenarios\">Scenarios</h2><table class=\"data\"><tr><th>{esc(' / '.join(group_by))}</th>"
+                 + "".join(f"<th>{esc(label(c))}</th>" for c in metric_columns) + "</tr>")
+    for anchor, name, _, means in scenarios:
+        parts.append(f"<tr><td style=\"text-align:left\"><a href=\"#{anchor}\">{esc(name)}</a></td>"
+                     + "".join(f"<td>{_number(means[c])}</td>" for c in metric_columns) + "</tr>")
+    parts.append("</table>")
+    for anchor, name, image, _ in scenarios:
+        parts.append(f"<section id=\"{anchor}\"><h3>{esc(name)}</h3>"
+                     f"<img loading=\"lazy\" src=\"{esc(image)}\" alt=\"{esc(name)}\"></section>")
+    parts.append("</body></html>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+
+def build_report(df, output_dir, group_by=None, x_column=DEFAULT_X, hue=DEFAULT_HUE,
+                 metric_columns=None, workers=None, title="HydroSim report", source=None):
+    # Writes output_dir/index.html and output_dir/charts/*.png; returns the index path
+    metric_columns = list(metric_columns or DEFAULT_METRICS)
+    if group_by is None:
+        group_by = [c for c in DEFAULT_GROUP_BY if c in df.columns]
+    group_by = list(group_by)
+    missing = [c for c in group_by + [x_column, hue] + metric_columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Results have no column(s) {', '.join(missing)}")
+
+    charts_dir = os.path.join(output_dir, "charts")
+    os.makedirs(charts_dir, exist_ok=True)
+    hues = sorted(df[hue].unique().tolist(), key=str)
+
+    charts, scenarios = [], []
+    with metrics.span("report.prepare"):
+        if group_by:
+            grouped = scenario_series(df, group_by, x_column, hue, metric_columns)
+        else:
+            grouped = scenario_series(df.assign(_all=0), ["_all"], x_column, hue, metric_columns)
+        for i, (key, series) in enumerate(grouped, 1):
+            name = " / ".join(str(v) for v in key) if group_by else "All runs"
+            image = f"charts/scenario_{i:05d}.png"
+            charts.append((os.path.join(output_dir, image), name, series))
+            means = {c: float(np.mean(np.concatenate([ys[j] for _, ys in series.values()])))
+                     for j, c in enumerate(metric_columns)}
+            scenarios.append((f"s{i}", name, image, means))
+
+    tasks = [charts[a:a + CHARTS_PER_TASK] for a in range(0, len(charts), CHARTS_PER_TASK)]
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    log(f"Report: {len(charts):,} scenario charts from {len(df):,} rows on {workers} worker(s)")
+    initargs = (metric_columns, hues, x_column)
+    with metrics.span("report.render"):
+        if workers == 1:
+            _init_worker(*initargs)
+            for task in tasks:
+                _render_charts(task)
+            summary = render_summary(df, charts_dir, x_column, hue, metric_columns, hues)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+                rendered = pool.map(_render_charts, tasks)
+                # The summary charts are drawn here while the workers render scenarios
+                summary = render_summary(df, charts_dir, x_column, hue, metric_columns, hues)
+                sum(rendered)
+
+    index = os.path.join(output_dir, "index.html")
+    write_index(index, title, source, df, group_by, hue, metric_columns,
+                [(name, f"charts/{image}") for name, image in summary], scenarios)
+    return index
+
+
+def report_command(args):
+    # Shared by `python -m utils.report` and `python main.py report`
+    df = read_results(args.results)
+    output_dir = os.path.join(args.output_dir, f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    try:
+        index = build_report(df, output_dir, args.group_by, args.x, args.hue, args.metrics,
+                             args.workers, args.title, args.results)
+    except ValueError as e:
+        raise SystemExit(f"error: {e}")
+    print(f"📊 Report saved: {index}")
+    return index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build an HTML chart report from a results table")
+    add_report_arguments(parser)
+    report_command(parser.parse_args())
@@ -0,0 +1,292 @@
+# utils/results_store.py
+#
+# Persistent, indexed store of scenario results in SQLite. Each run is keyed
+# by the config_hash of its canonical config (numbers as floats, so 400 and
+# 400.0 are the same scenario) plus the model and store versions, stored as
+# 32 raw bytes.
+#
+#   runs       one narrow row per run: the inputs people filter on and the
+#              headline outputs, as indexed columns
+#   run_data   same id: the config and the full nested result as JSON, so
+#              mode-specific keys (e.g. timeseries peak_power_kw) survive
+#
+# Keeping the blobs out of runs keeps range scans over millions of runs to a
+# few hundred MB of pages.
+#
+#   store = ResultsStore("outputs/results/results.sqlite")
+#   results = store.run(configs)        # simulates only configs not stored yet
+#   store.query(engine_type="H2-ICE", min_route_km=1000, min_carbon_price_usd_per_ton=100)
+#
+# Filters are <column>=value, min_<column>=value or max_<column>=value.
+
+import json
+import os
+import sqlite3
+import time
+
+from core.pipeline import MODEL_VERSION, run_pipeline
+from core.stage_cache import config_hash
+from geo.ports import region_mapping
+
+DEFAULT_STORE = "outputs/results/results.sqlite"
+STORE_FORMAT_VERSION = 2
+INSERT_BATCH_SIZE = 10_000
+LOOKUP_BATCH_SIZE = 500
+
+# Indexed input columns: name -> SQL type
+INPUT_COLUMNS = {
+    "engine_type": "TEXT",
+    "route_km": "REAL",
+    "origin_port": "TEXT",
+    "destination_port": "TEXT",
+    "region": "TEXT",
+    "load_factor": "REAL",
+    "cargo_mass_tons": "REAL",
+    "fuel_cost_usd_per_kg": "REAL",
+    "carbon_price_usd_per_ton": "REAL",
+    "emission_factor_kg_co2e_per_kg_h2": "REAL",
+}
+# Output columns: name -> (section, key) in the nested result
+OUTPUT_COLUMNS = {
+    "total_cost_usd": ("cost", "total_cost_usd"),
+    "cost_per_ton_km_usd": ("cost", "cost_per_ton_km_usd"),
+    "hydrogen_used_kg": ("energy", "hydrogen_used_kg"),
+    "total_emissions_kg_co2e": ("emissions", "total_emissions_kg_co2e"),
+    "emissions_per_ton_km_kg_co2e": ("emissions", "emissions_per_ton_km_kg_co2e"),
+}
+INDEXES = [
+    ("engine_type", "route_km"),
+    ("route_km",),
+    ("carbon_price_usd_per_ton",),
+    ("fuel_cost_usd_per_kg",),
+    ("origin_port", "destination_port"),
+    ("region",),
+]
+REGION_INDEX = list(INPUT_COLUMNS).index("region")
+FILTER_COLUMNS = {"created", *INPUT_COLUMNS, *OUTPUT_COLUMNS}
+
+
+def canonical_config(config):
+    # Numbers as floats, NumPy scalars as Python values
+    out = {}
+    for key, value in config.items():
+        if hasattr(value, "item"):
+            value = value.item()
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value)
+        out[key] = value
+    return out
+
+
+def run_key(config):
+    return bytes.fromhex(config_hash(canonical_config(config), extra=[MODEL_VERSION, STORE_FORMAT_VERSION]))
+
+
+def dump_result(result):
+    return json.dumps(result, separators=(",", ":"), default=float)
+
+
+def simulate_config(config):
+    return {"engine": config["engine_type"], **run_pipeline(config)}
+
+
+def flatten_result(result):
+    # Nested run_simulation result -> the flat core.batch column layout
+    flat = {"engine": result.get("engine")}
+    for section, values in result.items():
+        if isinstance(values, dict):
+            flat.update({f"{section}_{k}": v for k, v in values.items()})
+    return flat
+
+
+class ResultsStore:
+    def __init__(self, path=DEFAULT_STORE):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA cache_size=-262144")  # 256 MB page cache for bulk index updates
+        self._create_schema()
+
+    def _create_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        tables = self.conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'runs'").fetchone()[0]
+        if tables and version != STORE_FORMAT_VERSION:
+            self.conn.close()
+            raise ValueError(f"{self.path} is results store format {version}, expected {STORE_FORMAT_VERSION}; "
+                             "use a new store path")
+        columns = [f"{name} {kind}" for name, kind in INPUT_COLUMNS.items()]
+        columns += [f"{name} REAL" for name in OUTPUT_COLUMNS]
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, config_hash BLOB NOT NULL, created REAL, "
+                f"{', '.join(columns)})")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS run_data (id INTEGER PRIMARY KEY, config TEXT, result TEXT)")
+            self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_runs_config_hash ON runs (config_hash)")
+            for index in INDEXES:
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_runs_{'_'.join(index)} ON runs ({', '.join(index)})")
+            self.conn.execute(f"PRAGMA user_version = {STORE_FORMAT_VERSION}")
+
+    def close(self):
+        # Refreshes planner statistics so wide range queries pick a scan over an index
+        self.conn.execute("PRAGMA optimize")
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def _select_by_key(self, keys, columns):
+        # {key: row of columns} for the stored keys among keys
+        found = {}
+        for a in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            chunk = keys[a:a + LOOKUP_BATCH_SIZE]
+            rows = self.conn.execute(
+                f"SELECT runs.config_hash, {', '.join(columns)} FROM runs JOIN run_data USING (id) "
+                f"WHERE runs.config_hash IN ({', '.join('?' * len(chunk))})", chunk)
+            found.update((row[0], row[1:]) for row in rows)
+        return found
+
+    def lookup(self, configs):
+        # Stored result per config, or None
+        keys = [run_key(c) for c in configs]
+        found = self._select_by_key(list(dict.fromkeys(keys)), ["result"])
+        return [json.loads(found[key][0]) if key in found else None for key in keys]
+
+    def put_many(self, configs, results):
+        # Inserts the runs not stored yet in one transaction, INSERT_BATCH_SIZE
+        # rows per executemany. Error results ({"error": ...}) are skipped.
+        # Returns the number of runs added.
+        created = time.time()
+        new = {}
+        for config, result in zip(configs, results):
+            if "error" not in result:
+                new.setdefault(run_key(config), (canonical_config(config), result))
+
+        names = ["id", "config_hash", "created", *INPUT_COLUMNS, *OUTPUT_COLUMNS]
+        insert_run = f"INSERT INTO runs ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+        with self.conn:
+            # Takes the write lock up front, so ids cannot collide with another writer
+            self.conn.execute("BEGIN IMMEDIATE")
+            for key in self._select_by_key(list(new), ["id"]):
+                del new[key]
+            next_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM runs").fetchone()[0]
+            items = list(new.items())
+            for a in range(0, len(items), INSERT_BATCH_SIZE):
+                runs, data = [], []
+                for run_id, (key, (config, result)) in enumerate(items[a:a + INSERT_BATCH_SIZE], next_id + a):
+                    inputs = [config.get(name) for name in INPUT_COLUMNS]
+                    if inputs[REGION_INDEX] is None and config.get("origin_port") in region_mapping:
+                        inputs[REGION_INDEX] = region_mapping[config["origin_port"]]
+                    outputs = [result[section][k] for section, k in OUTPUT_COLUMNS.values()]
+                    runs.append((run_id, key, created, *inputs, *outputs))
+                    data.append((run_id, json.dumps(config, separators=(",", ":")), dump_result(result)))
+                self.conn.executemany(insert_run, runs)
+                self.conn.executemany("INSERT INTO run_data (id, config, result) VALUES (?, ?, ?)", data)
+        return len(items)
+
+    def run(self, configs, simulate=simulate_config):
+        # Results for configs, simulating (core.pipeline by default) and
+        # storing only the ones not already in the store
+        results = self.lookup(configs)
+        computed = {}
+        for i, result in enumerate(results):
+            if result is None:
+                key = run_key(configs[i])
+                if key not in computed:
+                    result = simulate(configs[i])
+                    if "error" not in result:
+                        # Same JSON values as a result read back from the store
+                        result = json.loads(dump_result(result))
+                    computed[key] = (configs[i], result)
+                results[i] = computed[key][1]
+        if computed:
+            self.put_many(*zip(*computed.values()))
+        return results
+
+    def query(self, columns=None, order_by=None, limit=None, with_results=False, with_configs=False, **filters):
+        # DataFrame of matching runs. columns defaults to the hash, indexed
+        # inputs and outputs; with_results / with_configs add the decoded
+        # nested result / config.
+        import pandas as pd
+
+        columns = list(columns or ["config_hash", *INPUT_COLUMNS, *OUTPUT_COLUMNS])
+        clauses, params = [], []
+        for name, value in filters.items():
+            op = "="
+            if name.startswith(("min_", "max_")) and name not in FILTER_COLUMNS:
+                op = ">=" if name.startswith("min_") else "<="
+                name = name[4:]
+            if name not in FILTER_COLUMNS:
+                raise ValueError(f"Cannot filter on {name!r}; use one of {', '.join(sorted(FILTER_COLUMNS))}")
+            clauses.append(f"{name} {op} ?")
+            params.append(value)
+        for name in [*columns, *([order_by.lstrip("-")] if order_by else [])]:
+            if name not in FILTER_COLUMNS and name != "config_hash":
+                raise ValueError(f"Unknown column {name!r}")
+
+        extra = (["result"] if with_results else []) + (["config"] if with_configs else [])
+        sql = f"SELECT {', '.join(f'runs.{c}' for c in columns)}"
+        if extra:
+            sql += f", {', '.join(extra)} FROM runs JOIN run_data USING (id)"
+        else:
+            sql += " FROM runs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if order_by:
+            sql += f" ORDER BY {order_by.lstrip('-')} {'DESC' if order_by.startswith('-') else 'ASC'}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        rows = self.conn.execute(sql, params).fetchall()
+        n = len(columns)
+        frame = pd.DataFrame([row[:n] for row in rows] if extra else rows, columns=columns)
+        if "config_hash" in frame:
+            frame["config_hash"] = [key.hex() for key in frame["config_hash"]]
+        if with_results:
+            frame["result"] = [json.loads(row[n]) for row in rows]
+        if with_configs:
+            frame["config"] = [json.loads(row[-1]) for row in rows]
+        return frame
+
+if __name__ == "__main__":
+    import argparse
+
+    import pandas  # noqa: F401  (imported up front so it is not part of the query time)
+
+    parser = argparse.ArgumentParser(description="Query the HydroSim results store")
+    parser.add_argument("filters", nargs="*", help="Filters as column=value, min_column=value or max_column=value")
+    parser.add_argument("--store", default=DEFAULT_STORE)
+    parser.add_argument("--order-by", default=None, help="Sort column; prefix with - for descending (--order-by=-total_cost_usd)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--output", default=None, help="Write all matches to this CSV instead of printing")
+    args = parser.parse_args()
+
+    filters = {}
+    for item in args.filters:
+        name, _, value = item.partition("=")
+        try:
+            filters[name] = float(value)
+        except ValueError:
+            filters[name] = value
+
+    with ResultsStore(args.store) as store:
+        start = time.perf_counter()
+        try:
+            frame = store.query(order_by=args.order_by, limit=None if args.output else args.limit, **filters)
+        except ValueError as e:
+            parser.error(str(e))
+        elapsed = time.perf_counter() - start
+        if args.output:
+            frame.to_csv(args.output, index=False)
+            print(f"📄 {len(frame):,} runs saved: {args.output}")
+        else:
+            print(frame.to_string(index=False))
+        print(f"{len(frame):,} of {len(store):,} stored runs in {elapsed * 1e3:.1f} ms")
@@ -0,0 +1,126 @@
+# utils/results_writer.py
+#
+# Streaming sinks for columnar results (the flat layout from core.batch).
+# Each write() appends one batch as a row group, so memory is bounded by the
+# batch size, not the sweep size. The Parquet / Arrow sinks use a fixed
+# schema: float64 for every numeric column and dictionary-encoded strings.
+
+import numpy as np
+
+from core.batch import RESULT_COLUMNS
+
+STRING_COLUMNS = {"engine", "hydrogen_engine_type", "engine_type", "origin_port", "destination_port"}
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow output needs pyarrow (pip install pyarrow)") from e
+    return pa
+
+
+def result_schema(extra_columns=(), string_columns=()):
+    # string_columns: extra columns holding text rather than numbers
+    pa = _pyarrow()
+    fields = []
+    for name in RESULT_COLUMNS + list(extra_columns):
+        if name in STRING_COLUMNS or name in string_columns:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(name, pa.float64()))
+    return pa.schema(fields)
+
+
+def to_table(columns, schema):
+    pa = _pyarrow()
+    n = len(columns[schema.names[0]])
+    arrays = []
+    for field in schema:
+        values = np.broadcast_to(columns[field.name], (n,))
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values.astype(str)).dictionary_encode())
+        else:
+            arrays.append(pa.array(values.astype(np.float64)))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class ParquetResultSink:
+    def __init__(self, path, extra_columns=(), compression="zstd", compression_level=None, string_columns=()):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.schema = result_schema(extra_columns, string_columns)
+        self.rows_written = 0
+        self._writer = pq.ParquetWriter(path, self.schema, compression=compression,
+                                        compression_level=compression_level, use_dictionary=True)
+
+    def write(self, columns):
+        table = to_table(columns, self.schema)
+        self._writer.write_table(table, row_group_size=table.num_rows)
+        self.rows_written += table.num_rows
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArrowResultSink(ParquetResultSink):
+    # Arrow IPC stream (.arrows), one record batch per write. The stream
+    # format allows each batch to carry its own string dictionaries.
+    def __init__(self, path, extra_columns=(), compression="zstd", string_columns=()):
+        pa = _pyarrow()
+
+        self.path = path
+        self.schema = result_schema(extra_columns, string_columns)
+        self.rows_written = 0
+        self._sink = pa.OSFile(path, "wb")
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        self._writer = pa.ipc.new_stream(self._sink, self.schema, options=options)
+
+    def write(self, columns):
+        table = to_table(columns, self.schema)
+        self._writer.write_table(table)
+        self.rows_written += table.num_rows
+
+    def close(self):
+        self._writer.close()
+        self._sink.close()
+
+
+class CsvResultSink:
+    # Plain CSV export, appended batch by batch with a single header
+    def __init__(self, path, extra_columns=()):
+        self.path = path
+        self.columns = RESULT_COLUMNS + list(extra_columns)
+        self.rows_written = 0
+
+    def write(self, columns):
+        import pandas as pd
+
+        df = pd.DataFrame({c: columns[c] for c in self.columns})
+        df.to_csv(self.path, mode="w" if self.rows_written == 0 else "a",
+                  header=self.rows_written == 0, index=False)
+        self.rows_written += len(df)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_result_sink(path, extra_columns=(), compression="zstd", string_columns=()):
+    if path.endswith(".csv"):
+        return CsvResultSink(path, extra_columns)
+    if path.endswith((".arrows", ".arrow")):
+        return ArrowResultSink(path, extra_columns, compression, string_columns=string_columns)
+    return ParquetResultSink(path, extra_columns, compression, string_columns=string_columns)